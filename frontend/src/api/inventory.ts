@@ -1,13 +1,17 @@
-import { useQuery, useMutation, useQueryClient } from "@tanstack/react-query";
-import type { Device, DeviceCreate, DeviceFilters } from "@/types/device.types";
+import { useInfiniteQuery, useMutation, useQueryClient } from "@tanstack/react-query";
+import type { Device, DeviceCreate, DeviceFilters, DevicePage } from "@/types/device.types";
 import apiClient from "./client";
 
-async function fetchDevices(filters?: DeviceFilters): Promise<Device[]> {
+async function fetchDevices(
+  filters: DeviceFilters | undefined,
+  cursor: string | null,
+): Promise<DevicePage> {
   const params: Record<string, string> = {};
   if (filters?.device_type) params.device_type = filters.device_type;
   if (filters?.topology_type) params.topology_type = filters.topology_type;
   if (filters?.status) params.status = filters.status;
-  const resp = await apiClient.get<Device[]>("/inventory/devices", { params });
+  if (cursor) params.cursor = cursor;
+  const resp = await apiClient.get<DevicePage>("/inventory/devices", { params });
   return resp.data;
 }
 
@@ -17,9 +21,11 @@ async function createDevice(data: DeviceCreate): Promise<Device> {
 }
 
 export function useDevices(filters?: DeviceFilters) {
-  return useQuery({
+  return useInfiniteQuery({
     queryKey: ["devices", filters],
-    queryFn: () => fetchDevices(filters),
+    queryFn: ({ pageParam }) => fetchDevices(filters, pageParam),
+    initialPageParam: null as string | null,
+    getNextPageParam: (lastPage) => lastPage.next_cursor,
   });
 }
 
@@ -1,30 +1,51 @@
-import { useMutation, useQuery, useQueryClient } from "@tanstack/react-query";
-import type { Reservation, ReservationCreate } from "@/types/reservation.types";
+import { useInfiniteQuery, useMutation, useQueryClient } from "@tanstack/react-query";
+import type { Reservation, ReservationCreate, ReservationPage } from "@/types/reservation.types";
 import apiClient from "./client";
 
-async function fetchReservations(): Promise<Reservation[]> {
-  const resp = await apiClient.get<Reservation[]>("/reservations/");
+async function fetchReservations(cursor: string | null): Promise<ReservationPage> {
+  const resp = await apiClient.get<ReservationPage>("/reservations/", {
+    params: cursor ? { cursor } : undefined,
+  });
   return resp.data;
 }
 
-async function createReservation(data: ReservationCreate): Promise<Reservation> {
-  const resp = await apiClient.post<Reservation>("/reservations/", data);
+// Retries (double-clicks, replays after a token refresh) reuse the key, so the
+// server answers them with the stored response instead of acting twice
+function idempotencyHeaders(key: string) {
+  return { headers: { "Idempotency-Key": key } };
+}
+
+async function createReservation({
+  idempotencyKey,
+  ...data
+}: ReservationCreate & { idempotencyKey: string }): Promise<Reservation> {
+  const resp = await apiClient.post<Reservation>(
+    "/reservations/",
+    data,
+    idempotencyHeaders(idempotencyKey),
+  );
   return resp.data;
 }
 
 async function cancelReservation(id: string): Promise<void> {
-  await apiClient.delete(`/reservations/${id}`);
+  await apiClient.delete(`/reservations/${id}`, idempotencyHeaders(`cancel-${id}`));
 }
 
 async function releaseReservation(id: string): Promise<Reservation> {
-  const resp = await apiClient.put<Reservation>(`/reservations/${id}/release`);
+  const resp = await apiClient.put<Reservation>(
+    `/reservations/${id}/release`,
+    undefined,
+    idempotencyHeaders(`release-${id}`),
+  );
   return resp.data;
 }
 
 export function useReservations() {
-  return useQuery({
+  return useInfiniteQuery({
     queryKey: ["reservations"],
-    queryFn: fetchReservations,
+    queryFn: ({ pageParam }) => fetchReservations(pageParam),
+    initialPageParam: null as string | null,
+    getNextPageParam: (lastPage) => lastPage.next_cursor,
   });
 }
 
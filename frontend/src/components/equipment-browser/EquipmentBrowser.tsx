@@ -69,17 +69,26 @@ export function EquipmentBrowser() {
   const [typeFilter, setTypeFilter] = useState<DeviceType | "">("");
   const [topoFilter, setTopoFilter] = useState<TopologyType | "">("");
 
-  const { data: devices, isLoading, isError } = useDevices({
+  const { data, isLoading, isError, hasNextPage, fetchNextPage, isFetchingNextPage } = useDevices({
     device_type: typeFilter || undefined,
     topology_type: topoFilter || undefined,
     status: "AVAILABLE",
   });
+  const devices = data?.pages.flatMap((page) => page.items);
+  const total = data?.pages[0]?.total_estimate;
 
   return (
     <div className="flex flex-col h-full bg-gray-50 border-r border-gray-200">
       {/* Header */}
       <div className="px-3 py-3 border-b border-gray-200 bg-white">
-        <h2 className="text-sm font-semibold text-gray-800 mb-2">Equipment Browser</h2>
+        <h2 className="text-sm font-semibold text-gray-800 mb-2">
+          Equipment Browser
+          {total !== undefined && (
+            <span className="ml-1 font-normal text-gray-400">
+              ({hasNextPage ? "~" : ""}{total.toLocaleString()})
+            </span>
+          )}
+        </h2>
 
         {/* Type filter */}
         <label htmlFor="eq-type-filter" className="sr-only">Device type filter</label>
@@ -125,6 +134,15 @@ export function EquipmentBrowser() {
         {devices?.map((device) => (
           <DeviceCard key={device.id} device={device} />
         ))}
+        {hasNextPage && (
+          <button
+            onClick={() => fetchNextPage()}
+            disabled={isFetchingNextPage}
+            className="w-full text-xs text-blue-600 hover:text-blue-800 py-2 disabled:opacity-50"
+          >
+            {isFetchingNextPage ? "Loading..." : "Load more"}
+          </button>
+        )}
       </div>
 
       {/* Legend */}
@@ -1,4 +1,4 @@
-import { useState } from "react";
+import { useRef, useState } from "react";
 import toast from "react-hot-toast";
 import { useCreateReservation } from "@/api/reservations";
 import { Modal } from "@/components/ui/Modal";
@@ -14,6 +14,8 @@ export function CreateReservationModal({ open, deviceIds, onClose }: CreateReser
   const [startTime, setStartTime] = useState("");
   const [endTime, setEndTime] = useState("");
   const [purpose, setPurpose] = useState("");
+  // One key per reservation attempt; only replaced once it has succeeded
+  const idempotencyKey = useRef(crypto.randomUUID());
 
   const handleSubmit = async (e: React.FormEvent) => {
     e.preventDefault();
@@ -29,7 +31,9 @@ export function CreateReservationModal({ open, deviceIds, onClose }: CreateReser
         start_time: new Date(startTime).toISOString(),
         end_time: new Date(endTime).toISOString(),
         purpose: purpose || undefined,
+        idempotencyKey: idempotencyKey.current,
       });
+      idempotencyKey.current = crypto.randomUUID();
       toast.success("Reservation created");
       onClose();
     } catch (err: unknown) {
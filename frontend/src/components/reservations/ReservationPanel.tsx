@@ -64,7 +64,8 @@ function ReservationRow({ reservation }: { reservation: Reservation }) {
 }
 
 export function ReservationPanel() {
-  const { data: reservations, isLoading } = useReservations();
+  const { data, isLoading, hasNextPage, fetchNextPage, isFetchingNextPage } = useReservations();
+  const reservations = data?.pages.flatMap((page) => page.items);
 
   return (
     <div className="bg-white border-t border-gray-200">
@@ -84,11 +85,20 @@ export function ReservationPanel() {
           <p role="status" aria-live="polite" className="text-xs text-gray-400 text-center py-3">Loading...</p>
         )}
         {!isLoading && (!reservations || reservations.length === 0) && (
-          <p className="text-xs text-gray-400 text-center py-3">No reservations yet</p>
+          <p className="text-xs text-gray-400 text-center py-3">No upcoming or active reservations</p>
         )}
         {reservations?.map((res) => (
           <ReservationRow key={res.id} reservation={res} />
         ))}
+        {hasNextPage && (
+          <button
+            onClick={() => fetchNextPage()}
+            disabled={isFetchingNextPage}
+            className="w-full text-xs text-blue-600 hover:text-blue-800 py-2 disabled:opacity-50"
+          >
+            {isFetchingNextPage ? "Loading..." : "Load more"}
+          </button>
+        )}
       </div>
     </div>
   );
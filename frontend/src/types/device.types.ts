@@ -11,10 +11,20 @@ export interface Device {
   location: string | null;
   specs: Record<string, unknown> | null;
   description: string | null;
+  version: number;
+  // ETag of this version, as served by GET /devices/{id}
+  etag: string;
   created_at: string;
   updated_at: string;
 }
 
+export interface DevicePage {
+  items: Device[];
+  next_cursor: string | null;
+  // Approximate count of devices matching the filters
+  total_estimate: number;
+}
+
 export interface DeviceCreate {
   name: string;
   device_type: DeviceType;
@@ -11,9 +11,15 @@ export interface Reservation {
   start_time: string;
   end_time: string;
   status: ReservationStatus;
+  series_id: string | null;
   created_at: string;
 }
 
+export interface ReservationPage {
+  items: Reservation[];
+  next_cursor: string | null;
+}
+
 export interface ReservationCreate {
   device_ids: string[];
   purpose?: string;
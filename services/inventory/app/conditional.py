@@ -0,0 +1,38 @@
+"""
+Validators for conditional GETs of inventory reads.
+
+Listings and searches carry an ETag of the inventory version, which every device
+write bumps, so a repeated read costs one single-row lookup and answers 304 until
+something changes. A device carries an ETag of its own version. Responses are
+marked ``private, no-cache``: browsers keep them but revalidate on every use.
+"""
+
+from datetime import datetime, timezone
+from email.utils import format_datetime
+
+
+def inventory_etag(version: int) -> str:
+    return f'"inventory-{version}"'
+
+
+def device_etag(version: int) -> str:
+    return f'"device-{version}"'
+
+
+def validators(etag: str, last_modified: datetime) -> dict[str, str]:
+    """Response headers for a representation with this ETag."""
+    if last_modified.tzinfo is None:
+        last_modified = last_modified.replace(tzinfo=timezone.utc)
+    return {
+        "ETag": etag,
+        "Last-Modified": format_datetime(last_modified.astimezone(timezone.utc), usegmt=True),
+        "Cache-Control": "private, no-cache",
+    }
+
+
+def not_modified(if_none_match: str | None, etag: str) -> bool:
+    """Whether an If-None-Match header matches ``etag`` (weak comparison, per RFC 9110)."""
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or any(tag.removeprefix("W/") == etag for tag in tags)
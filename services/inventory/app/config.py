@@ -8,6 +8,20 @@ class Settings(BaseSettings):
     algorithm: str = "HS256"
     cors_origins: str = ""
     internal_api_token: str = ""
+    # Device change events for other services' read-models (optional)
+    nats_url: str = "nats://nats:4222"
+    # Device search (PostgreSQL): minimum pg_trgm word similarity for a fuzzy match
+    # when the words themselves do not match. Only the max_candidates best matches
+    # can be paged through, which bounds very broad queries (single letters)
+    device_search_similarity: float = 0.5
+    device_search_max_candidates: int = 1000
+    # In-process cache of the device table (app.services.device_cache). Off, every
+    # read goes to the database. A catalog above max_bytes (approximate) is not
+    # cached. A replica still behind the database after resync_seconds, having
+    # missed change events, reloads the whole table
+    device_cache_enabled: bool = True
+    device_cache_max_bytes: int = 64 * 1024 * 1024
+    device_cache_resync_seconds: float = 5.0
 
     model_config = {"env_file": ".env", "case_sensitive": False}
 
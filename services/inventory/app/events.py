@@ -0,0 +1,71 @@
+"""
+Device change events for other services' read-models.
+
+Published on core NATS after each committed change, so delivery is at-most-once.
+Every event carries the device's ``version``: consumers apply events in version
+order and heal any gap from the ``/devices:snapshot`` endpoint. Events also carry
+the ``inventory_version`` the write produced (app.models.inventory_version), which
+the device caches of inventory replicas advance through.
+"""
+
+import json
+import logging
+import uuid
+
+logger = logging.getLogger(__name__)
+
+DEVICE_EVENTS_SUBJECT = "herd.inventory.devices"
+
+
+def device_summary(device) -> dict:
+    """The fields other services mirror; accepts a Device or a RETURNING row."""
+    return {
+        "id": str(device.id),
+        "name": device.name,
+        "device_type": device.device_type.value,
+        "topology_type": device.topology_type.value,
+        "status": device.status.value,
+        "version": device.version,
+    }
+
+
+class DeviceEventPublisher:
+    def __init__(self) -> None:
+        self._nats = None
+
+    def attach(self, nc) -> None:
+        self._nats = nc
+
+    async def changed(self, devices: list, inventory_version: int) -> None:
+        """Announce created or updated devices in one message."""
+        if devices:
+            await self._publish(
+                f"{DEVICE_EVENTS_SUBJECT}.changed",
+                {
+                    "event": "devices.changed",
+                    "devices": [device_summary(d) for d in devices],
+                    "inventory_version": inventory_version,
+                },
+            )
+
+    async def deleted(self, device_id: uuid.UUID, version: int, inventory_version: int) -> None:
+        await self._publish(
+            f"{DEVICE_EVENTS_SUBJECT}.deleted",
+            {
+                "event": "device.deleted",
+                "id": str(device_id),
+                "version": version,
+                "inventory_version": inventory_version,
+            },
+        )
+
+    async def _publish(self, subject: str, payload: dict) -> None:
+        if self._nats is None:
+            return
+        try:
+            await self._nats.publish(subject, json.dumps(payload).encode())
+        except Exception:
+            logger.warning("Failed to publish %s", subject, exc_info=True)
+
+
+device_events = DeviceEventPublisher()
@@ -1,3 +1,4 @@
+import logging
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
@@ -6,17 +7,53 @@ from herd_common.logging import RequestLoggingMiddleware, setup_logging
 
 from app.config import settings
 from app.database import Base, engine
+from app.events import device_events
+from app.routers.device_cache import router as device_cache_router
 from app.routers.devices import router as devices_router
+from app.services.device_cache import device_cache
 
 setup_logging("inventory")
+logger = logging.getLogger(__name__)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+
+    # Connect to NATS for device change events (non-fatal if unavailable)
+    app.state.nats = None
+    try:
+        import nats
+
+        nc = await nats.connect(settings.nats_url)
+        app.state.nats = nc
+        device_events.attach(nc)
+        logger.info("Connected to NATS at %s", settings.nats_url)
+    except Exception:
+        logger.warning(
+            "NATS unavailable at %s, device changes will not be announced", settings.nats_url
+        )
+
+    # Serve device reads from memory, following other replicas' writes on NATS
+    if app.state.nats is not None:
+        try:
+            await device_cache.attach_nats(app.state.nats)
+        except Exception:
+            logger.warning("Device cache will catch up by reloading only", exc_info=True)
+    try:
+        await device_cache.load()
+    except Exception:
+        logger.warning("Device cache warm-up failed, reads use the database", exc_info=True)
+
     yield
 
+    if app.state.nats is not None:
+        try:
+            await app.state.nats.close()
+        except Exception:
+            logger.warning("Error closing NATS connection", exc_info=True)
+
 
 app = FastAPI(
     title="HERD Inventory Service",
@@ -36,6 +73,7 @@ app.add_middleware(
 app.add_middleware(RequestLoggingMiddleware)
 
 app.include_router(devices_router)
+app.include_router(device_cache_router)
 
 
 @app.get("/health")
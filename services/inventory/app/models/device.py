@@ -1,15 +1,31 @@
 import enum
+import itertools
 import uuid
 from datetime import datetime
 
 from herd_common.enums import TopologyType
-from sqlalchemy import JSON, DateTime, Enum, String, Text, Uuid, func
+from sqlalchemy import (
+    DDL,
+    JSON,
+    DateTime,
+    Enum,
+    Index,
+    Integer,
+    String,
+    Text,
+    Uuid,
+    event,
+    func,
+)
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.config import settings
 from app.database import Base
+from app.utils.time import utcnow
 
 _schema = settings.db_schema or None
+_prefix = f"{_schema}." if _schema else ""
 
 
 class DeviceType(str, enum.Enum):
@@ -27,9 +43,29 @@ class DeviceStatus(str, enum.Enum):
     MAINTENANCE = "MAINTENANCE"
 
 
+# Keyset pagination of the device listing on (created_at, id): one index per
+# combination of equality filters, each leading into the sort order, so every
+# filtered listing reads exactly one page of index entries
+_LISTING_FILTERS = {"device_type": "type", "topology_type": "topology", "status": "status"}
+LISTING_INDEXES = {
+    "_".join(["ix_devices", *(_LISTING_FILTERS[c] for c in columns), "created"]): [
+        *columns, "created_at", "id"
+    ]
+    for n in range(len(_LISTING_FILTERS) + 1)
+    for columns in itertools.combinations(_LISTING_FILTERS, n)
+}
+
+
 class Device(Base):
     __tablename__ = "devices"
-    __table_args__ = {"schema": _schema} if _schema else {}
+    __table_args__ = (
+        *(Index(name, *columns) for name, columns in LISTING_INDEXES.items()),
+        # Containment and key-existence filters on specs (app.services.spec_filters)
+        Index("ix_devices_specs", "specs", postgresql_using="gin").ddl_if(
+            dialect="postgresql"
+        ),
+        {"schema": _schema} if _schema else {},
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(
         Uuid(as_uuid=True), primary_key=True, default=uuid.uuid4
@@ -47,12 +83,48 @@ class Device(Base):
         default=DeviceStatus.AVAILABLE,
     )
     location: Mapped[str | None] = mapped_column(String(500), nullable=True)
-    # JSON type works on both SQLite (for tests) and PostgreSQL (JSONB-compatible in prod)
-    specs: Mapped[dict | None] = mapped_column(JSON, nullable=True)
+    # JSONB on PostgreSQL, so spec filters can use the GIN index; plain JSON on SQLite (tests)
+    specs: Mapped[dict | None] = mapped_column(
+        JSON().with_variant(JSONB, "postgresql"), nullable=True
+    )
     description: Mapped[str | None] = mapped_column(Text, nullable=True)
+    # Bumped on every change; consumers of device events apply them in version order
+    version: Mapped[int] = mapped_column(Integer, nullable=False, default=1, server_default="1")
+    # Set by the application so pagination cursors keep full precision on every backend
     created_at: Mapped[datetime] = mapped_column(
-        DateTime(timezone=True), server_default=func.now()
+        DateTime(timezone=True), default=utcnow, server_default=func.now()
     )
     updated_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
     )
+
+
+# PostgreSQL search columns, maintained by the database and not mapped: a weighted
+# tsvector for ranked full-text matching and the concatenated text for trigram
+# (fuzzy) matching. Queried by inventory_service.search_devices.
+SEARCH_CONFIG = "english"
+SEARCH_VECTOR = (
+    f"setweight(to_tsvector('{SEARCH_CONFIG}'::regconfig, coalesce(name, '')), 'A') || "
+    f"setweight(to_tsvector('{SEARCH_CONFIG}'::regconfig, coalesce(location, '')), 'B') || "
+    f"setweight(to_tsvector('{SEARCH_CONFIG}'::regconfig, coalesce(description, '')), 'C')"
+)
+SEARCH_TEXT = (
+    "coalesce(name, '') || ' ' || coalesce(location, '') || ' ' || coalesce(description, '')"
+)
+
+event.listen(
+    Device.__table__,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"),
+)
+for _ddl in (
+    f"ALTER TABLE {_prefix}devices "
+    f"ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ({SEARCH_VECTOR}) STORED, "
+    f"ADD COLUMN search_text text GENERATED ALWAYS AS ({SEARCH_TEXT}) STORED",
+    f"CREATE INDEX ix_devices_search_vector ON {_prefix}devices USING gin (search_vector)",
+    f"CREATE INDEX ix_devices_search_text ON {_prefix}devices "
+    "USING gin (search_text gin_trgm_ops)",
+):
+    event.listen(
+        Device.__table__, "after_create", DDL(_ddl).execute_if(dialect="postgresql")
+    )
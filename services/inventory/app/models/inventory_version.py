@@ -0,0 +1,36 @@
+from datetime import datetime
+
+from sqlalchemy import DDL, BigInteger, DateTime, Integer, event
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.config import settings
+from app.database import Base
+
+_schema = settings.db_schema or None
+_prefix = f"{_schema}." if _schema else ""
+
+
+class InventoryVersion(Base):
+    """Single row counting changes to the inventory as a whole.
+
+    Bumped in the same transaction as every device write, so the row lock orders
+    writers and the counter only ever grows. Conditional reads compare it instead
+    of reading devices.
+    """
+
+    __tablename__ = "inventory_version"
+    __table_args__ = {"schema": _schema} if _schema else {}
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
+    version: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+
+
+event.listen(
+    InventoryVersion.__table__,
+    "after_create",
+    DDL(
+        f"INSERT INTO {_prefix}inventory_version (id, version, updated_at) "
+        "VALUES (1, 1, CURRENT_TIMESTAMP)"
+    ),
+)
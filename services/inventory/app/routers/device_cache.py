@@ -0,0 +1,13 @@
+from fastapi import APIRouter, Depends
+
+from app.dependencies.auth import require_admin
+from app.schemas.device_cache import DeviceCacheStatus
+from app.services.device_cache import device_cache
+
+router = APIRouter(prefix="/device-cache", tags=["device-cache"])
+
+
+@router.get("/status", response_model=DeviceCacheStatus)
+async def get_device_cache_status(_: dict = Depends(require_admin)):
+    """Size, version and hit rate of this replica's device cache."""
+    return device_cache.status()
@@ -1,21 +1,43 @@
 import logging
 import uuid
 
-from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
 from pydantic import BaseModel
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.conditional import device_etag, inventory_etag, not_modified, validators
 from app.config import settings
 from app.database import get_db
 from app.dependencies.auth import get_current_user_payload, require_admin
 from app.models.device import DeviceStatus, DeviceType, TopologyType
-from app.schemas.device import DeviceCreate, DeviceResponse, DeviceUpdate
+from app.schemas.device import (
+    DeviceBatchGet,
+    DeviceBatchResponse,
+    DeviceCreate,
+    DevicePage,
+    DeviceResponse,
+    DeviceSearchPage,
+    DeviceSearchResult,
+    DeviceSnapshotResponse,
+    DeviceStatusBatchResponse,
+    DeviceStatusBatchResult,
+    DeviceStatusBatchUpdate,
+    DeviceUpdate,
+)
+from app.services.device_cache import device_cache
 from app.services.inventory_service import (
     create_device,
     delete_device,
+    estimate_device_count,
     get_device,
+    get_device_version,
+    get_devices_by_ids,
+    get_inventory_version,
+    list_device_summaries,
     list_devices,
+    search_devices,
     set_device_status,
+    set_device_statuses,
     update_device,
 )
 
@@ -28,18 +50,94 @@ class DeviceStatusUpdate(BaseModel):
     status: DeviceStatus
 
 
-@router.get("/devices", response_model=list[DeviceResponse])
+def _check_internal_token(token: str) -> None:
+    if not settings.internal_api_token or token != settings.internal_api_token:
+        raise HTTPException(status_code=403, detail="Invalid internal token")
+
+
+@router.get("/devices", response_model=DevicePage)
 async def get_devices(
+    response: Response,
     device_type: DeviceType | None = Query(None),
     topology_type: TopologyType | None = Query(None),
     status: DeviceStatus | None = Query(None),
-    skip: int = Query(0, ge=0),
+    cursor: str | None = None,
     limit: int = Query(100, ge=1, le=500),
+    spec: list[str] | None = Query(
+        None,
+        description="Spec filters, all of which must hold: key=value, key@>json, "
+        "key>n, key>=n, key<n, key<=n. Dotted keys reach nested specs.",
+    ),
+    if_none_match: str | None = Header(None),
     db: AsyncSession = Depends(get_db),
     _: dict = Depends(get_current_user_payload),
 ):
-    """List devices. Available to all authenticated users."""
-    return await list_devices(db, device_type, topology_type, status, skip, limit)
+    """List devices, newest first, a page at a time. Available to all authenticated users.
+    `total_estimate` approximates how many devices match, without counting them.
+    Conditional: answers 304 to an If-None-Match of the current inventory ETag."""
+    version, changed_at = await get_inventory_version(db)
+    headers = validators(inventory_etag(version), changed_at)
+    if not_modified(if_none_match, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    # Asked once per request, so each listing counts once in the cache's hit ratio
+    from_cache = not spec and device_cache.serves(version)
+    try:
+        devices, next_cursor = await list_devices(
+            db, device_type, topology_type, status, cursor, limit, spec,
+            from_cache=from_cache,
+        )
+        if cursor or next_cursor:
+            total_estimate = max(
+                await estimate_device_count(
+                    db, device_type, topology_type, status, spec, from_cache=from_cache
+                ),
+                len(devices),
+            )
+        else:
+            # Everything fits on this page, so the count is exact
+            total_estimate = len(devices)
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=str(exc))
+    response.headers.update(headers)
+    return DevicePage(items=devices, next_cursor=next_cursor, total_estimate=total_estimate)
+
+
+@router.get("/devices:search", response_model=DeviceSearchPage)
+async def search_inventory(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200),
+    device_type: DeviceType | None = Query(None),
+    topology_type: TopologyType | None = Query(None),
+    status: DeviceStatus | None = Query(None),
+    cursor: str | None = None,
+    limit: int = Query(20, ge=1, le=100),
+    if_none_match: str | None = Header(None),
+    db: AsyncSession = Depends(get_db),
+    _: dict = Depends(get_current_user_payload),
+):
+    """Ranked search over name, location and description, tolerant of typos.
+    Words match as prefixes, so partial input works for type-ahead. Conditional,
+    like the device listing."""
+    version, changed_at = await get_inventory_version(db)
+    headers = validators(inventory_etag(version), changed_at)
+    if not_modified(if_none_match, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    try:
+        rows, next_cursor = await search_devices(
+            db, q, device_type, topology_type, status, cursor, limit
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=str(exc))
+    response.headers.update(headers)
+    return DeviceSearchPage(
+        items=[
+            DeviceSearchResult(
+                **DeviceResponse.model_validate(device).model_dump(), score=score
+            )
+            for device, score in rows
+        ],
+        next_cursor=next_cursor,
+    )
 
 
 @router.post("/devices", response_model=DeviceResponse, status_code=status.HTTP_201_CREATED)
@@ -57,16 +155,72 @@ async def create_new_device(
     return device
 
 
+@router.post("/devices:batchGet", response_model=DeviceBatchResponse)
+async def batch_get_devices(
+    body: DeviceBatchGet,
+    db: AsyncSession = Depends(get_db),
+    _: dict = Depends(get_current_user_payload),
+):
+    """Fetch many devices in one query. Unknown IDs are reported in `missing`."""
+    devices = await get_devices_by_ids(db, body.ids)
+    found = {device.id for device in devices}
+    missing = [device_id for device_id in dict.fromkeys(body.ids) if device_id not in found]
+    return DeviceBatchResponse(devices=devices, missing=missing)
+
+
+@router.post("/devices:batchSetStatus", response_model=DeviceStatusBatchResponse)
+async def batch_update_device_status_internal(
+    body: DeviceStatusBatchUpdate,
+    db: AsyncSession = Depends(get_db),
+    x_internal_token: str = Header(...),
+):
+    """Update many device statuses at once. Internal endpoint, guarded by token."""
+    _check_internal_token(x_internal_token)
+    # Later entries for the same device win, matching sequential single updates
+    updates = {item.device_id: item.status for item in body.updates}
+    updated = await set_device_statuses(db, updates)
+    return DeviceStatusBatchResponse(
+        results=[
+            DeviceStatusBatchResult(
+                device_id=device_id, status=status, updated=device_id in updated
+            )
+            for device_id, status in updates.items()
+        ]
+    )
+
+
+@router.get("/devices:snapshot", response_model=DeviceSnapshotResponse)
+async def get_device_snapshot_internal(
+    db: AsyncSession = Depends(get_db),
+    x_internal_token: str = Header(...),
+):
+    """Compact view of every device for read-models. Internal endpoint, guarded by token."""
+    _check_internal_token(x_internal_token)
+    return DeviceSnapshotResponse(devices=await list_device_summaries(db))
+
+
 @router.get("/devices/{device_id}", response_model=DeviceResponse)
 async def get_device_by_id(
+    response: Response,
     device_id: uuid.UUID,
+    if_none_match: str | None = Header(None),
     db: AsyncSession = Depends(get_db),
     _: dict = Depends(get_current_user_payload),
 ):
-    """Get a single device. Available to all authenticated users."""
-    device = await get_device(db, device_id)
+    """Get a single device. Available to all authenticated users. Conditional:
+    answers 304 to an If-None-Match of the device's current ETag."""
+    inventory_version, _ = await get_inventory_version(db)
+    from_cache = device_cache.serves(inventory_version)
+    current = await get_device_version(db, device_id, from_cache)
+    if current and not_modified(if_none_match, device_etag(current.version)):
+        return Response(
+            status_code=304,
+            headers=validators(device_etag(current.version), current.updated_at),
+        )
+    device = await get_device(db, device_id, from_cache)
     if not device:
         raise HTTPException(status_code=404, detail="Device not found")
+    response.headers.update(validators(device_etag(device.version), device.updated_at))
     return device
 
 
@@ -112,8 +266,7 @@ async def update_device_status_internal(
     x_internal_token: str = Header(...),
 ):
     """Update device status. Internal service-to-service endpoint, guarded by token."""
-    if not settings.internal_api_token or x_internal_token != settings.internal_api_token:
-        raise HTTPException(status_code=403, detail="Invalid internal token")
+    _check_internal_token(x_internal_token)
     device = await set_device_status(db, device_id, body.status)
     if not device:
         raise HTTPException(status_code=404, detail="Device not found")
@@ -2,8 +2,9 @@ import uuid
 from datetime import datetime
 from typing import Any
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, computed_field
 
+from app.conditional import device_etag
 from app.models.device import DeviceStatus, DeviceType, TopologyType
 
 
@@ -36,7 +37,76 @@ class DeviceResponse(BaseModel):
     location: str | None
     specs: dict[str, Any] | None
     description: str | None
+    version: int
     created_at: datetime
     updated_at: datetime
 
     model_config = {"from_attributes": True}
+
+    @computed_field
+    @property
+    def etag(self) -> str:
+        """The ETag GET /devices/{id} serves for this version of the device."""
+        return device_etag(self.version)
+
+
+class DevicePage(BaseModel):
+    items: list[DeviceResponse]
+    # Pass back as ?cursor= for the next page; null on the last page
+    next_cursor: str | None = None
+    # Approximate number of devices matching the filters, from planner statistics
+    total_estimate: int
+
+
+class DeviceSearchResult(DeviceResponse):
+    # Relevance; higher is better, comparable within one search only
+    score: float
+
+
+class DeviceSearchPage(BaseModel):
+    items: list[DeviceSearchResult]
+    # Pass back as ?cursor= for the next page; null on the last page
+    next_cursor: str | None = None
+
+
+class DeviceBatchGet(BaseModel):
+    ids: list[uuid.UUID] = Field(..., min_length=1, max_length=500)
+
+
+class DeviceBatchResponse(BaseModel):
+    devices: list[DeviceResponse]
+    missing: list[uuid.UUID]
+
+
+class DeviceStatusBatchItem(BaseModel):
+    device_id: uuid.UUID
+    status: DeviceStatus
+
+
+class DeviceStatusBatchUpdate(BaseModel):
+    updates: list[DeviceStatusBatchItem] = Field(..., min_length=1, max_length=1000)
+
+
+class DeviceStatusBatchResult(BaseModel):
+    device_id: uuid.UUID
+    status: DeviceStatus
+    updated: bool
+
+
+class DeviceStatusBatchResponse(BaseModel):
+    results: list[DeviceStatusBatchResult]
+
+
+class DeviceSummary(BaseModel):
+    id: uuid.UUID
+    name: str
+    device_type: DeviceType
+    topology_type: TopologyType
+    status: DeviceStatus
+    version: int
+
+    model_config = {"from_attributes": True}
+
+
+class DeviceSnapshotResponse(BaseModel):
+    devices: list[DeviceSummary]
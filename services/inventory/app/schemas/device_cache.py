@@ -0,0 +1,22 @@
+from datetime import datetime
+
+from pydantic import BaseModel
+
+
+class DeviceCacheStatus(BaseModel):
+    enabled: bool
+    # Loaded and following changes; reads at inventory_version come from memory
+    serving: bool
+    # The catalog outgrew device_cache_max_bytes, so nothing is cached
+    over_budget: bool
+    inventory_version: int | None
+    devices: int
+    approximate_bytes: int
+    max_bytes: int
+    # Device lookups and listings served from memory, and those that went to the database
+    hits: int
+    misses: int
+    hit_ratio: float | None
+    reloads: int
+    loaded_at: datetime | None
+    last_event_at: datetime | None
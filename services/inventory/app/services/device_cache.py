@@ -0,0 +1,353 @@
+"""
+In-process cache of the device table, serving device reads from memory.
+
+Entries are immutable snapshots of every device, grouped by (device_type,
+topology_type, status) and kept in (created_at, id) order, so a page of a filtered
+listing is a merge of the matching groups from the cursor on.
+
+The cache is consistent with the database as of a known inventory version
+(app.models.inventory_version) and only answers reads made at that version: the
+caller reads the current version first, a single-row lookup it makes for ETags
+anyway, and goes to the database when the cache is behind. Every write bumps the
+version once and announces the devices it touched, with the new version, on
+NATS. Each replica reloads just those devices and moves its version forward
+through consecutive versions only, so no change is ever skipped; an event that
+arrives early waits for the ones before it. The replica that wrote applies its
+own change right after the commit, so it reads its writes. Core NATS is
+at-most-once, so a replica still behind after ``device_cache_resync_seconds``
+reloads the whole table.
+
+Memory is bounded by ``device_cache_max_bytes``, approximately: listings need
+every device, so a catalog larger than that is not cached at all. Listings with
+spec filters stay on the database, where the GIN index on specs answers them
+without visiting every device.
+"""
+
+import asyncio
+import heapq
+import itertools
+import json
+import logging
+import uuid
+from bisect import bisect_left
+from collections.abc import Iterator
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.events import DEVICE_EVENTS_SUBJECT
+from app.models.device import Device, DeviceStatus, DeviceType, TopologyType
+from app.models.inventory_version import InventoryVersion
+from app.utils.time import as_utc, utcnow
+
+logger = logging.getLogger(__name__)
+
+# Rough per-device cost of the snapshot, its fields and its index entries, in bytes
+_ENTRY_OVERHEAD = 600
+
+
+@dataclass(frozen=True, slots=True)
+class CachedDevice:
+    """A device as of the cache's version, readable wherever a Device is."""
+
+    id: uuid.UUID
+    name: str
+    device_type: DeviceType
+    topology_type: TopologyType
+    status: DeviceStatus
+    location: str | None
+    specs: dict[str, Any] | None
+    description: str | None
+    version: int
+    created_at: datetime
+    updated_at: datetime
+
+    @classmethod
+    def from_device(cls, device: Device) -> "CachedDevice":
+        return cls(
+            id=device.id,
+            name=device.name,
+            device_type=device.device_type,
+            topology_type=device.topology_type,
+            status=device.status,
+            location=device.location,
+            specs=device.specs,
+            description=device.description,
+            version=device.version,
+            created_at=as_utc(device.created_at),
+            updated_at=as_utc(device.updated_at),
+        )
+
+    @property
+    def key(self) -> tuple[datetime, uuid.UUID]:
+        return self.created_at, self.id
+
+    @property
+    def group(self) -> tuple[DeviceType, TopologyType, DeviceStatus]:
+        return self.device_type, self.topology_type, self.status
+
+    def approximate_size(self) -> int:
+        text = len(self.name) + len(self.location or "") + len(self.description or "")
+        specs = len(json.dumps(self.specs)) if self.specs else 0
+        return _ENTRY_OVERHEAD + text + specs
+
+
+class _Group:
+    """Devices sharing type, topology and status, in ascending (created_at, id)."""
+
+    __slots__ = ("keys", "devices")
+
+    def __init__(self) -> None:
+        self.keys: list[tuple[datetime, uuid.UUID]] = []
+        self.devices: list[CachedDevice] = []
+
+    def add(self, device: CachedDevice) -> None:
+        index = bisect_left(self.keys, device.key)
+        self.keys.insert(index, device.key)
+        self.devices.insert(index, device)
+
+    def remove(self, device: CachedDevice) -> None:
+        index = bisect_left(self.keys, device.key)
+        del self.keys[index]
+        del self.devices[index]
+
+    def before(self, key: tuple[datetime, uuid.UUID] | None) -> Iterator[CachedDevice]:
+        """Newest first, starting after ``key`` (from the newest when None)."""
+        end = bisect_left(self.keys, key) if key is not None else len(self.keys)
+        return (self.devices[index] for index in range(end - 1, -1, -1))
+
+
+class DeviceCache:
+    def __init__(
+        self,
+        session_factory: async_sessionmaker = AsyncSessionLocal,
+        enabled: bool = settings.device_cache_enabled,
+        max_bytes: int = settings.device_cache_max_bytes,
+        resync_seconds: float = settings.device_cache_resync_seconds,
+    ) -> None:
+        self._session_factory = session_factory
+        self._enabled = enabled
+        self._max_bytes = max_bytes
+        self._resync_after = timedelta(seconds=resync_seconds)
+        # Serializes loads and applied changes
+        self._lock = asyncio.Lock()
+        # Inventory version the contents are consistent with; None while not serving
+        self._version: int | None = None
+        # Versions applied out of order, waiting for the ones before them
+        self._pending: set[int] = set()
+        self._devices: dict[uuid.UUID, CachedDevice] = {}
+        self._groups: dict[tuple, _Group] = {}
+        self._bytes = 0
+        self._over_budget = False
+        # Set by the first load; a cache never started (tests, scripts) stays out of the way
+        self._started = False
+        # First read that found the cache behind, since it last moved forward
+        self._behind_since: datetime | None = None
+        self._resync_task: asyncio.Task | None = None
+        self._loaded_at: datetime | None = None
+        self._last_event_at: datetime | None = None
+        self._hits = 0
+        self._misses = 0
+        self._reloads = 0
+
+    async def attach_nats(self, nc) -> None:
+        """Subscribe to device events from every replica; call before the first load."""
+        if not self._enabled:
+            return
+        await nc.subscribe(f"{DEVICE_EVENTS_SUBJECT}.>", cb=self._on_event)
+
+    async def _on_event(self, msg) -> None:
+        try:
+            data = json.loads(msg.data)
+            if data["event"] == "devices.changed":
+                device_ids = [uuid.UUID(d["id"]) for d in data["devices"]]
+            else:
+                device_ids = [uuid.UUID(data["id"])]
+            self._last_event_at = utcnow()
+            await self.apply(device_ids, data["inventory_version"])
+        except Exception:
+            logger.warning("Failed to apply device event to the cache", exc_info=True)
+
+    def _clear(self) -> None:
+        self._version = None
+        self._pending = set()
+        self._devices = {}
+        self._groups = {}
+        self._bytes = 0
+
+    def _put(self, device: CachedDevice) -> None:
+        self._devices[device.id] = device
+        self._groups.setdefault(device.group, _Group()).add(device)
+        self._bytes += device.approximate_size()
+
+    def _discard(self, device_id: uuid.UUID) -> None:
+        device = self._devices.pop(device_id, None)
+        if device is not None:
+            self._groups[device.group].remove(device)
+            self._bytes -= device.approximate_size()
+
+    def _check_budget(self) -> bool:
+        if self._bytes <= self._max_bytes:
+            return True
+        logger.warning(
+            "Device catalog is about %d bytes, over the cache budget of %d; "
+            "device reads will use the database",
+            self._bytes, self._max_bytes,
+        )
+        self._over_budget = True
+        self._clear()
+        return False
+
+    async def load(self) -> bool:
+        """Replace the contents with every device; return whether the cache now serves."""
+        if not self._enabled or self._over_budget:
+            return False
+        self._started = True
+        async with self._lock:
+            async with self._session_factory() as db:
+                # Version first: the rows read after it are at least that new
+                version = await db.scalar(
+                    select(InventoryVersion.version).where(InventoryVersion.id == 1)
+                )
+                devices = [
+                    CachedDevice.from_device(device)
+                    for device in (await db.execute(select(Device))).scalars()
+                ]
+            self._clear()
+            # In key order, every insert is an append
+            for device in sorted(devices, key=lambda device: device.key):
+                self._put(device)
+            if not self._check_budget():
+                return False
+            self._version = version
+            self._behind_since = None
+            self._loaded_at = utcnow()
+            self._reloads += 1
+        logger.info("Device cache loaded: %d devices at version %d", len(devices), version)
+        return True
+
+    async def apply(self, device_ids: list[uuid.UUID], inventory_version: int) -> None:
+        """Reload the devices a write at ``inventory_version`` touched. Call once it
+        has committed; repeats and versions already covered are ignored."""
+        if self._version is None:
+            return
+        async with self._lock:
+            if (
+                self._version is None
+                or inventory_version <= self._version
+                or inventory_version in self._pending
+            ):
+                return
+            async with self._session_factory() as db:
+                result = await db.execute(select(Device).where(Device.id.in_(device_ids)))
+                found = {device.id: CachedDevice.from_device(device) for device in result.scalars()}
+            for device_id in device_ids:
+                self._discard(device_id)
+                if device_id in found:
+                    self._put(found[device_id])
+            if not self._check_budget():
+                return
+            self._pending.add(inventory_version)
+            while self._version + 1 in self._pending:
+                self._version += 1
+                self._pending.remove(self._version)
+                self._behind_since = None
+
+    def serves(self, inventory_version: int) -> bool:
+        """Whether a read made at ``inventory_version`` can come from the cache.
+
+        Counts a hit or a miss, so ask once per request and pass the answer on. A
+        cache behind the database for longer than the resync interval starts a full
+        reload in the background.
+        """
+        if not self._enabled or self._over_budget or not self._started:
+            return False
+        if self._version == inventory_version:
+            self._hits += 1
+            return True
+        self._misses += 1
+        if self._version is None or inventory_version > self._version:
+            now = utcnow()
+            if self._behind_since is None:
+                self._behind_since = now
+            if now - self._behind_since >= self._resync_after and (
+                self._resync_task is None or self._resync_task.done()
+            ):
+                self._behind_since = None
+                self._resync_task = asyncio.create_task(self._resync())
+        return False
+
+    async def _resync(self) -> None:
+        try:
+            await self.load()
+        except Exception:
+            logger.warning("Device cache reload failed", exc_info=True)
+
+    def get(self, device_id: uuid.UUID) -> CachedDevice | None:
+        return self._devices.get(device_id)
+
+    def _matching(
+        self,
+        device_type: DeviceType | None,
+        topology_type: TopologyType | None,
+        status: DeviceStatus | None,
+    ) -> list[_Group]:
+        return [
+            group
+            for (group_type, group_topology, group_status), group in self._groups.items()
+            if (device_type is None or group_type == device_type)
+            and (topology_type is None or group_topology == topology_type)
+            and (status is None or group_status == status)
+        ]
+
+    def page(
+        self,
+        device_type: DeviceType | None,
+        topology_type: TopologyType | None,
+        status: DeviceStatus | None,
+        before: tuple[datetime, uuid.UUID] | None,
+        limit: int,
+    ) -> list[CachedDevice]:
+        """Up to ``limit`` matching devices, newest first, after the ``before`` key."""
+        merged = heapq.merge(
+            *(group.before(before) for group in self._matching(device_type, topology_type, status)),
+            key=lambda device: device.key,
+            reverse=True,
+        )
+        return list(itertools.islice(merged, limit))
+
+    def count(
+        self,
+        device_type: DeviceType | None,
+        topology_type: TopologyType | None,
+        status: DeviceStatus | None,
+    ) -> int:
+        return sum(
+            len(group.devices) for group in self._matching(device_type, topology_type, status)
+        )
+
+    def status(self) -> dict:
+        lookups = self._hits + self._misses
+        return {
+            "enabled": self._enabled,
+            "serving": self._version is not None,
+            "over_budget": self._over_budget,
+            "inventory_version": self._version,
+            "devices": len(self._devices),
+            "approximate_bytes": self._bytes,
+            "max_bytes": self._max_bytes,
+            "hits": self._hits,
+            "misses": self._misses,
+            "hit_ratio": round(self._hits / lookups, 4) if lookups else None,
+            "reloads": self._reloads,
+            "loaded_at": self._loaded_at,
+            "last_event_at": self._last_event_at,
+        }
+
+
+device_cache = DeviceCache()
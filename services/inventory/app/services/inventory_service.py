@@ -1,10 +1,87 @@
+import base64
+import json
+import re
 import uuid
+from datetime import datetime
 
-from sqlalchemy import select
+from sqlalchemy import (
+    ColumnElement,
+    Executable,
+    Float,
+    Select,
+    Text,
+    and_,
+    case,
+    cast,
+    column,
+    func,
+    literal,
+    or_,
+    select,
+    tuple_,
+    update,
+)
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement
 
-from app.models.device import Device, DeviceStatus, DeviceType, TopologyType
+from app.config import settings
+from app.events import device_events
+from app.models.device import SEARCH_CONFIG, Device, DeviceStatus, DeviceType, TopologyType
+from app.models.inventory_version import InventoryVersion
 from app.schemas.device import DeviceCreate, DeviceUpdate
+from app.services.device_cache import CachedDevice, device_cache
+from app.services.spec_filters import spec_filter_clauses
+from app.utils.time import as_utc, utcnow
+
+
+def _dialect(db: AsyncSession) -> str:
+    return db.bind.dialect.name if db.bind else ""
+
+
+class _Explain(Executable, ClauseElement):
+    """``EXPLAIN (FORMAT JSON)`` of a statement, with its parameters bound as usual."""
+
+    inherit_cache = False
+
+    def __init__(self, statement: Select) -> None:
+        self.statement = statement
+
+
+@compiles(_Explain, "postgresql")
+def _compile_explain(element: _Explain, compiler, **kw) -> str:
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.statement, **kw)
+
+
+def encode_cursor(created_at: datetime, device_id: uuid.UUID) -> str:
+    raw = f"{as_utc(created_at).isoformat()}|{device_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, uuid.UUID]:
+    try:
+        created_at, device_id = base64.urlsafe_b64decode(cursor).decode().split("|")
+        return as_utc(datetime.fromisoformat(created_at)), uuid.UUID(device_id)
+    except ValueError as exc:
+        raise ValueError("Invalid cursor") from exc
+
+
+def _device_filters(
+    db: AsyncSession,
+    device_type: DeviceType | None,
+    topology_type: TopologyType | None,
+    status: DeviceStatus | None,
+    spec_filters: list[str] | None,
+) -> list[ColumnElement[bool]]:
+    clauses = spec_filter_clauses(spec_filters or [], _dialect(db))
+    if device_type:
+        clauses.append(Device.device_type == device_type)
+    if topology_type:
+        clauses.append(Device.topology_type == topology_type)
+    if status:
+        clauses.append(Device.status == status)
+    return clauses
 
 
 async def list_devices(
@@ -12,22 +89,222 @@ async def list_devices(
     device_type: DeviceType | None = None,
     topology_type: TopologyType | None = None,
     status: DeviceStatus | None = None,
-    skip: int = 0,
+    cursor: str | None = None,
     limit: int = 100,
-) -> list[Device]:
-    query = select(Device)
+    spec_filters: list[str] | None = None,
+    from_cache: bool = False,
+) -> tuple[list[Device | CachedDevice], str | None]:
+    """One page of devices matching the filters, newest first, and the cursor for
+    the next. ``spec_filters`` are expressions of app.services.spec_filters; an
+    invalid one, or an invalid cursor, raises ValueError.
+
+    Keyset pagination on (created_at, id), backed by the listing index for the
+    combination of type, topology and status filters given (LISTING_INDEXES), so
+    deep pages cost the same as the first. Without spec filters, served from
+    app.services.device_cache when ``from_cache`` is set: the caller asks
+    ``device_cache.serves()`` once per request, at the inventory version it read.
+    """
+    if from_cache and not spec_filters:
+        devices = device_cache.page(
+            device_type, topology_type, status,
+            decode_cursor(cursor) if cursor else None,
+            limit + 1,
+        )
+    else:
+        query = select(Device).where(
+            *_device_filters(db, device_type, topology_type, status, spec_filters)
+        )
+        if cursor:
+            created_at, device_id = decode_cursor(cursor)
+            query = query.where(
+                tuple_(Device.created_at, Device.id) < tuple_(created_at, device_id)
+            )
+        result = await db.execute(
+            query.order_by(Device.created_at.desc(), Device.id.desc()).limit(limit + 1)
+        )
+        devices = list(result.scalars().all())
+    if len(devices) <= limit:
+        return devices, None
+    last = devices[limit - 1]
+    return devices[:limit], encode_cursor(last.created_at, last.id)
+
+
+async def estimate_device_count(
+    db: AsyncSession,
+    device_type: DeviceType | None = None,
+    topology_type: TopologyType | None = None,
+    status: DeviceStatus | None = None,
+    spec_filters: list[str] | None = None,
+    from_cache: bool = False,
+) -> int:
+    """Roughly how many devices match the filters, for counts in listings.
+
+    On PostgreSQL this is the planner's row estimate for the filtered query, read
+    from table statistics without touching any rows; it is as fresh as the last
+    (auto)analyze and can be well off for spec filters. SQLite (tests) counts, and
+    so does the device cache, without spec filters, with ``from_cache`` (see
+    list_devices).
+    """
+    if from_cache and not spec_filters:
+        return device_cache.count(device_type, topology_type, status)
+    query = select(Device.id).where(
+        *_device_filters(db, device_type, topology_type, status, spec_filters)
+    )
+    if _dialect(db) != "postgresql":
+        return await db.scalar(select(func.count()).select_from(query.subquery()))
+    plan = (await db.execute(_Explain(query))).scalar_one()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def encode_search_cursor(score: float, device_id: uuid.UUID) -> str:
+    raw = f"{score!r}|{device_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_search_cursor(cursor: str) -> tuple[float, uuid.UUID]:
+    try:
+        score, device_id = base64.urlsafe_b64decode(cursor).decode().split("|")
+        return float(score), uuid.UUID(device_id)
+    except ValueError as exc:
+        raise ValueError("Invalid cursor") from exc
+
+
+async def search_devices(
+    db: AsyncSession,
+    q: str,
+    device_type: DeviceType | None = None,
+    topology_type: TopologyType | None = None,
+    status: DeviceStatus | None = None,
+    cursor: str | None = None,
+    limit: int = 20,
+) -> tuple[list[tuple[Device, float]], str | None]:
+    """One page of devices matching ``q`` as (device, score), best first, plus the
+    next cursor.
+
+    On PostgreSQL every word must match name, location or description as a word
+    prefix (so partial input works for type-ahead), through the devices' search
+    tsvector. Failing that, a close enough trigram match of the whole text still
+    counts, to absorb typos. Both go through GIN indexes. Scores are ts_rank_cd
+    (name hits weigh most, then location) plus trigram word similarity.
+
+    Every match is scored, and only the ``device_search_max_candidates`` best of
+    them (by score, then id) are paged through. This bounds how deep a single
+    typed letter that matches most of the inventory can be paged.
+    """
+    words = re.findall(r"\w+", q.lower())
+    if not words:
+        raise ValueError("Search text must contain a letter or digit")
+
+    if _dialect(db) == "postgresql":
+        search_vector = column("search_vector", TSVECTOR)
+        search_text = column("search_text", Text)
+        tsquery = func.to_tsquery(SEARCH_CONFIG, " & ".join(f"{word}:*" for word in words))
+        phrase = " ".join(words)
+        await db.execute(
+            select(
+                func.set_config(
+                    "pg_trgm.word_similarity_threshold",
+                    str(settings.device_search_similarity),
+                    True,
+                )
+            )
+        )
+        matched = or_(
+            search_vector.op("@@")(tsquery), literal(phrase).op("<%")(search_text)
+        )
+        score = cast(
+            func.ts_rank_cd(search_vector, tsquery) + func.word_similarity(phrase, search_text),
+            Float,
+        )
+    else:
+        # SQLite (tests): every word must occur somewhere; words in the name rank higher
+        text = func.lower(
+            Device.name + " " + func.coalesce(Device.location, "") + " "
+            + func.coalesce(Device.description, "")
+        )
+        matched = and_(*(text.contains(word) for word in words))
+        score = cast(
+            sum(
+                case((func.lower(Device.name).contains(word), 1.0), else_=0.5)
+                for word in words
+            ) / len(words),
+            Float,
+        )
+
+    candidates = select(Device.id).where(matched)
     if device_type:
-        query = query.where(Device.device_type == device_type)
+        candidates = candidates.where(Device.device_type == device_type)
     if topology_type:
-        query = query.where(Device.topology_type == topology_type)
+        candidates = candidates.where(Device.topology_type == topology_type)
     if status:
-        query = query.where(Device.status == status)
-    query = query.offset(skip).limit(limit).order_by(Device.created_at.desc())
-    result = await db.execute(query)
-    return list(result.scalars().all())
+        candidates = candidates.where(Device.status == status)
+    # Ordered like the pages themselves, so the cap keeps the best matches and the
+    # same rows come back for every page as long as the devices do not change
+    candidates = candidates.order_by(score.desc(), Device.id).limit(
+        settings.device_search_max_candidates
+    )
+
+    query = select(Device, score.label("score")).where(Device.id.in_(candidates))
+    if cursor:
+        last_score, last_id = decode_search_cursor(cursor)
+        query = query.where(
+            or_(score < last_score, and_(score == last_score, Device.id > last_id))
+        )
+    result = await db.execute(query.order_by(score.desc(), Device.id).limit(limit + 1))
+    rows = [(device, score) for device, score in result.all()]
+    if len(rows) <= limit:
+        return rows, None
+    last_device, last_score = rows[limit - 1]
+    return rows[:limit], encode_search_cursor(last_score, last_device.id)
 
 
-async def get_device(db: AsyncSession, device_id: uuid.UUID) -> Device | None:
+async def get_inventory_version(db: AsyncSession) -> tuple[int, datetime]:
+    """The inventory version and when it last changed.
+
+    Read it before the devices it vouches for: rows read afterwards are at least
+    that new, so a stale response never carries a current version.
+    """
+    row = (
+        await db.execute(
+            select(InventoryVersion.version, InventoryVersion.updated_at).where(
+                InventoryVersion.id == 1
+            )
+        )
+    ).one()
+    return row.version, row.updated_at
+
+
+async def _bump_inventory_version(db: AsyncSession) -> int:
+    """Count a device write and return the new version; call it inside the write's
+    transaction."""
+    return await db.scalar(
+        update(InventoryVersion)
+        .where(InventoryVersion.id == 1)
+        .values(version=InventoryVersion.version + 1, updated_at=utcnow())
+        .returning(InventoryVersion.version)
+    )
+
+
+async def get_device_version(db: AsyncSession, device_id: uuid.UUID, from_cache: bool = False):
+    """A device's (version, updated_at), without loading the rest of the row. From
+    the device cache with ``from_cache`` (see list_devices)."""
+    if from_cache:
+        return device_cache.get(device_id)
+    result = await db.execute(
+        select(Device.version, Device.updated_at).where(Device.id == device_id)
+    )
+    return result.one_or_none()
+
+
+async def get_device(
+    db: AsyncSession, device_id: uuid.UUID, from_cache: bool = False
+) -> Device | CachedDevice | None:
+    """The device, from the device cache with ``from_cache`` (see list_devices).
+    Otherwise the row itself, for updating."""
+    if from_cache:
+        return device_cache.get(device_id)
     result = await db.execute(select(Device).where(Device.id == device_id))
     return result.scalar_one_or_none()
 
@@ -37,11 +314,25 @@ async def get_devices_by_ids(db: AsyncSession, device_ids: list[uuid.UUID]) -> l
     return list(result.scalars().all())
 
 
+async def list_device_summaries(db: AsyncSession) -> list:
+    """Every device's mirrored fields, for read-model snapshots in other services."""
+    result = await db.execute(
+        select(
+            Device.id, Device.name, Device.device_type, Device.topology_type, Device.status,
+            Device.version,
+        )
+    )
+    return list(result.all())
+
+
 async def create_device(db: AsyncSession, data: DeviceCreate) -> Device:
     device = Device(**data.model_dump())
     db.add(device)
+    inventory_version = await _bump_inventory_version(db)
     await db.commit()
     await db.refresh(device)
+    await device_cache.apply([device.id], inventory_version)
+    await device_events.changed([device], inventory_version)
     return device
 
 
@@ -54,8 +345,12 @@ async def update_device(
     update_data = data.model_dump(exclude_unset=True)
     for field, value in update_data.items():
         setattr(device, field, value)
+    device.version += 1
+    inventory_version = await _bump_inventory_version(db)
     await db.commit()
     await db.refresh(device)
+    await device_cache.apply([device.id], inventory_version)
+    await device_events.changed([device], inventory_version)
     return device
 
 
@@ -63,8 +358,12 @@ async def delete_device(db: AsyncSession, device_id: uuid.UUID) -> bool:
     device = await get_device(db, device_id)
     if not device:
         return False
+    version = device.version + 1
     await db.delete(device)
+    inventory_version = await _bump_inventory_version(db)
     await db.commit()
+    await device_cache.apply([device_id], inventory_version)
+    await device_events.deleted(device_id, version, inventory_version)
     return True
 
 
@@ -75,6 +374,44 @@ async def set_device_status(
     if not device:
         return None
     device.status = status
+    device.version += 1
+    inventory_version = await _bump_inventory_version(db)
     await db.commit()
     await db.refresh(device)
+    await device_cache.apply([device.id], inventory_version)
+    await device_events.changed([device], inventory_version)
     return device
+
+
+async def set_device_statuses(
+    db: AsyncSession, updates: dict[uuid.UUID, DeviceStatus]
+) -> set[uuid.UUID]:
+    """Apply many status changes with one UPDATE per distinct status.
+
+    Returns the IDs that were actually updated; unknown IDs are simply absent.
+    """
+    by_status: dict[DeviceStatus, list[uuid.UUID]] = {}
+    for device_id, status in updates.items():
+        by_status.setdefault(status, []).append(device_id)
+
+    changed = []
+    for status, device_ids in by_status.items():
+        result = await db.execute(
+            update(Device)
+            .where(Device.id.in_(device_ids))
+            .values(status=status, version=Device.version + 1)
+            .returning(
+                Device.id, Device.name, Device.device_type, Device.topology_type,
+                Device.status, Device.version,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        changed.extend(result.all())
+    if not changed:
+        await db.commit()
+        return set()
+    inventory_version = await _bump_inventory_version(db)
+    await db.commit()
+    await device_cache.apply([row.id for row in changed], inventory_version)
+    await device_events.changed(changed, inventory_version)
+    return {row.id for row in changed}
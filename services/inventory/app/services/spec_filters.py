@@ -0,0 +1,150 @@
+"""
+Filters over device specs, e.g. ``GET /devices?spec=ports>=48&spec=vendor=Juniper``.
+
+Each filter is ``<key><op><value>``, where key is a spec key, dotted for nesting
+(``cpu.cores``), and op is one of:
+
+- ``=``   equals a scalar; the value is read as JSON when it parses (``16``,
+  ``true``, ``"16"``) and as a plain string otherwise
+- ``@>``  contains a JSON value, as PostgreSQL's jsonb containment
+  (``features@>["bgp"]``, ``uplink@>{"speed": "10G"}``)
+- ``>``, ``>=``, ``<``, ``<=``  numeric range; only numeric spec values match
+
+On PostgreSQL specs is JSONB with a GIN (jsonb_ops) index. Equality and
+containment compile to ``@>``, which the index answers. A range compiles to a
+key-existence test the index answers, plus a jsonpath comparison checked on the
+devices it leaves. SQLite (tests) gets the same semantics through its JSON
+functions, without an index.
+"""
+
+import json
+import math
+import re
+from dataclasses import dataclass
+from typing import Any
+
+from sqlalchemy import ColumnElement, and_, cast, exists, func, select, type_coerce
+from sqlalchemy.dialects.postgresql import JSONB, JSONPATH
+
+from app.models.device import Device
+
+_FILTER = re.compile(
+    r"^(?P<key>[A-Za-z0-9_-]+(?:\.[A-Za-z0-9_-]+)*)(?P<op>>=|<=|@>|=|>|<)(?P<value>.*)$"
+)
+_RANGE_OPS = (">", ">=", "<", "<=")
+
+
+@dataclass(frozen=True)
+class SpecFilter:
+    path: tuple[str, ...]
+    op: str
+    value: Any
+
+
+def parse_spec_filter(expression: str) -> SpecFilter:
+    """Parse one filter expression; raises ValueError with the reason."""
+    match = _FILTER.match(expression)
+    if not match:
+        raise ValueError(
+            f"Invalid spec filter {expression!r}: expected <key><op><value> with op one of "
+            "=, @>, >, >=, <, <="
+        )
+    path, op, raw = tuple(match["key"].split(".")), match["op"], match["value"]
+    if op in _RANGE_OPS:
+        try:
+            value = float(raw)
+        except ValueError:
+            value = math.nan
+        if not math.isfinite(value):
+            raise ValueError(f"Spec filter {expression!r} needs a number")
+        return SpecFilter(path, op, int(value) if value.is_integer() else value)
+    if op == "@>":
+        try:
+            return SpecFilter(path, op, json.loads(raw))
+        except ValueError:
+            raise ValueError(f"Spec filter {expression!r} needs a JSON value") from None
+    try:
+        value = json.loads(raw)
+    except ValueError:
+        value = raw
+    if isinstance(value, (dict, list)):
+        raise ValueError(f"Spec filter {expression!r} compares a scalar; use @> for JSON")
+    return SpecFilter(path, op, value)
+
+
+def _nest(path: tuple[str, ...], value: Any) -> dict:
+    for key in reversed(path):
+        value = {key: value}
+    return value
+
+
+def _jsonpath(path: tuple[str, ...]) -> str:
+    return "$" + "".join(f'."{key}"' for key in path)
+
+
+def _postgresql_clause(spec: SpecFilter) -> ColumnElement[bool]:
+    specs = type_coerce(Device.specs, JSONB)
+    if spec.op not in _RANGE_OPS:
+        return specs.contains(_nest(spec.path, spec.value))
+    return and_(
+        specs.has_key(spec.path[0]),
+        # Strict mode: an array does not match for any of its elements, as on SQLite
+        specs.op("@@")(
+            cast(f"strict {_jsonpath(spec.path)} {spec.op} {spec.value!r}", JSONPATH)
+        ),
+    )
+
+
+def _sqlite_contains(path: tuple[str, ...], value: Any) -> ColumnElement[bool]:
+    """PostgreSQL containment semantics, spelled with SQLite's JSON functions."""
+    if isinstance(value, dict):
+        return and_(*(_sqlite_contains((*path, key), item) for key, item in value.items()))
+    location = _jsonpath(path)
+    if isinstance(value, list):
+        clauses = []
+        for item in value:
+            if isinstance(item, (dict, list)):
+                raise ValueError("Nested containment within arrays needs PostgreSQL")
+            elements = func.json_each(Device.specs, location).table_valued("value", "type")
+            clauses.append(
+                exists(
+                    select(1)
+                    .select_from(elements)
+                    .where(_sqlite_equals(elements.c.value, elements.c.type, item))
+                )
+            )
+        return and_(func.json_type(Device.specs, location) == "array", *clauses)
+    return _sqlite_equals(
+        func.json_extract(Device.specs, location), func.json_type(Device.specs, location), value
+    )
+
+
+def _sqlite_equals(element, element_type, value: Any) -> ColumnElement[bool]:
+    """A JSON element, given as SQLite's SQL value and json_type of it, equals ``value``."""
+    if value is None:
+        return element_type == "null"
+    if isinstance(value, bool):
+        return element_type == ("true" if value else "false")
+    if isinstance(value, (int, float)):
+        return and_(element_type.in_(("integer", "real")), element == value)
+    return and_(element_type == "text", element == value)
+
+
+def _sqlite_clause(spec: SpecFilter) -> ColumnElement[bool]:
+    if spec.op not in _RANGE_OPS:
+        return _sqlite_contains(spec.path, spec.value)
+    location = _jsonpath(spec.path)
+    value = func.json_extract(Device.specs, location)
+    compare = {
+        ">": value > spec.value,
+        ">=": value >= spec.value,
+        "<": value < spec.value,
+        "<=": value <= spec.value,
+    }[spec.op]
+    return and_(func.json_type(Device.specs, location).in_(("integer", "real")), compare)
+
+
+def spec_filter_clauses(expressions: list[str], dialect: str) -> list[ColumnElement[bool]]:
+    """WHERE clauses for filter expressions, all of which must hold."""
+    compile_clause = _postgresql_clause if dialect == "postgresql" else _sqlite_clause
+    return [compile_clause(parse_spec_filter(expression)) for expression in expressions]
@@ -0,0 +1,30 @@
+"""Per-device version counter for change events.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17 00:00:00.000000
+"""
+
+import os
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+_schema = os.environ.get("DB_SCHEMA") or None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "devices",
+        sa.Column("version", sa.Integer, nullable=False, server_default="1"),
+        schema=_schema,
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("devices", "version", schema=_schema)
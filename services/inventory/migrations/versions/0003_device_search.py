@@ -0,0 +1,55 @@
+"""Full-text and trigram search columns on devices.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17 00:00:00.000000
+"""
+
+import os
+
+from alembic import op
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+_schema = os.environ.get("DB_SCHEMA") or None
+_prefix = f"{_schema}." if _schema else ""
+
+# Copied from app.models.device at the time of writing; migrations must not change
+# when the model does
+_config = "'english'::regconfig"
+_search_vector = (
+    f"setweight(to_tsvector({_config}, coalesce(name, '')), 'A') || "
+    f"setweight(to_tsvector({_config}, coalesce(location, '')), 'B') || "
+    f"setweight(to_tsvector({_config}, coalesce(description, '')), 'C')"
+)
+_search_text = (
+    "coalesce(name, '') || ' ' || coalesce(location, '') || ' ' || coalesce(description, '')"
+)
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.execute(
+        f"ALTER TABLE {_prefix}devices "
+        f"ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ({_search_vector}) STORED, "
+        f"ADD COLUMN search_text text GENERATED ALWAYS AS ({_search_text}) STORED"
+    )
+    op.create_index(
+        "ix_devices_search_vector", "devices", ["search_vector"],
+        schema=_schema, postgresql_using="gin",
+    )
+    op.create_index(
+        "ix_devices_search_text", "devices", ["search_text"],
+        schema=_schema, postgresql_using="gin",
+        postgresql_ops={"search_text": "gin_trgm_ops"},
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_devices_search_text", "devices", schema=_schema)
+    op.drop_index("ix_devices_search_vector", "devices", schema=_schema)
+    op.drop_column("devices", "search_text", schema=_schema)
+    op.drop_column("devices", "search_vector", schema=_schema)
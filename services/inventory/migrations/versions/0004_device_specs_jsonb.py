@@ -0,0 +1,36 @@
+"""Store device specs as JSONB with a GIN index for spec filters.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17 00:00:00.000000
+"""
+
+import os
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+_schema = os.environ.get("DB_SCHEMA") or None
+
+
+def upgrade() -> None:
+    op.alter_column(
+        "devices", "specs",
+        type_=postgresql.JSONB, postgresql_using="specs::jsonb", schema=_schema,
+    )
+    op.create_index(
+        "ix_devices_specs", "devices", ["specs"], schema=_schema, postgresql_using="gin"
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_devices_specs", "devices", schema=_schema)
+    op.alter_column(
+        "devices", "specs", type_=sa.JSON, postgresql_using="specs::json", schema=_schema
+    )
@@ -0,0 +1,39 @@
+"""Index the device listing for keyset pagination under each filter combination.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17 00:00:00.000000
+"""
+
+import os
+
+from alembic import op
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+_schema = os.environ.get("DB_SCHEMA") or None
+
+# Equality filters of GET /devices, leading into the (created_at, id) sort order
+_INDEXES = {
+    "ix_devices_created": [],
+    "ix_devices_type_created": ["device_type"],
+    "ix_devices_topology_created": ["topology_type"],
+    "ix_devices_status_created": ["status"],
+    "ix_devices_type_topology_created": ["device_type", "topology_type"],
+    "ix_devices_type_status_created": ["device_type", "status"],
+    "ix_devices_topology_status_created": ["topology_type", "status"],
+    "ix_devices_type_topology_status_created": ["device_type", "topology_type", "status"],
+}
+
+
+def upgrade() -> None:
+    for name, columns in _INDEXES.items():
+        op.create_index(name, "devices", [*columns, "created_at", "id"], schema=_schema)
+
+
+def downgrade() -> None:
+    for name in reversed(_INDEXES):
+        op.drop_index(name, "devices", schema=_schema)
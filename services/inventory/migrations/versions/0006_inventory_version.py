@@ -0,0 +1,33 @@
+"""Inventory-wide version counter for conditional reads.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17 00:00:00.000000
+"""
+
+import os
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+_schema = os.environ.get("DB_SCHEMA") or None
+
+
+def upgrade() -> None:
+    table = op.create_table(
+        "inventory_version",
+        sa.Column("id", sa.Integer, primary_key=True, autoincrement=False),
+        sa.Column("version", sa.BigInteger, nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False),
+        schema=_schema,
+    )
+    op.execute(table.insert().values(id=1, version=1, updated_at=sa.func.now()))
+
+
+def downgrade() -> None:
+    op.drop_table("inventory_version", schema=_schema)
@@ -1,9 +1,15 @@
+import json
 import uuid
+from contextlib import contextmanager
+from datetime import timedelta
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 from app.database import Base, get_db
 from app.dependencies.auth import get_current_user_payload
+from app.events import device_events
 from app.main import app
+from app.services.device_cache import DeviceCache
 from httpx import ASGITransport, AsyncClient
 from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 
@@ -78,7 +84,7 @@ async def test_list_devices(client):
     await client.post("/devices", json=DEVICE_PAYLOAD)
     resp = await client.get("/devices")
     assert resp.status_code == 200
-    assert len(resp.json()) == 1
+    assert len(resp.json()["items"]) == 1
 
 
 @pytest.mark.asyncio
@@ -118,7 +124,7 @@ async def test_filter_by_topology_type(client):
     )
     resp = await client.get("/devices?topology_type=PHYSICAL")
     assert resp.status_code == 200
-    assert all(d["topology_type"] == "PHYSICAL" for d in resp.json())
+    assert all(d["topology_type"] == "PHYSICAL" for d in resp.json()["items"])
 
 
 @pytest.mark.asyncio
@@ -225,7 +231,7 @@ async def test_filter_by_status(client):
     await client.put(f"/devices/{device2_id}", json={"status": "OFFLINE"})
     resp = await client.get("/devices?status=AVAILABLE")
     assert resp.status_code == 200
-    devices = resp.json()
+    devices = resp.json()["items"]
     assert all(d["status"] == "AVAILABLE" for d in devices)
     assert len(devices) == 1
 
@@ -241,7 +247,7 @@ async def test_filter_by_device_type(client):
     )
     resp = await client.get("/devices?device_type=FIREWALL")
     assert resp.status_code == 200
-    devices = resp.json()
+    devices = resp.json()["items"]
     assert len(devices) == 1
     assert devices[0]["device_type"] == "FIREWALL"
 
@@ -252,16 +258,64 @@ async def test_pagination_limit(client):
         await client.post("/devices", json={**DEVICE_PAYLOAD, "name": f"FW-{i}"})
     resp = await client.get("/devices?limit=2")
     assert resp.status_code == 200
-    assert len(resp.json()) == 2
+    assert len(resp.json()["items"]) == 2
 
 
 @pytest.mark.asyncio
-async def test_pagination_skip(client):
-    for i in range(3):
+async def test_pagination_cursor(client):
+    for i in range(5):
         await client.post("/devices", json={**DEVICE_PAYLOAD, "name": f"FW-{i}"})
-    resp = await client.get("/devices?skip=2")
+    await client.post("/devices", json={**DEVICE_PAYLOAD, "name": "SW-0", "device_type": "SWITCH"})
+
+    names, cursor = [], None
+    while True:
+        params = {"device_type": "FIREWALL", "limit": 2, **({"cursor": cursor} if cursor else {})}
+        resp = await client.get("/devices", params=params)
+        assert resp.status_code == 200
+        page = resp.json()
+        assert page["total_estimate"] == 5
+        names += [d["name"] for d in page["items"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert names == [f"FW-{i}" for i in reversed(range(5))]
+
+    resp = await client.get("/devices", params={"cursor": "not-a-cursor"})
+    assert resp.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_conditional_get(client):
+    device = (await client.post("/devices", json=DEVICE_PAYLOAD)).json()
+    listing = await client.get("/devices")
+    etag = listing.headers["etag"]
+    assert listing.headers["last-modified"]
+    assert listing.headers["cache-control"] == "private, no-cache"
+
+    resp = await client.get("/devices", headers={"If-None-Match": etag})
+    assert resp.status_code == 304
+    assert resp.content == b""
+    assert resp.headers["etag"] == etag
+    # Another filter reads the same inventory version
+    resp = await client.get("/devices?status=OFFLINE", headers={"If-None-Match": f"W/{etag}"})
+    assert resp.status_code == 304
+
+    resp = await client.get(f"/devices/{device['id']}", headers={"If-None-Match": device["etag"]})
+    assert resp.status_code == 304
+
+    # Internal status changes are writes too
+    await client.post(
+        f"/devices/{device['id']}/status",
+        json={"status": "RESERVED"},
+        headers={"X-Internal-Token": "test-token"},
+    )
+    resp = await client.get("/devices", headers={"If-None-Match": etag})
     assert resp.status_code == 200
-    assert len(resp.json()) == 1
+    assert resp.headers["etag"] != etag
+    assert resp.json()["items"][0]["status"] == "RESERVED"
+    resp = await client.get(f"/devices/{device['id']}", headers={"If-None-Match": device["etag"]})
+    assert resp.status_code == 200
+    assert resp.headers["etag"] == resp.json()["etag"] != device["etag"]
 
 
 @pytest.mark.asyncio
@@ -283,7 +337,7 @@ async def test_combined_filters(client):
     )
     resp = await client.get("/devices?device_type=FIREWALL&topology_type=PHYSICAL")
     assert resp.status_code == 200
-    devices = resp.json()
+    devices = resp.json()["items"]
     assert len(devices) == 1
     assert devices[0]["device_type"] == "FIREWALL"
     assert devices[0]["topology_type"] == "PHYSICAL"
@@ -315,3 +369,315 @@ async def test_device_full_lifecycle(client):
     # GET to verify 404
     gone_resp = await client.get(f"/devices/{device_id}")
     assert gone_resp.status_code == 404
+
+
+# --- Batch lookup ---
+
+
+@pytest.mark.asyncio
+async def test_batch_get_devices(client):
+    first = (await client.post("/devices", json=DEVICE_PAYLOAD)).json()["id"]
+    second = (await client.post("/devices", json={**DEVICE_PAYLOAD, "name": "FW-02"})).json()["id"]
+    unknown = str(uuid.uuid4())
+    resp = await client.post("/devices:batchGet", json={"ids": [first, second, unknown]})
+    assert resp.status_code == 200
+    data = resp.json()
+    assert {d["id"] for d in data["devices"]} == {first, second}
+    assert data["missing"] == [unknown]
+
+
+@pytest.mark.asyncio
+async def test_batch_get_devices_empty(client):
+    resp = await client.post("/devices:batchGet", json={"ids": []})
+    assert resp.status_code == 422
+
+
+# --- Spec filters ---
+
+
+@pytest.mark.asyncio
+async def test_filter_by_specs(client):
+    async def add(name: str, specs: dict) -> None:
+        await client.post("/devices", json={**DEVICE_PAYLOAD, "name": name, "specs": specs})
+
+    await add("SW-48", {"ports": 48, "firmware": 10.3, "vendor": "Arista", "features": ["bgp"]})
+    await add("SW-24", {"ports": 24, "firmware": 10.2, "vendor": "Arista"})
+    await add("SW-STR", {"ports": "48", "firmware": 9.8, "vendor": "Juniper"})
+    await add(
+        "VM-16", {"cpu": {"vcpus": 16, "arch": "x86"}, "features": ["bgp", "ospf"], "ha": True}
+    )
+
+    async def names(*filters: str) -> set[str]:
+        resp = await client.get("/devices", params={"spec": list(filters)})
+        assert resp.status_code == 200, resp.text
+        return {d["name"] for d in resp.json()["items"]}
+
+    assert await names("ports>=48", "firmware>=10.2") == {"SW-48"}
+    assert await names("ports<48") == {"SW-24"}
+    assert await names("ports=48") == {"SW-48"}
+    assert await names('ports="48"') == {"SW-STR"}
+    assert await names("vendor=Arista", "firmware<10.3") == {"SW-24"}
+    assert await names("cpu.vcpus=16") == {"VM-16"}
+    assert await names('cpu@>{"arch": "x86"}', "ha=true") == {"VM-16"}
+    assert await names('features@>["bgp"]') == {"SW-48", "VM-16"}
+    assert await names('features@>["bgp", "ospf"]') == {"VM-16"}
+    assert await names("features=bgp") == set()
+
+    for bad in ("ports>=lots", "ports", 'cpu={"vcpus": 16}', "features@>[bgp"):
+        resp = await client.get("/devices", params={"spec": bad})
+        assert resp.status_code == 422, bad
+
+
+# --- Search ---
+
+
+@pytest.mark.asyncio
+async def test_search_devices_ranked_with_prefixes(client):
+    palo = await client.post(
+        "/devices",
+        json={
+            **DEVICE_PAYLOAD, "name": "PA-3220", "location": "Lab B, Rack 3",
+            "description": "Palo Alto edge firewall with 10G ports",
+        },
+    )
+    await client.post(
+        "/devices",
+        json={
+            **DEVICE_PAYLOAD, "name": "SRX-300", "location": "Lab A, Rack 1",
+            "description": "Juniper branch firewall, 1G ports",
+        },
+    )
+    await client.post(
+        "/devices",
+        json={**DEVICE_PAYLOAD, "name": "Lab spare", "device_type": "SWITCH", "location": None},
+    )
+
+    resp = await client.get("/devices:search", params={"q": "palo 10g lab b"})
+    assert resp.status_code == 200
+    assert [d["id"] for d in resp.json()["items"]] == [palo.json()["id"]]
+
+    # Partial words match for type-ahead
+    items = (await client.get("/devices:search", params={"q": "junip"})).json()["items"]
+    assert [d["name"] for d in items] == ["SRX-300"]
+
+    # A hit in the name ranks first; pages follow the ranking
+    page = (await client.get("/devices:search", params={"q": "lab", "limit": 2})).json()
+    assert page["items"][0]["name"] == "Lab spare" and page["next_cursor"]
+    rest = (
+        await client.get(
+            "/devices:search", params={"q": "lab", "limit": 2, "cursor": page["next_cursor"]}
+        )
+    ).json()
+    assert len(rest["items"]) == 1 and rest["next_cursor"] is None
+    names = {d["name"] for d in page["items"] + rest["items"]}
+    assert names == {"Lab spare", "PA-3220", "SRX-300"}
+
+    items = (
+        await client.get("/devices:search", params={"q": "lab", "device_type": "FIREWALL"})
+    ).json()["items"]
+    assert len(items) == 2
+    assert (await client.get("/devices:search", params={"q": "--"})).status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_search_devices_caps_candidates_by_rank(client):
+    for i in range(3):
+        await client.post(
+            "/devices", json={**DEVICE_PAYLOAD, "name": f"FW-{i}", "location": "Lab A"}
+        )
+    best = (await client.post("/devices", json={**DEVICE_PAYLOAD, "name": "Lab spare"})).json()
+
+    with patch("app.services.inventory_service.settings.device_search_max_candidates", 1):
+        page = (await client.get("/devices:search", params={"q": "lab"})).json()
+    # The cap keeps the best match, not whichever rows the scan reached first
+    assert [d["id"] for d in page["items"]] == [best["id"]]
+    assert page["next_cursor"] is None
+
+
+# --- Bulk internal status update ---
+
+
+@pytest.mark.asyncio
+async def test_internal_batch_status_update(client):
+    first = (await client.post("/devices", json=DEVICE_PAYLOAD)).json()["id"]
+    second = (await client.post("/devices", json={**DEVICE_PAYLOAD, "name": "FW-02"})).json()["id"]
+    unknown = str(uuid.uuid4())
+    resp = await client.post(
+        "/devices:batchSetStatus",
+        json={
+            "updates": [
+                {"device_id": first, "status": "RESERVED"},
+                {"device_id": second, "status": "MAINTENANCE"},
+                {"device_id": unknown, "status": "RESERVED"},
+            ]
+        },
+        headers={"X-Internal-Token": "test-token"},
+    )
+    assert resp.status_code == 200
+    results = {r["device_id"]: r["updated"] for r in resp.json()["results"]}
+    assert results == {first: True, second: True, unknown: False}
+    assert (await client.get(f"/devices/{first}")).json()["status"] == "RESERVED"
+    assert (await client.get(f"/devices/{second}")).json()["status"] == "MAINTENANCE"
+
+
+@pytest.mark.asyncio
+async def test_internal_batch_status_update_bad_token(client):
+    resp = await client.post(
+        "/devices:batchSetStatus",
+        json={"updates": [{"device_id": str(uuid.uuid4()), "status": "RESERVED"}]},
+        headers={"X-Internal-Token": "wrong-token"},
+    )
+    assert resp.status_code == 403
+
+
+@pytest.mark.asyncio
+async def test_device_snapshot_and_change_events(client):
+    nc = AsyncMock()
+    device_events.attach(nc)
+    try:
+        device_id = (await client.post("/devices", json=DEVICE_PAYLOAD)).json()["id"]
+        await client.post(
+            "/devices:batchSetStatus",
+            json={"updates": [{"device_id": device_id, "status": "RESERVED"}]},
+            headers={"X-Internal-Token": "test-token"},
+        )
+        await client.delete(f"/devices/{device_id}")
+        second = (await client.post("/devices", json={**DEVICE_PAYLOAD, "name": "FW-02"})).json()
+    finally:
+        device_events.attach(None)
+
+    published = [(c.args[0], json.loads(c.args[1])) for c in nc.publish.await_args_list]
+    assert [subject for subject, _ in published] == [
+        "herd.inventory.devices.changed",
+        "herd.inventory.devices.changed",
+        "herd.inventory.devices.deleted",
+        "herd.inventory.devices.changed",
+    ]
+    # Each change bumps the version, so consumers can discard stale events
+    assert published[0][1]["devices"][0]["version"] == 1
+    assert published[1][1]["devices"][0] == {
+        "id": device_id, "name": "FW-01", "device_type": "FIREWALL", "topology_type": "PHYSICAL",
+        "status": "RESERVED", "version": 2,
+    }
+    assert published[2][1] == {
+        "event": "device.deleted", "id": device_id, "version": 3, "inventory_version": 4,
+    }
+    # Each write also moves the inventory as a whole forward by one
+    assert [payload["inventory_version"] for _, payload in published] == [2, 3, 4, 5]
+
+    resp = await client.get("/devices:snapshot", headers={"X-Internal-Token": "test-token"})
+    assert resp.status_code == 200
+    assert [d["id"] for d in resp.json()["devices"]] == [second["id"]]
+    bad = await client.get("/devices:snapshot", headers={"X-Internal-Token": "wrong-token"})
+    assert bad.status_code == 403
+
+
+# --- Device cache ---
+
+
+@contextmanager
+def _use_cache(cache: DeviceCache):
+    """Stand ``cache`` in for the app's device cache, in the router and the service."""
+    with patch("app.routers.devices.device_cache", cache), patch(
+        "app.services.inventory_service.device_cache", cache
+    ):
+        yield
+
+
+@pytest.mark.asyncio
+async def test_device_cache_follows_writes_across_replicas(client):
+    specs = [
+        {"ports": 48, "vendor": "Arista", "features": ["bgp"]}, {"ports": "48", "ha": True}, None,
+    ]
+    for i in range(7):
+        await client.post(
+            "/devices",
+            json={
+                **DEVICE_PAYLOAD, "name": f"D-{i}", "specs": specs[i % 3],
+                "device_type": "SWITCH" if i % 2 else "FIREWALL",
+                "status": "OFFLINE" if i % 3 == 0 else "AVAILABLE",
+            },
+        )
+    queries = [
+        {}, {"device_type": "SWITCH"}, {"device_type": "FIREWALL", "status": "AVAILABLE"},
+        {"spec": ["ports>=48"]}, {"spec": ["ports=48"]}, {"spec": ['features@>["bgp"]']},
+        {"spec": ["ha=true"], "status": "AVAILABLE"},
+    ]
+
+    async def read_all(params: dict) -> tuple[list[str], list[int]]:
+        names, totals, cursor = [], [], None
+        while True:
+            resp = await client.get(
+                "/devices", params={**params, "limit": 2, **({"cursor": cursor} if cursor else {})}
+            )
+            assert resp.status_code == 200, resp.text
+            names += [d["name"] for d in resp.json()["items"]]
+            totals.append(resp.json()["total_estimate"])
+            if not (cursor := resp.json()["next_cursor"]):
+                return names, totals
+
+    # The app's own cache is never started here, so these come from the database
+    expected = [(await read_all(params))[0] for params in queries]
+
+    cache = DeviceCache(session_factory=TestSessionLocal, enabled=True, resync_seconds=60)
+    assert await cache.load()
+    with _use_cache(cache):
+        for params, names in zip(queries, expected):
+            cached_names, totals = await read_all(params)
+            assert cached_names == names
+            if "spec" not in params:
+                # Counted exactly
+                assert set(totals) == {len(names)}
+        assert cache.status()["hits"] > 0
+        # Spec filters are left to the database's GIN index
+        assert cache.status()["misses"] == 0
+
+        # This replica's own writes are applied as soon as they commit
+        device = (await client.post("/devices", json={**DEVICE_PAYLOAD, "name": "NEW"})).json()
+        assert (await client.get(f"/devices/{device['id']}")).json()["name"] == "NEW"
+        assert cache.status()["misses"] == 0
+
+        # Writes on another replica: reads go to the database until their events
+        # have all arrived, in whatever order
+        nc = AsyncMock()
+        device_events.attach(nc)
+        try:
+            other_replica = DeviceCache(session_factory=TestSessionLocal, enabled=True)
+            with _use_cache(other_replica):
+                await client.put(f"/devices/{device['id']}", json={"name": "RENAMED"})
+                await client.delete(f"/devices/{device['id']}")
+        finally:
+            device_events.attach(None)
+        renamed, deleted = (MagicMock(data=c.args[1]) for c in nc.publish.await_args_list)
+        assert (await client.get(f"/devices/{device['id']}")).status_code == 404
+        await cache._on_event(deleted)
+        misses = cache.status()["misses"]
+        assert (await client.get(f"/devices/{device['id']}")).status_code == 404
+        # One lookup per request, however many reads it makes
+        assert cache.status()["misses"] == misses + 1
+        await cache._on_event(renamed)
+        misses = cache.status()["misses"]
+        assert (await client.get(f"/devices/{device['id']}")).status_code == 404
+        assert cache.status()["misses"] == misses
+        assert cache.get(uuid.UUID(device["id"])) is None
+
+        # Events that never arrive: a replica left behind reloads
+        cache._resync_after = timedelta(0)
+        newest = (await client.get("/devices", params={"limit": 1})).json()["items"][0]
+        with _use_cache(other_replica):
+            await client.put(f"/devices/{newest['id']}", json={"name": "LOST"})
+        assert (await client.get(f"/devices/{newest['id']}")).json()["name"] == "LOST"
+        await cache._resync_task
+        hits = cache.status()["hits"]
+        assert (await client.get(f"/devices/{newest['id']}")).json()["name"] == "LOST"
+        assert cache.status()["hits"] == hits + 1
+        assert cache.status()["reloads"] == 2
+
+    resp = await client.get("/device-cache/status")
+    assert resp.status_code == 200
+    assert resp.json()["serving"] is False
+
+    # A catalog over the memory budget is not cached
+    small = DeviceCache(session_factory=TestSessionLocal, enabled=True, max_bytes=1000)
+    assert not await small.load()
+    assert small.status()["over_budget"] and not small.serves(1)
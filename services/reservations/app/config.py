@@ -10,7 +10,50 @@ class Settings(BaseSettings):
     inventory_service_url: str = "http://inventory:8000"
     nats_url: str = "nats://nats:4222"
     internal_api_token: str = ""
-    expiration_interval_seconds: int = 60
+    # The lifecycle scheduler wakes on deadlines; this is only the fallback sweep
+    lifecycle_reconcile_interval_seconds: int = 300
+    # Transactional outbox relay to NATS JetStream
+    outbox_batch_size: int = 100
+    outbox_poll_interval_seconds: float = 1.0
+    outbox_retention_hours: int = 24
+    # Without a NATS connection at startup the relay connects on its own, retrying
+    # with exponential backoff capped at this
+    outbox_connect_retry_max_seconds: float = 60.0
+    # Only the replica holding this lease runs the scheduler; renewed every ttl/3
+    leader_lease_ttl_seconds: int = 15
+    # Recurring series are written out as reservations this far ahead of time
+    recurrence_materialize_ahead_hours: int = 48
+    # Local device read-model fed by inventory events; validation falls back to
+    # HTTP once it is more than max_staleness behind
+    device_snapshot_interval_seconds: int = 900
+    device_read_model_max_staleness_seconds: float = 30.0
+    # Responses to requests sent with an Idempotency-Key are replayed for this long;
+    # a claim with no response after claim_timeout is treated as abandoned
+    idempotency_key_ttl_hours: int = 24
+    idempotency_claim_timeout_seconds: int = 60
+    idempotency_cleanup_interval_seconds: int = 600
+    # reservations is partitioned by month of end_time (PostgreSQL). Partitions are
+    # created this far ahead; months older than archive_after are detached and, if
+    # archive_dir is set, exported there as gzipped NDJSON together with their
+    # reservation_devices rows and dropped
+    reservation_partition_premake_months: int = 12
+    reservation_archive_after_months: int = 12
+    reservation_archive_dir: str = ""
+    reservation_partition_maintenance_interval_seconds: int = 3600
+    # Utilization analytics over finished reservations: an hourly grid covering the
+    # last window_days, topped up with newly finished bookings at most every
+    # refresh_seconds. Devices below idle_threshold_percent are reported as idle
+    analytics_window_days: int = 365
+    analytics_refresh_seconds: int = 60
+    analytics_idle_threshold_percent: float = 5.0
+
+    # Shared HTTP client for calls to the inventory service
+    inventory_max_connections: int = 100
+    inventory_max_keepalive_connections: int = 20
+    inventory_keepalive_expiry_seconds: float = 30.0
+    inventory_http2: bool = False
+    inventory_timeout_seconds: float = 10.0
+    inventory_connect_timeout_seconds: float = 3.0
 
     model_config = {"env_file": ".env", "case_sensitive": False}
 
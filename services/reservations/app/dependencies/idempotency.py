@@ -0,0 +1,76 @@
+import uuid
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from typing import Any
+
+from fastapi import HTTPException, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.services.idempotency import claim_key, complete_key, release_key, request_fingerprint
+
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+
+class IdempotentRequest:
+    """Handle for one request; ``replay`` is set when a stored response applies."""
+
+    def __init__(self) -> None:
+        self.replay: Response | None = None
+        self.stored: tuple[int, Any] | None = None
+
+    def store(self, status_code: int, content: Any) -> Any:
+        """Remember the response to persist for retries, and return ``content``."""
+        self.stored = (status_code, jsonable_encoder(content))
+        return content
+
+
+@asynccontextmanager
+async def idempotent(
+    db: AsyncSession,
+    request: Request,
+    user_id: uuid.UUID,
+    key: str | None,
+    body: BaseModel | None = None,
+) -> AsyncIterator[IdempotentRequest]:
+    """Claim ``key`` around a mutation, persisting what the handler ``store``s.
+
+    Without a key the handler simply runs. Any exception releases the claim.
+    """
+    handle = IdempotentRequest()
+    if key is None:
+        yield handle
+        return
+
+    fingerprint = request_fingerprint(
+        request.method, request.url.path, body.model_dump_json() if body else ""
+    )
+    try:
+        previous = await claim_key(db, user_id, key, fingerprint)
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=str(exc))
+    except LookupError as exc:
+        raise HTTPException(status_code=409, detail=str(exc))
+
+    if previous is not None:
+        headers = {REPLAYED_HEADER: "true"}
+        if previous.response is None:
+            handle.replay = Response(status_code=previous.status_code, headers=headers)
+        else:
+            handle.replay = JSONResponse(
+                previous.response, status_code=previous.status_code, headers=headers
+            )
+        yield handle
+        return
+
+    try:
+        yield handle
+    except BaseException:
+        await release_key(db, user_id, key)
+        raise
+    if handle.stored is None:
+        await release_key(db, user_id, key)
+    else:
+        await complete_key(db, user_id, key, *handle.stored)
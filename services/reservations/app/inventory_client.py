@@ -0,0 +1,95 @@
+"""Pooled HTTP client for reservations -> inventory traffic.
+
+One client is created in the app lifespan and stored on ``app.state.http_client``
+so connections are kept alive and reused across requests and background cycles.
+"""
+
+import logging
+import uuid
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
+import httpx
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def create_inventory_client() -> httpx.AsyncClient:
+    """Build an AsyncClient with pool limits, keep-alive and timeouts from settings."""
+    http2 = settings.inventory_http2
+    if http2:
+        try:
+            import h2  # noqa: F401
+        except ImportError:
+            logger.warning("INVENTORY_HTTP2 is set but the h2 package is missing; using HTTP/1.1")
+            http2 = False
+
+    return httpx.AsyncClient(
+        base_url=settings.inventory_service_url,
+        http2=http2,
+        limits=httpx.Limits(
+            max_connections=settings.inventory_max_connections,
+            max_keepalive_connections=settings.inventory_max_keepalive_connections,
+            keepalive_expiry=settings.inventory_keepalive_expiry_seconds,
+        ),
+        timeout=httpx.Timeout(
+            settings.inventory_timeout_seconds,
+            connect=settings.inventory_connect_timeout_seconds,
+        ),
+    )
+
+
+@asynccontextmanager
+async def inventory_client(
+    client: httpx.AsyncClient | None = None,
+) -> AsyncIterator[httpx.AsyncClient]:
+    """Yield the shared client if given, otherwise a short-lived one (tests, scripts)."""
+    if client is not None:
+        yield client
+        return
+    async with create_inventory_client() as temp_client:
+        yield temp_client
+
+
+async def update_device_statuses(
+    device_ids: list[uuid.UUID], status: str, http_client: httpx.AsyncClient | None = None
+) -> None:
+    """Best-effort bulk status update via the internal token. Errors are logged, never raised."""
+    if not settings.internal_api_token or not device_ids:
+        return
+
+    try:
+        async with inventory_client(http_client) as client:
+            resp = await client.post(
+                "/devices:batchSetStatus",
+                json={
+                    "updates": [
+                        {"device_id": str(device_id), "status": status}
+                        for device_id in device_ids
+                    ]
+                },
+                headers={"X-Internal-Token": settings.internal_api_token},
+            )
+        resp.raise_for_status()
+    except Exception:
+        logger.error(
+            "Failed to update %d device(s) to %s", len(device_ids), status, exc_info=True
+        )
+        return
+
+    for result in resp.json()["results"]:
+        if not result["updated"]:
+            logger.error("Failed to update device %s status to %s", result["device_id"], status)
+
+
+async def fetch_device_snapshot(http_client: httpx.AsyncClient | None = None) -> list[dict]:
+    """Every device's mirrored fields, via the internal token. Errors are raised."""
+    async with inventory_client(http_client) as client:
+        resp = await client.get(
+            "/devices:snapshot",
+            headers={"X-Internal-Token": settings.internal_api_token},
+        )
+    resp.raise_for_status()
+    return resp.json()["devices"]
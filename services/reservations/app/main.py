@@ -8,44 +8,157 @@ from herd_common.logging import RequestLoggingMiddleware, setup_logging
 
 from app.config import settings
 from app.database import Base, engine
+from app.inventory_client import create_inventory_client
+from app.routers.admin import router as admin_router
+from app.routers.allocation import router as allocation_router
+from app.routers.availability import router as availability_router
+from app.routers.device_sync import router as device_sync_router
+from app.routers.lifecycle import router as lifecycle_router
+from app.routers.outbox import router as outbox_router
 from app.routers.reservations import router as reservations_router
+from app.routers.series import router as series_router
+from app.routers.waitlist import router as waitlist_router
+from app.tasks.device_sync import device_read_model
+from app.tasks.idempotency import idempotency_cleaner
+from app.tasks.leader import LeaderElector
+from app.tasks.lifecycle import lifecycle_scheduler
+from app.tasks.outbox import outbox_relay
+from app.tasks.partitions import partition_maintainer
 
 setup_logging("reservations")
 logger = logging.getLogger(__name__)
 
 
+async def _connect_nats():
+    import nats
+
+    return await nats.connect(
+        settings.nats_url,
+        disconnected_cb=device_read_model.on_disconnect,
+        reconnected_cb=device_read_model.on_reconnect,
+    )
+
+
+async def _attach_nats(nc) -> None:
+    """Subscribe the read-model and the lifecycle scheduler on a new connection."""
+    # Keep the local device read-model current; validation falls back to HTTP if not
+    try:
+        await device_read_model.attach_nats(nc)
+    except Exception:
+        logger.warning("Device read-model will rely on snapshots only", exc_info=True)
+    try:
+        await lifecycle_scheduler.attach_nats(nc)
+    except Exception:
+        logger.warning("Lifecycle updates will not be shared across replicas", exc_info=True)
+
+
+async def _connect_nats_later(app: FastAPI) -> None:
+    """Retry NATS with exponential backoff after a failed startup connect."""
+    delay = 1.0
+    while True:
+        await asyncio.sleep(delay)
+        try:
+            nc = await _connect_nats()
+            break
+        except Exception:
+            delay = min(delay * 2, settings.outbox_connect_retry_max_seconds)
+            logger.warning(
+                "NATS unavailable at %s, retrying in %.0fs", settings.nats_url, delay
+            )
+    app.state.nats = nc
+    logger.info("Connected to NATS at %s", settings.nats_url)
+    await _attach_nats(nc)
+    # Events before the subscription were missed; snapshot so the model goes live
+    await device_read_model.on_reconnect()
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
 
-    # Connect to NATS (non-fatal if unavailable)
+    # Connect to NATS (non-fatal if unavailable; retried in the background)
     app.state.nats = None
+    nats_task = None
     try:
-        import nats
-
-        nc = await nats.connect(settings.nats_url)
-        app.state.nats = nc
+        app.state.nats = await _connect_nats()
         logger.info("Connected to NATS at %s", settings.nats_url)
     except Exception:
-        logger.warning("NATS unavailable at %s, events will be skipped", settings.nats_url)
+        logger.warning(
+            "NATS unavailable at %s, events will stay in the outbox until it is reachable",
+            settings.nats_url,
+        )
 
-    # Start expiration background task
-    from app.tasks.expiration import expiration_loop
+    # Shared, pooled HTTP client for all inventory calls
+    app.state.http_client = create_inventory_client()
 
-    expiration_task = asyncio.create_task(
-        expiration_loop(settings.expiration_interval_seconds)
+    if app.state.nats is not None:
+        await _attach_nats(app.state.nats)
+    else:
+        nats_task = asyncio.create_task(_connect_nats_later(app))
+    device_sync_task = asyncio.create_task(device_read_model.run(app.state.http_client))
+
+    # Start the reservation lifecycle scheduler, on the elected leader only
+    app.state.leader = LeaderElector("reservations-lifecycle")
+    lifecycle_task = asyncio.create_task(
+        app.state.leader.run(lambda: lifecycle_scheduler.run(app.state.http_client))
+    )
+
+    # Partition DDL runs on one replica at a time, under its own lease
+    app.state.partition_leader = LeaderElector("reservations-partitions")
+    partition_task = asyncio.create_task(
+        app.state.partition_leader.run(partition_maintainer.run)
     )
 
+    # Expired idempotency keys are purged on every replica
+    idempotency_task = asyncio.create_task(idempotency_cleaner.run())
+
+    # Relay outbox events to NATS; rows accumulate safely while NATS is unavailable,
+    # and without a connection here the relay keeps trying to make its own
+    relay_task = asyncio.create_task(outbox_relay.run(app.state.nats))
+
     yield
 
-    # Cancel expiration task
-    expiration_task.cancel()
+    relay_task.cancel()
     try:
-        await expiration_task
+        await relay_task
     except asyncio.CancelledError:
         pass
 
+    # Stop campaigning; this also releases the lease if we hold it
+    lifecycle_task.cancel()
+    try:
+        await lifecycle_task
+    except asyncio.CancelledError:
+        pass
+
+    partition_task.cancel()
+    try:
+        await partition_task
+    except asyncio.CancelledError:
+        pass
+
+    device_sync_task.cancel()
+    try:
+        await device_sync_task
+    except asyncio.CancelledError:
+        pass
+
+    idempotency_task.cancel()
+    try:
+        await idempotency_task
+    except asyncio.CancelledError:
+        pass
+
+    if nats_task is not None:
+        nats_task.cancel()
+        try:
+            await nats_task
+        except asyncio.CancelledError:
+            pass
+
+    await app.state.http_client.aclose()
+
     # Close NATS connection on shutdown
     if app.state.nats is not None:
         try:
@@ -77,4 +190,12 @@ async def health():
     return {"status": "ok", "service": "reservations"}
 
 
+app.include_router(admin_router)
+app.include_router(allocation_router)
+app.include_router(availability_router)
+app.include_router(device_sync_router)
+app.include_router(lifecycle_router)
+app.include_router(outbox_router)
+app.include_router(series_router)
+app.include_router(waitlist_router)
 app.include_router(reservations_router)
@@ -0,0 +1,57 @@
+import uuid
+from datetime import datetime
+
+from herd_common.enums import TopologyType
+from sqlalchemy import DateTime, Enum, Index, Integer, String, Uuid
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.config import settings
+from app.database import Base
+from app.utils.time import utcnow
+
+_schema = settings.db_schema or None
+
+
+class DeviceReplica(Base):
+    """Local copy of the inventory fields reservation validation needs.
+
+    Kept current by inventory change events and periodic snapshots; ``version`` is
+    inventory's per-device counter, so older events never overwrite newer data.
+    """
+
+    __tablename__ = "device_replicas"
+    __table_args__ = (
+        # Allocation looks pools up by topology and device type
+        Index("ix_device_replicas_pool", "topology_type", "device_type"),
+        {"schema": _schema} if _schema else {},
+    )
+
+    id: Mapped[uuid.UUID] = mapped_column(Uuid(as_uuid=True), primary_key=True)
+    name: Mapped[str] = mapped_column(String(255), nullable=False)
+    # Inventory's DeviceType, stored as its string value
+    device_type: Mapped[str | None] = mapped_column(String(32), nullable=True)
+    topology_type: Mapped[TopologyType] = mapped_column(
+        Enum(TopologyType, schema=_schema), nullable=False
+    )
+    # Inventory's DeviceStatus, stored as its string value
+    status: Mapped[str] = mapped_column(String(32), nullable=False)
+    version: Mapped[int] = mapped_column(Integer, nullable=False)
+    synced_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, default=utcnow
+    )
+
+
+class DeviceTombstone(Base):
+    """A device inventory deleted, at the version of its delete event.
+
+    Snapshots drop any row at or below this version, so a snapshot read before the
+    delete cannot bring the device back. Pruned by the next snapshot.
+    """
+
+    __tablename__ = "device_tombstones"
+    __table_args__ = ({"schema": _schema} if _schema else {},)
+
+    id: Mapped[uuid.UUID] = mapped_column(Uuid(as_uuid=True), primary_key=True)
+    version: Mapped[int] = mapped_column(Integer, nullable=False)
+    # Database clock, like synced_at
+    deleted_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
@@ -0,0 +1,38 @@
+import uuid
+from datetime import datetime
+from typing import Any
+
+from sqlalchemy import JSON, DateTime, Index, Integer, String, Uuid
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.config import settings
+from app.database import Base
+from app.utils.time import utcnow
+
+_schema = settings.db_schema or None
+
+
+class IdempotencyKey(Base):
+    """Response of a mutation sent with an ``Idempotency-Key`` header.
+
+    The row is claimed (``status_code`` still NULL) before the request runs and
+    completed with its response afterwards. ``app.tasks.idempotency`` deletes rows
+    once ``expires_at`` has passed.
+    """
+
+    __tablename__ = "idempotency_keys"
+    __table_args__ = (
+        Index("ix_idempotency_keys_expires_at", "expires_at"),
+        {"schema": _schema} if _schema else {},
+    )
+
+    user_id: Mapped[uuid.UUID] = mapped_column(Uuid(as_uuid=True), primary_key=True)
+    key: Mapped[str] = mapped_column(String(255), primary_key=True)
+    # SHA-256 of method, path and body; a key may not be reused for another request
+    fingerprint: Mapped[str] = mapped_column(String(64), nullable=False)
+    status_code: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    response: Mapped[Any | None] = mapped_column(JSON, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, default=utcnow
+    )
+    expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
@@ -0,0 +1,22 @@
+from datetime import datetime
+
+from sqlalchemy import DateTime, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.config import settings
+from app.database import Base
+
+_schema = settings.db_schema or None
+
+
+class SchedulerLease(Base):
+    """Single-row-per-name lease used to elect one replica for background work."""
+
+    __tablename__ = "scheduler_leases"
+    __table_args__ = {"schema": _schema} if _schema else {}
+
+    name: Mapped[str] = mapped_column(String(100), primary_key=True)
+    holder: Mapped[str] = mapped_column(String(255), nullable=False)
+    acquired_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    renewed_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
@@ -4,13 +4,32 @@ from datetime import datetime
 from typing import Any
 
 from herd_common.enums import TopologyType
-from sqlalchemy import JSON, DateTime, Enum, Text, Uuid, func
-from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import (
+    DDL,
+    JSON,
+    DateTime,
+    Enum,
+    ForeignKey,
+    ForeignKeyConstraint,
+    Index,
+    String,
+    Text,
+    Uuid,
+    column,
+    event,
+    func,
+    literal_column,
+    text,
+)
+from sqlalchemy.dialects.postgresql import ExcludeConstraint
+from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.config import settings
 from app.database import Base
+from app.utils.time import utcnow
 
 _schema = settings.db_schema or None
+_prefix = f"{_schema}." if _schema else ""
 
 
 class ReservationStatus(str, enum.Enum):
@@ -22,21 +41,106 @@ class ReservationStatus(str, enum.Enum):
 
 class Reservation(Base):
     __tablename__ = "reservations"
-    __table_args__ = {"schema": _schema} if _schema else {}
+    __table_args__ = (
+        # Partial indexes for the lifecycle scheduler's due-transition queries
+        Index(
+            "ix_reservations_pending_start",
+            "start_time",
+            postgresql_where=text("status = 'PENDING'"),
+            sqlite_where=text("status = 'PENDING'"),
+        ),
+        Index(
+            "ix_reservations_active_end",
+            "end_time",
+            postgresql_where=text("status = 'ACTIVE'"),
+            sqlite_where=text("status = 'ACTIVE'"),
+        ),
+        # Admin queries page through all reservations on (start_time, id)
+        Index("ix_reservations_start_id", "start_time", "id"),
+        # Keyset pagination of a user's reservations on (created_at, id); the partial
+        # index covers the default view of upcoming and active ones
+        Index("ix_reservations_user_created", "user_id", "created_at", "id"),
+        Index(
+            "ix_reservations_user_current",
+            "user_id",
+            "created_at",
+            "id",
+            postgresql_where=text("status IN ('PENDING', 'ACTIVE')"),
+            sqlite_where=text("status IN ('PENDING', 'ACTIVE')"),
+        ),
+        # Monthly partitions by end_time, see app.services.partitions; the partition
+        # key has to be part of the primary key
+        {
+            **({"schema": _schema} if _schema else {}),
+            "postgresql_partition_by": "RANGE (end_time)",
+        },
+    )
+
+    id: Mapped[uuid.UUID] = mapped_column(
+        Uuid(as_uuid=True), primary_key=True, default=uuid.uuid4
+    )
+    user_id: Mapped[uuid.UUID] = mapped_column(Uuid(as_uuid=True), nullable=False, index=True)
+    # Set on occurrences materialized from a recurring series
+    series_id: Mapped[uuid.UUID | None] = mapped_column(
+        Uuid(as_uuid=True),
+        ForeignKey(f"{_prefix}reservation_series.id", ondelete="SET NULL"),
+        nullable=True,
+        index=True,
+    )
+    # Stored as JSON list of UUID strings, compatible with SQLite and PostgreSQL.
+    # Kept for API responses; conflict checks use the indexed reservation_devices rows.
+    device_ids: Mapped[list[Any]] = mapped_column(JSON, nullable=False)
+    topology_type: Mapped[TopologyType] = mapped_column(
+        Enum(TopologyType, schema=_schema), nullable=False
+    )
+    purpose: Mapped[str | None] = mapped_column(Text, nullable=True)
+    start_time: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    end_time: Mapped[datetime] = mapped_column(DateTime(timezone=True), primary_key=True)
+    status: Mapped[ReservationStatus] = mapped_column(
+        Enum(ReservationStatus, schema=_schema),
+        nullable=False,
+        default=ReservationStatus.ACTIVE,
+    )
+    # Set by the application so pagination cursors keep full precision on every backend
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), default=utcnow, server_default=func.now()
+    )
+    devices: Mapped[list["ReservationDevice"]] = relationship(
+        back_populates="reservation", cascade="all, delete-orphan", lazy="raise"
+    )
+
+
+class ReservationSeries(Base):
+    """A recurring booking: an RRULE expanded from the first occurrence's window.
+
+    Occurrences become ordinary ``Reservation`` rows only shortly before they start.
+    Everything starting before ``materialized_until`` already exists as a row; later
+    occurrences are expanded on demand when a conflict check needs them.
+    """
+
+    __tablename__ = "reservation_series"
+    __table_args__ = ({"schema": _schema} if _schema else {},)
 
     id: Mapped[uuid.UUID] = mapped_column(
         Uuid(as_uuid=True), primary_key=True, default=uuid.uuid4
     )
     user_id: Mapped[uuid.UUID] = mapped_column(Uuid(as_uuid=True), nullable=False, index=True)
-    # Stored as JSON list of UUID strings, compatible with SQLite and PostgreSQL
-    # In production Postgres, a migration can switch this to UUID[] for native array support
     device_ids: Mapped[list[Any]] = mapped_column(JSON, nullable=False)
     topology_type: Mapped[TopologyType] = mapped_column(
         Enum(TopologyType, schema=_schema), nullable=False
     )
     purpose: Mapped[str | None] = mapped_column(Text, nullable=True)
+    rrule: Mapped[str] = mapped_column(Text, nullable=False)
+    # IANA zone the rule is expanded in, so wall-clock times survive DST changes
+    timezone: Mapped[str] = mapped_column(String(64), nullable=False, default="UTC")
+    # Window of the first occurrence; every occurrence has the same duration
     start_time: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
     end_time: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    # End of the last occurrence
+    until: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    materialized_until: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False
+    )
     status: Mapped[ReservationStatus] = mapped_column(
         Enum(ReservationStatus, schema=_schema),
         nullable=False,
@@ -45,3 +149,89 @@ class Reservation(Base):
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), server_default=func.now()
     )
+    devices: Mapped[list["ReservationSeriesDevice"]] = relationship(
+        cascade="all, delete-orphan", lazy="raise"
+    )
+
+
+class ReservationSeriesDevice(Base):
+    """Device membership of a series, indexed by device for conflict lookups."""
+
+    __tablename__ = "reservation_series_devices"
+    __table_args__ = ({"schema": _schema} if _schema else {},)
+
+    series_id: Mapped[uuid.UUID] = mapped_column(
+        Uuid(as_uuid=True),
+        ForeignKey(f"{_prefix}reservation_series.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    device_id: Mapped[uuid.UUID] = mapped_column(
+        Uuid(as_uuid=True), primary_key=True, index=True
+    )
+
+
+class ReservationDevice(Base):
+    """One row per reserved device, carrying a copy of the reservation window and status.
+
+    On PostgreSQL a GiST exclusion constraint over (device_id, tstzrange(start, end))
+    makes double-booking impossible and doubles as the index for conflict lookups.
+    The status column must be kept in sync with the parent reservation.
+    """
+
+    __tablename__ = "reservation_devices"
+    __table_args__ = (
+        Index("ix_reservation_devices_device_window", "device_id", "start_time", "end_time"),
+        # Utilization analytics load newly finished rows by end_time
+        Index("ix_reservation_devices_end", "end_time"),
+        ExcludeConstraint(
+            ("device_id", "="),
+            (
+                func.tstzrange(
+                    column("start_time"), column("end_time"), literal_column("'[)'")
+                ),
+                "&&",
+            ),
+            name="ex_reservation_devices_no_overlap",
+            using="gist",
+            where=text("status IN ('ACTIVE', 'PENDING')"),
+        ).ddl_if(dialect="postgresql"),
+        # Foreign keys into a partitioned table must cover its partition key
+        ForeignKeyConstraint(
+            ["reservation_id", "end_time"],
+            [f"{_prefix}reservations.id", f"{_prefix}reservations.end_time"],
+            name="fk_reservation_devices_reservation",
+            ondelete="CASCADE",
+            onupdate="CASCADE",
+        ),
+        {"schema": _schema} if _schema else {},
+    )
+
+    reservation_id: Mapped[uuid.UUID] = mapped_column(Uuid(as_uuid=True), primary_key=True)
+    device_id: Mapped[uuid.UUID] = mapped_column(Uuid(as_uuid=True), primary_key=True)
+    start_time: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    end_time: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    status: Mapped[ReservationStatus] = mapped_column(
+        Enum(ReservationStatus, schema=_schema),
+        nullable=False,
+        default=ReservationStatus.ACTIVE,
+    )
+
+    reservation: Mapped[Reservation] = relationship(back_populates="devices", lazy="raise")
+
+
+# Rows beyond the monthly partitions created so far land here
+event.listen(
+    Reservation.__table__,
+    "after_create",
+    DDL(
+        f"CREATE TABLE IF NOT EXISTS {_prefix}reservations_default "
+        f"PARTITION OF {_prefix}reservations DEFAULT"
+    ).execute_if(dialect="postgresql"),
+)
+
+# The exclusion constraint mixes a UUID equality with a range overlap, which needs btree_gist
+event.listen(
+    ReservationDevice.__table__,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS btree_gist").execute_if(dialect="postgresql"),
+)
@@ -0,0 +1,93 @@
+import enum
+import uuid
+from datetime import datetime
+from typing import Any
+
+from herd_common.enums import TopologyType
+from sqlalchemy import JSON, DateTime, Enum, ForeignKey, Index, Text, Uuid, text
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+
+from app.config import settings
+from app.database import Base
+from app.utils.time import utcnow
+
+_schema = settings.db_schema or None
+_prefix = f"{_schema}." if _schema else ""
+
+
+class WaitlistStatus(str, enum.Enum):
+    WAITING = "WAITING"
+    GRANTED = "GRANTED"
+    EXPIRED = "EXPIRED"
+    CANCELLED = "CANCELLED"
+
+
+class WaitlistEntry(Base):
+    """A booking that conflicted, queued until its devices free up or ``expires_at``.
+
+    Waiters are served first come, first served; a granted entry points at the
+    reservation created for it.
+    """
+
+    __tablename__ = "waitlist_entries"
+    __table_args__ = (
+        # Expiry sweeps only read entries still waiting
+        Index(
+            "ix_waitlist_entries_waiting_expires",
+            "expires_at",
+            postgresql_where=text("status = 'WAITING'"),
+            sqlite_where=text("status = 'WAITING'"),
+        ),
+        Index("ix_waitlist_entries_user_created", "user_id", "created_at"),
+        {"schema": _schema} if _schema else {},
+    )
+
+    id: Mapped[uuid.UUID] = mapped_column(
+        Uuid(as_uuid=True), primary_key=True, default=uuid.uuid4
+    )
+    user_id: Mapped[uuid.UUID] = mapped_column(Uuid(as_uuid=True), nullable=False)
+    device_ids: Mapped[list[Any]] = mapped_column(JSON, nullable=False)
+    topology_type: Mapped[TopologyType] = mapped_column(
+        Enum(TopologyType, schema=_schema), nullable=False
+    )
+    purpose: Mapped[str | None] = mapped_column(Text, nullable=True)
+    start_time: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    end_time: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    status: Mapped[WaitlistStatus] = mapped_column(
+        Enum(WaitlistStatus, schema=_schema), nullable=False, default=WaitlistStatus.WAITING
+    )
+    reservation_id: Mapped[uuid.UUID | None] = mapped_column(Uuid(as_uuid=True), nullable=True)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, default=utcnow
+    )
+
+    devices: Mapped[list["WaitlistDevice"]] = relationship(
+        back_populates="entry", cascade="all, delete-orphan", lazy="raise"
+    )
+
+
+class WaitlistDevice(Base):
+    """One row per (waiting entry, device), deleted once the entry stops waiting.
+
+    Freeing a device looks up its waiters through ``ix_waitlist_devices_device``
+    instead of scanning the queue.
+    """
+
+    __tablename__ = "waitlist_devices"
+    __table_args__ = (
+        Index("ix_waitlist_devices_device", "device_id", "start_time"),
+        {"schema": _schema} if _schema else {},
+    )
+
+    entry_id: Mapped[uuid.UUID] = mapped_column(
+        Uuid(as_uuid=True),
+        ForeignKey(f"{_prefix}waitlist_entries.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    device_id: Mapped[uuid.UUID] = mapped_column(Uuid(as_uuid=True), primary_key=True)
+    # Copied from the entry so the lookup filters on the index alone
+    start_time: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    end_time: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+
+    entry: Mapped[WaitlistEntry] = relationship(back_populates="devices", lazy="raise")
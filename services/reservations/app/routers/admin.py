@@ -0,0 +1,99 @@
+import uuid
+from datetime import datetime
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.database import get_db
+from app.dependencies.auth import require_admin
+from app.models.reservation import ReservationStatus, TopologyType
+from app.schemas.analytics import UtilizationReport
+from app.schemas.partitions import PartitionInfo
+from app.schemas.reservation import ReservationPage, ReservationResponse
+from app.services.admin_service import iter_reservations, search_reservations
+from app.services.analytics import utilization_analytics
+from app.services.partitions import is_partitioned, list_partitions
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+
+
+@router.get("/reservations", response_model=ReservationPage)
+async def query_reservations(
+    device_id: list[uuid.UUID] | None = Query(None),
+    user_id: uuid.UUID | None = None,
+    status_filter: list[ReservationStatus] | None = Query(None, alias="status"),
+    start: datetime | None = None,
+    end: datetime | None = None,
+    cursor: str | None = None,
+    limit: int = Query(100, ge=1, le=500),
+    db: AsyncSession = Depends(get_db),
+    _: dict = Depends(require_admin),
+):
+    """All users' reservations matching the filters, ordered by start time."""
+    try:
+        items, next_cursor = await search_reservations(
+            db, device_ids=device_id, user_id=user_id, statuses=status_filter,
+            start=start, end=end, cursor=cursor, limit=limit,
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=str(exc))
+    return ReservationPage(items=items, next_cursor=next_cursor)
+
+
+@router.get("/reservations/export")
+async def export_reservations(
+    device_id: list[uuid.UUID] | None = Query(None),
+    user_id: uuid.UUID | None = None,
+    status_filter: list[ReservationStatus] | None = Query(None, alias="status"),
+    start: datetime | None = None,
+    end: datetime | None = None,
+    db: AsyncSession = Depends(get_db),
+    _: dict = Depends(require_admin),
+):
+    """Every matching reservation as newline-delimited JSON, streamed page by page."""
+    filters = {
+        "device_ids": device_id, "user_id": user_id, "statuses": status_filter,
+        "start": start, "end": end,
+    }
+    # The request-scoped session may be closed before the body is streamed
+    bind = db.bind
+
+    async def lines():
+        async with AsyncSession(bind, expire_on_commit=False) as session:
+            async for reservation in iter_reservations(session, **filters):
+                yield ReservationResponse.model_validate(reservation).model_dump_json() + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+@router.get("/partitions", response_model=list[PartitionInfo])
+async def get_partitions(
+    db: AsyncSession = Depends(get_db),
+    _: dict = Depends(require_admin),
+):
+    """Attached monthly partitions of the reservations table (empty if unpartitioned)."""
+    if not await is_partitioned(db):
+        return []
+    return [
+        PartitionInfo(name=p["relname"], bound=p["bound"], estimated_rows=p["estimated_rows"])
+        for p in await list_partitions(db)
+    ]
+
+
+@router.get("/utilization", response_model=UtilizationReport)
+async def get_utilization(
+    device_type: str | None = None,
+    topology_type: TopologyType | None = None,
+    idle_below: float = Query(settings.analytics_idle_threshold_percent, ge=0, le=100),
+    device_heatmaps: bool = False,
+    db: AsyncSession = Depends(get_db),
+    _: dict = Depends(require_admin),
+):
+    """Device utilization, peak concurrency, idle devices and hour-of-week heatmaps
+    over the analytics window."""
+    return await utilization_analytics.report(
+        db, device_type=device_type, topology_type=topology_type,
+        idle_threshold_percent=idle_below, device_heatmaps=device_heatmaps,
+    )
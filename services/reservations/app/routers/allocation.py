@@ -0,0 +1,36 @@
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import get_db
+from app.dependencies.auth import get_current_user_payload
+from app.routers.reservations import bearer_scheme
+from app.schemas.allocation import AllocationQuery, AllocationResponse
+from app.services.allocation_service import allocate
+
+router = APIRouter(tags=["allocation"])
+
+
+@router.post("/allocate", response_model=AllocationResponse)
+async def allocate_devices(
+    body: AllocationQuery,
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    _: dict = Depends(get_current_user_payload),
+    credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme),
+):
+    """Earliest window in which enough devices of each type are free, and which devices.
+
+    Nothing is booked; create the reservation with the returned devices and window.
+    """
+    try:
+        return await allocate(
+            db, body, credentials.credentials,
+            http_client=getattr(request.app.state, "http_client", None),
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=str(exc))
+    except LookupError as exc:
+        raise HTTPException(status_code=409, detail=str(exc))
+    except RuntimeError as exc:
+        raise HTTPException(status_code=503, detail=str(exc))
@@ -0,0 +1,42 @@
+from datetime import timedelta
+
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import get_db
+from app.dependencies.auth import get_current_user_payload
+from app.schemas.availability import (
+    AvailabilityQuery,
+    AvailabilityResponse,
+    DeviceBusy,
+    TimeWindow,
+)
+from app.services.availability_service import get_free_busy
+
+router = APIRouter(tags=["availability"])
+
+
+@router.post("/availability", response_model=AvailabilityResponse)
+async def get_availability(
+    body: AvailabilityQuery,
+    db: AsyncSession = Depends(get_db),
+    _: dict = Depends(get_current_user_payload),
+):
+    """Merged busy intervals per device and the free windows common to the whole set."""
+    device_ids = list(dict.fromkeys(body.device_ids))
+    busy, free = await get_free_busy(
+        db, device_ids, body.start, body.end,
+        min_duration=timedelta(minutes=body.min_duration_minutes),
+    )
+    return AvailabilityResponse(
+        start=body.start,
+        end=body.end,
+        devices=[
+            DeviceBusy(
+                device_id=device_id,
+                busy=[TimeWindow(start=s, end=e) for s, e in busy[device_id]],
+            )
+            for device_id in device_ids
+        ],
+        free=[TimeWindow(start=s, end=e) for s, e in free],
+    )
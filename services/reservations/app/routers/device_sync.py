@@ -0,0 +1,13 @@
+from fastapi import APIRouter, Depends
+
+from app.dependencies.auth import require_admin
+from app.schemas.device_sync import DeviceReadModelStatus
+from app.tasks.device_sync import device_read_model
+
+router = APIRouter(prefix="/device-sync", tags=["device-sync"])
+
+
+@router.get("/status", response_model=DeviceReadModelStatus)
+async def get_device_sync_status(_: dict = Depends(require_admin)):
+    """Size and staleness of the local device read-model."""
+    return await device_read_model.status()
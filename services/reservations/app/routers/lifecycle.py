@@ -0,0 +1,18 @@
+from fastapi import APIRouter, Depends, HTTPException, Request
+
+from app.dependencies.auth import require_admin
+from app.schemas.lifecycle import LeaderStatus
+
+router = APIRouter(prefix="/lifecycle", tags=["lifecycle"])
+
+
+@router.get("/leader", response_model=LeaderStatus)
+async def get_leader_status(
+    request: Request,
+    _: dict = Depends(require_admin),
+):
+    """Which replica currently runs the lifecycle scheduler, and for how long."""
+    elector = getattr(request.app.state, "leader", None)
+    if elector is None:
+        raise HTTPException(status_code=503, detail="Leader election not running")
+    return await elector.status()
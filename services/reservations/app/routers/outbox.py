@@ -0,0 +1,13 @@
+from fastapi import APIRouter, Depends
+
+from app.dependencies.auth import require_admin
+from app.schemas.outbox import OutboxStatus
+from app.tasks.outbox import outbox_relay
+
+router = APIRouter(prefix="/outbox", tags=["outbox"])
+
+
+@router.get("/status", response_model=OutboxStatus)
+async def get_outbox_status(_: dict = Depends(require_admin)):
+    """Unpublished event count and age of the oldest one (outbox lag)."""
+    return await outbox_relay.status()
@@ -1,15 +1,26 @@
 import uuid
+from datetime import datetime
 
-from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database import get_db
 from app.dependencies.auth import get_current_user_payload
-from app.schemas.reservation import ReservationCreate, ReservationResponse
+from app.dependencies.idempotency import idempotent
+from app.models.reservation import ReservationStatus
+from app.schemas.reservation import (
+    ReservationBatchCreate,
+    ReservationBatchItemResult,
+    ReservationBatchResponse,
+    ReservationCreate,
+    ReservationPage,
+    ReservationResponse,
+)
 from app.services.reservation_service import (
     cancel_reservation,
     create_reservation,
+    create_reservations_batch,
     get_reservation,
     list_user_reservations,
     release_reservation,
@@ -18,6 +29,9 @@ from app.services.reservation_service import (
 router = APIRouter(tags=["reservations"])
 bearer_scheme = HTTPBearer()
 
+# Retries with the same key get the stored response instead of a second booking
+IDEMPOTENCY_KEY = Header(None, alias="Idempotency-Key", max_length=255)
+
 
 @router.post("/", response_model=ReservationResponse, status_code=status.HTTP_201_CREATED)
 async def create_new_reservation(
@@ -26,12 +40,44 @@ async def create_new_reservation(
     db: AsyncSession = Depends(get_db),
     payload: dict = Depends(get_current_user_payload),
     credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme),
+    idempotency_key: str | None = IDEMPOTENCY_KEY,
+):
+    user_id = uuid.UUID(payload["sub"])
+    http_client = getattr(request.app.state, "http_client", None)
+    async with idempotent(db, request, user_id, idempotency_key, body) as idem:
+        if idem.replay is not None:
+            return idem.replay
+        try:
+            reservation = await create_reservation(
+                db, body, user_id, credentials.credentials, http_client=http_client
+            )
+        except ValueError as exc:
+            raise HTTPException(status_code=422, detail=str(exc))
+        except LookupError as exc:
+            raise HTTPException(status_code=409, detail=str(exc))
+        except RuntimeError as exc:
+            raise HTTPException(status_code=503, detail=str(exc))
+        return idem.store(
+            status.HTTP_201_CREATED, ReservationResponse.model_validate(reservation)
+        )
+
+
+@router.post(
+    "/batch", response_model=ReservationBatchResponse, status_code=status.HTTP_201_CREATED
+)
+async def create_reservation_batch(
+    body: ReservationBatchCreate,
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    payload: dict = Depends(get_current_user_payload),
+    credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme),
 ):
     user_id = uuid.UUID(payload["sub"])
-    nats_conn = getattr(request.app.state, "nats", None)
+    http_client = getattr(request.app.state, "http_client", None)
     try:
-        reservation = await create_reservation(
-            db, body, user_id, credentials.credentials, nats_conn=nats_conn
+        outcomes = await create_reservations_batch(
+            db, body.items, user_id, credentials.credentials,
+            atomic=body.atomic, http_client=http_client,
         )
     except ValueError as exc:
         raise HTTPException(status_code=422, detail=str(exc))
@@ -39,16 +85,48 @@ async def create_new_reservation(
         raise HTTPException(status_code=409, detail=str(exc))
     except RuntimeError as exc:
         raise HTTPException(status_code=503, detail=str(exc))
-    return reservation
+
+    results = []
+    for index, outcome in enumerate(outcomes):
+        if isinstance(outcome, ValueError):
+            results.append(
+                ReservationBatchItemResult(index=index, status_code=422, error=str(outcome))
+            )
+        elif isinstance(outcome, LookupError):
+            results.append(
+                ReservationBatchItemResult(index=index, status_code=409, error=str(outcome))
+            )
+        else:
+            results.append(
+                ReservationBatchItemResult(
+                    index=index,
+                    status_code=201,
+                    reservation=ReservationResponse.model_validate(outcome),
+                )
+            )
+    return ReservationBatchResponse(results=results)
 
 
-@router.get("/", response_model=list[ReservationResponse])
+@router.get("/", response_model=ReservationPage)
 async def get_my_reservations(
+    status_filter: list[ReservationStatus] | None = Query(None, alias="status"),
+    start: datetime | None = None,
+    end: datetime | None = None,
+    cursor: str | None = None,
+    limit: int = Query(50, ge=1, le=200),
     db: AsyncSession = Depends(get_db),
     payload: dict = Depends(get_current_user_payload),
 ):
+    """Newest first. Without ?status= only PENDING and ACTIVE reservations are listed."""
     user_id = uuid.UUID(payload["sub"])
-    return await list_user_reservations(db, user_id)
+    try:
+        items, next_cursor = await list_user_reservations(
+            db, user_id, statuses=status_filter, start=start, end=end,
+            cursor=cursor, limit=limit,
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=str(exc))
+    return ReservationPage(items=items, next_cursor=next_cursor)
 
 
 @router.get("/{reservation_id}", response_model=ReservationResponse)
@@ -67,29 +145,42 @@ async def get_reservation_by_id(
 @router.delete("/{reservation_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def cancel_reservation_by_id(
     reservation_id: uuid.UUID,
+    request: Request,
     db: AsyncSession = Depends(get_db),
     payload: dict = Depends(get_current_user_payload),
     credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme),
+    idempotency_key: str | None = IDEMPOTENCY_KEY,
 ):
     user_id = uuid.UUID(payload["sub"])
-    reservation = await cancel_reservation(
-        db, reservation_id, user_id, token=credentials.credentials
-    )
-    if not reservation:
-        raise HTTPException(status_code=404, detail="Reservation not found")
+    async with idempotent(db, request, user_id, idempotency_key) as idem:
+        if idem.replay is not None:
+            return idem.replay
+        reservation = await cancel_reservation(
+            db, reservation_id, user_id, token=credentials.credentials,
+            http_client=getattr(request.app.state, "http_client", None),
+        )
+        if not reservation:
+            raise HTTPException(status_code=404, detail="Reservation not found")
+        idem.store(status.HTTP_204_NO_CONTENT, None)
 
 
 @router.put("/{reservation_id}/release", response_model=ReservationResponse)
 async def release_reservation_early(
     reservation_id: uuid.UUID,
+    request: Request,
     db: AsyncSession = Depends(get_db),
     payload: dict = Depends(get_current_user_payload),
     credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme),
+    idempotency_key: str | None = IDEMPOTENCY_KEY,
 ):
     user_id = uuid.UUID(payload["sub"])
-    reservation = await release_reservation(
-        db, reservation_id, user_id, token=credentials.credentials
-    )
-    if not reservation:
-        raise HTTPException(status_code=404, detail="Reservation not found")
-    return reservation
+    async with idempotent(db, request, user_id, idempotency_key) as idem:
+        if idem.replay is not None:
+            return idem.replay
+        reservation = await release_reservation(
+            db, reservation_id, user_id, token=credentials.credentials,
+            http_client=getattr(request.app.state, "http_client", None),
+        )
+        if not reservation:
+            raise HTTPException(status_code=404, detail="Reservation not found")
+        return idem.store(status.HTTP_200_OK, ReservationResponse.model_validate(reservation))
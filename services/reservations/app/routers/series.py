@@ -0,0 +1,80 @@
+import uuid
+
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import get_db
+from app.dependencies.auth import get_current_user_payload
+from app.routers.reservations import bearer_scheme
+from app.schemas.reservation import ReservationSeriesCreate, ReservationSeriesResponse
+from app.services.reservation_service import (
+    cancel_series,
+    create_series,
+    get_series,
+    list_user_series,
+)
+
+router = APIRouter(prefix="/series", tags=["series"])
+
+
+@router.post("", response_model=ReservationSeriesResponse, status_code=status.HTTP_201_CREATED)
+async def create_new_series(
+    body: ReservationSeriesCreate,
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    payload: dict = Depends(get_current_user_payload),
+    credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme),
+):
+    user_id = uuid.UUID(payload["sub"])
+    http_client = getattr(request.app.state, "http_client", None)
+    try:
+        series = await create_series(
+            db, body, user_id, credentials.credentials, http_client=http_client
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=str(exc))
+    except LookupError as exc:
+        raise HTTPException(status_code=409, detail=str(exc))
+    except RuntimeError as exc:
+        raise HTTPException(status_code=503, detail=str(exc))
+    return series
+
+
+@router.get("", response_model=list[ReservationSeriesResponse])
+async def get_my_series(
+    db: AsyncSession = Depends(get_db),
+    payload: dict = Depends(get_current_user_payload),
+):
+    user_id = uuid.UUID(payload["sub"])
+    return await list_user_series(db, user_id)
+
+
+@router.get("/{series_id}", response_model=ReservationSeriesResponse)
+async def get_series_by_id(
+    series_id: uuid.UUID,
+    db: AsyncSession = Depends(get_db),
+    payload: dict = Depends(get_current_user_payload),
+):
+    user_id = uuid.UUID(payload["sub"])
+    series = await get_series(db, series_id, user_id)
+    if not series:
+        raise HTTPException(status_code=404, detail="Series not found")
+    return series
+
+
+@router.delete("/{series_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def cancel_series_by_id(
+    series_id: uuid.UUID,
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    payload: dict = Depends(get_current_user_payload),
+    credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme),
+):
+    user_id = uuid.UUID(payload["sub"])
+    series = await cancel_series(
+        db, series_id, user_id, credentials.credentials,
+        http_client=getattr(request.app.state, "http_client", None),
+    )
+    if not series:
+        raise HTTPException(status_code=404, detail="Series not found")
@@ -0,0 +1,76 @@
+import uuid
+
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import get_db
+from app.dependencies.auth import get_current_user_payload
+from app.routers.reservations import bearer_scheme
+from app.schemas.waitlist import WaitlistCreate, WaitlistEntryResponse
+from app.services.reservation_service import join_waitlist
+from app.services.waitlist import (
+    cancel_waitlist_entry,
+    get_waitlist_entry,
+    list_user_waitlist,
+)
+
+router = APIRouter(prefix="/waitlist", tags=["waitlist"])
+
+
+@router.post("", response_model=WaitlistEntryResponse, status_code=status.HTTP_201_CREATED)
+async def join(
+    body: WaitlistCreate,
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    payload: dict = Depends(get_current_user_payload),
+    credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme),
+):
+    """Queue a booking that conflicted; it is granted as soon as its devices free up.
+
+    The entry comes back GRANTED, with its reservation, if it already fits.
+    """
+    user_id = uuid.UUID(payload["sub"])
+    http_client = getattr(request.app.state, "http_client", None)
+    try:
+        return await join_waitlist(
+            db, body, user_id, credentials.credentials, http_client=http_client
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=str(exc))
+    except RuntimeError as exc:
+        raise HTTPException(status_code=503, detail=str(exc))
+
+
+@router.get("", response_model=list[WaitlistEntryResponse])
+async def get_my_waitlist(
+    db: AsyncSession = Depends(get_db),
+    payload: dict = Depends(get_current_user_payload),
+):
+    user_id = uuid.UUID(payload["sub"])
+    return await list_user_waitlist(db, user_id)
+
+
+@router.get("/{entry_id}", response_model=WaitlistEntryResponse)
+async def get_waitlist_entry_by_id(
+    entry_id: uuid.UUID,
+    db: AsyncSession = Depends(get_db),
+    payload: dict = Depends(get_current_user_payload),
+):
+    user_id = uuid.UUID(payload["sub"])
+    entry = await get_waitlist_entry(db, entry_id, user_id)
+    if not entry:
+        raise HTTPException(status_code=404, detail="Waitlist entry not found")
+    return entry
+
+
+@router.delete("/{entry_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def leave_waitlist(
+    entry_id: uuid.UUID,
+    db: AsyncSession = Depends(get_db),
+    payload: dict = Depends(get_current_user_payload),
+):
+    user_id = uuid.UUID(payload["sub"])
+    entry = await cancel_waitlist_entry(db, entry_id, user_id)
+    if not entry:
+        raise HTTPException(status_code=404, detail="Waitlist entry not found")
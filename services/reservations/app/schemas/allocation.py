@@ -0,0 +1,40 @@
+import uuid
+from datetime import datetime
+
+from herd_common.enums import TopologyType
+from pydantic import BaseModel, Field
+
+from app.schemas.availability import MAX_HORIZON, TimeWindow
+
+
+class AllocationItem(BaseModel):
+    # Inventory's DeviceType value, e.g. "FIREWALL"
+    device_type: str = Field(..., min_length=1, max_length=32)
+    count: int = Field(..., ge=1, le=100)
+
+
+class AllocationQuery(BaseModel):
+    items: list[AllocationItem] = Field(..., min_length=1, max_length=10)
+    topology_type: TopologyType
+    duration_minutes: int = Field(..., ge=1, le=int(MAX_HORIZON.total_seconds() // 60))
+    # Preferred start; defaults to now, i.e. as soon as possible
+    start: datetime | None = None
+    # Latest time the booking may end; defaults to two weeks after the preferred start
+    search_until: datetime | None = None
+    alternatives: int = Field(3, ge=0, le=10)
+
+
+class AllocatedDevice(BaseModel):
+    id: uuid.UUID
+    name: str
+    device_type: str
+
+
+class AllocationResponse(BaseModel):
+    start: datetime
+    end: datetime
+    devices: list[AllocatedDevice]
+    # The preferred start was not possible; ``start`` is the earliest slot after it
+    conflict: bool
+    # Other feasible windows closest to the preferred start, when there was a conflict
+    alternatives: list[TimeWindow]
@@ -0,0 +1,38 @@
+import uuid
+from datetime import datetime
+
+from pydantic import BaseModel
+
+
+class DeviceUtilization(BaseModel):
+    device_id: uuid.UUID
+    # None for devices no longer in the inventory read-model
+    name: str | None
+    device_type: str | None
+    # Percent of the window the device was booked
+    utilization: float
+    last_used: datetime | None
+    # Percent booked per hour of the week (168 values, Monday 00:00 UTC first);
+    # only filled when device heatmaps are requested
+    heatmap: list[float] | None = None
+
+
+class TypeUtilization(BaseModel):
+    device_type: str
+    devices: int
+    utilization: float
+    # Most devices of this type booked in the same hour, and the first such hour
+    peak_concurrency: int
+    peak_at: datetime | None
+    heatmap: list[float]
+
+
+class UtilizationReport(BaseModel):
+    window_start: datetime
+    window_end: datetime
+    devices: list[DeviceUtilization]
+    types: list[TypeUtilization]
+    peak_concurrency: int
+    peak_at: datetime | None
+    # Devices booked less than the idle threshold, least used first
+    idle_devices: list[DeviceUtilization]
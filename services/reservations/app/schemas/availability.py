@@ -0,0 +1,42 @@
+import uuid
+from datetime import datetime, timedelta
+from typing import Any
+
+from pydantic import BaseModel, Field, field_validator
+
+# Keeps the sweep bounded; a month plus slack covers the topology editor's view
+MAX_HORIZON = timedelta(days=62)
+
+
+class AvailabilityQuery(BaseModel):
+    device_ids: list[uuid.UUID] = Field(..., min_length=1, max_length=200)
+    start: datetime
+    end: datetime
+    min_duration_minutes: int = Field(0, ge=0)
+
+    @field_validator("end")
+    @classmethod
+    def valid_horizon(cls, v: datetime, info: Any) -> datetime:
+        start = info.data.get("start")
+        if start and v <= start:
+            raise ValueError("end must be after start")
+        if start and v - start > MAX_HORIZON:
+            raise ValueError(f"Horizon cannot exceed {MAX_HORIZON.days} days")
+        return v
+
+
+class TimeWindow(BaseModel):
+    start: datetime
+    end: datetime
+
+
+class DeviceBusy(BaseModel):
+    device_id: uuid.UUID
+    busy: list[TimeWindow]
+
+
+class AvailabilityResponse(BaseModel):
+    start: datetime
+    end: datetime
+    devices: list[DeviceBusy]
+    free: list[TimeWindow]
@@ -0,0 +1,14 @@
+from datetime import datetime
+
+from pydantic import BaseModel
+
+
+class DeviceReadModelStatus(BaseModel):
+    devices: int
+    # Subscribed to inventory events and connected to NATS
+    live: bool
+    # Whether validation currently reads the local model instead of calling inventory
+    fresh: bool
+    staleness_seconds: float | None
+    snapshot_at: datetime | None
+    last_event_at: datetime | None
@@ -0,0 +1,10 @@
+from pydantic import BaseModel
+
+
+class LeaderStatus(BaseModel):
+    name: str
+    instance_id: str
+    is_leader: bool
+    leader: str | None
+    lease_age_seconds: float | None
+    lease_expires_in_seconds: float | None
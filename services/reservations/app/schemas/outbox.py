@@ -0,0 +1,6 @@
+from pydantic import BaseModel
+
+
+class OutboxStatus(BaseModel):
+    pending: int
+    lag_seconds: float
@@ -0,0 +1,8 @@
+from pydantic import BaseModel
+
+
+class PartitionInfo(BaseModel):
+    name: str
+    # PostgreSQL's partition bound, e.g. "FOR VALUES FROM (...) TO (...)" or "DEFAULT"
+    bound: str
+    estimated_rows: int
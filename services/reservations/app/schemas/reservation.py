@@ -2,7 +2,7 @@ import uuid
 from datetime import datetime
 from typing import Any
 
-from pydantic import BaseModel, field_validator
+from pydantic import BaseModel, Field, field_validator
 
 from app.models.reservation import ReservationStatus, TopologyType
 
@@ -18,7 +18,8 @@ class ReservationCreate(BaseModel):
     def device_ids_not_empty(cls, v: list[uuid.UUID]) -> list[uuid.UUID]:
         if not v:
             raise ValueError("At least one device must be specified")
-        return v
+        # A device named twice is booked once
+        return list(dict.fromkeys(v))
 
     @field_validator("end_time")
     @classmethod
@@ -39,6 +40,63 @@ class ReservationResponse(BaseModel):
     start_time: datetime
     end_time: datetime
     status: ReservationStatus
+    series_id: uuid.UUID | None = None
+    created_at: datetime
+
+    model_config = {"from_attributes": True}
+
+    @field_validator("device_ids", mode="before")
+    @classmethod
+    def coerce_device_ids(cls, v: Any) -> list[uuid.UUID]:
+        if isinstance(v, list):
+            return [uuid.UUID(str(item)) for item in v]
+        return v
+
+
+class ReservationPage(BaseModel):
+    items: list[ReservationResponse]
+    # Pass back as ?cursor= for the next page; null on the last page
+    next_cursor: str | None = None
+
+
+class ReservationBatchCreate(BaseModel):
+    items: list[ReservationCreate] = Field(..., min_length=1, max_length=100)
+    # all-or-nothing when true; otherwise every valid item is booked
+    atomic: bool = True
+
+
+class ReservationBatchItemResult(BaseModel):
+    index: int
+    status_code: int
+    reservation: ReservationResponse | None = None
+    error: str | None = None
+
+
+class ReservationBatchResponse(BaseModel):
+    results: list[ReservationBatchItemResult]
+
+
+class ReservationSeriesCreate(ReservationCreate):
+    """A recurring booking. start_time/end_time anchor the rule and give the
+    duration of every occurrence, e.g. FREQ=WEEKLY;BYDAY=MO,TU,WE,TH,FR;COUNT=260."""
+
+    rrule: str = Field(..., min_length=1, max_length=500)
+    timezone: str = "UTC"
+
+
+class ReservationSeriesResponse(BaseModel):
+    id: uuid.UUID
+    user_id: uuid.UUID
+    device_ids: list[uuid.UUID]
+    topology_type: TopologyType
+    purpose: str | None
+    rrule: str
+    timezone: str
+    start_time: datetime
+    end_time: datetime
+    until: datetime
+    materialized_until: datetime
+    status: ReservationStatus
     created_at: datetime
 
     model_config = {"from_attributes": True}
@@ -0,0 +1,38 @@
+import uuid
+from datetime import datetime
+from typing import Any
+
+from pydantic import BaseModel, field_validator
+
+from app.models.reservation import TopologyType
+from app.models.waitlist import WaitlistStatus
+from app.schemas.reservation import ReservationCreate
+
+
+class WaitlistCreate(ReservationCreate):
+    # Give up waiting after this; defaults to start_time and may not pass end_time
+    expires_at: datetime | None = None
+
+
+class WaitlistEntryResponse(BaseModel):
+    id: uuid.UUID
+    user_id: uuid.UUID
+    device_ids: list[uuid.UUID]
+    topology_type: TopologyType
+    purpose: str | None
+    start_time: datetime
+    end_time: datetime
+    expires_at: datetime
+    status: WaitlistStatus
+    # Set once granted: the reservation booked for this entry
+    reservation_id: uuid.UUID | None
+    created_at: datetime
+
+    model_config = {"from_attributes": True}
+
+    @field_validator("device_ids", mode="before")
+    @classmethod
+    def coerce_device_ids(cls, v: Any) -> list[uuid.UUID]:
+        if isinstance(v, list):
+            return [uuid.UUID(str(item)) for item in v]
+        return v
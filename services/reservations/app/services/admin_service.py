@@ -0,0 +1,91 @@
+"""
+Admin-wide reservation queries: by device, user, status and time window.
+
+Device filters go through the indexed reservation_devices rows rather than the JSON
+device_ids column. Results are ordered by (start_time, id) and paged with a keyset
+cursor, so the export can walk years of history one bounded batch at a time.
+"""
+
+import uuid
+from collections.abc import AsyncIterator
+from datetime import datetime
+
+from sqlalchemy import select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.reservation import Reservation, ReservationDevice, ReservationStatus
+from app.services.reservation_service import decode_cursor, encode_cursor
+
+
+def _filtered(
+    device_ids: list[uuid.UUID] | None,
+    user_id: uuid.UUID | None,
+    statuses: list[ReservationStatus] | None,
+    start: datetime | None,
+    end: datetime | None,
+):
+    query = select(Reservation)
+    if device_ids:
+        # Served by ix_reservation_devices_device_window
+        rows = select(ReservationDevice.reservation_id).where(
+            ReservationDevice.device_id.in_(device_ids)
+        )
+        if start is not None:
+            rows = rows.where(ReservationDevice.end_time > start)
+        if end is not None:
+            rows = rows.where(ReservationDevice.start_time < end)
+        query = query.where(Reservation.id.in_(rows))
+    if user_id is not None:
+        query = query.where(Reservation.user_id == user_id)
+    if statuses:
+        query = query.where(Reservation.status.in_(statuses))
+    if start is not None:
+        query = query.where(Reservation.end_time > start)
+    if end is not None:
+        query = query.where(Reservation.start_time < end)
+    return query
+
+
+async def search_reservations(
+    db: AsyncSession,
+    device_ids: list[uuid.UUID] | None = None,
+    user_id: uuid.UUID | None = None,
+    statuses: list[ReservationStatus] | None = None,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    cursor: str | None = None,
+    limit: int = 100,
+) -> tuple[list[Reservation], str | None]:
+    """One page of matching reservations in (start_time, id) order, plus the next cursor.
+
+    ``start``/``end`` keep reservations whose window overlaps [start, end).
+    """
+    query = _filtered(device_ids, user_id, statuses, start, end)
+    if cursor:
+        start_time, reservation_id = decode_cursor(cursor)
+        query = query.where(
+            tuple_(Reservation.start_time, Reservation.id) > tuple_(start_time, reservation_id)
+        )
+    result = await db.execute(
+        query.order_by(Reservation.start_time, Reservation.id).limit(limit + 1)
+    )
+    reservations = list(result.scalars().all())
+    if len(reservations) <= limit:
+        return reservations, None
+    last = reservations[limit - 1]
+    return reservations[:limit], encode_cursor(last.start_time, last.id)
+
+
+async def iter_reservations(
+    db: AsyncSession, batch_size: int = 500, **filters
+) -> AsyncIterator[Reservation]:
+    """Every matching reservation, fetched in keyset pages of ``batch_size``."""
+    cursor = None
+    while True:
+        page, cursor = await search_reservations(db, cursor=cursor, limit=batch_size, **filters)
+        for reservation in page:
+            yield reservation
+        if cursor is None:
+            return
+        # Drop the finished page from the identity map to keep memory flat
+        db.expunge_all()
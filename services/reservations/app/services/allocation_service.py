@@ -0,0 +1,225 @@
+"""
+Earliest-slot allocation of devices by type.
+
+Requests such as "2 FIREWALL and 4 SWITCH, PHYSICAL, 6 hours, as soon as possible"
+name device types rather than devices. The pool for each type is every AVAILABLE
+device of that type and topology in the device read-model; the pool's busy
+intervals over the search horizon come from one query, as for availability.
+When the read-model is stale its statuses are confirmed with the Inventory
+service first, as create_reservation does, so a device taken out of service
+since the last event is not offered.
+
+For a duration ``d``, a device can start a booking at any ``t`` in ``[a, b - d]``
+for each of its free gaps ``(a, b)``. One sweep over the endpoints of those ranges,
+counting how many devices of each type cover the current instant, yields every
+run of start times at which all types have enough free devices. The answer is the
+first such start at or after the preferred start; that costs O(n log n) in the
+number of busy intervals rather than a scan of the pool per candidate start.
+
+Devices for the chosen slot are picked by binary search in each device's sorted
+busy intervals, tightest fit first so longer free stretches stay open for later
+requests. The result is advisory: creating the reservation re-checks everything.
+"""
+
+import bisect
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta
+
+import httpx
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.device import DeviceReplica
+from app.schemas.allocation import AllocationQuery
+from app.schemas.availability import MAX_HORIZON
+from app.services.availability_service import Interval, free_windows, get_busy
+from app.services.reservation_service import lookup_devices
+from app.tasks.device_sync import device_read_model
+from app.utils.time import as_utc, utcnow
+
+DEFAULT_SEARCH = timedelta(days=14)
+
+_OPEN, _CLOSE = 0, 1
+
+
+class BusyIndex:
+    """A device's merged busy intervals as parallel sorted arrays, for bisection."""
+
+    def __init__(self, busy: list[Interval], horizon: datetime) -> None:
+        self.starts = [start for start, _ in busy]
+        self.ends = [end for _, end in busy]
+        self.horizon = horizon
+
+    def free_until(self, at: datetime) -> datetime | None:
+        """End of the free stretch containing ``at``, or None when ``at`` is busy."""
+        # Merged intervals are disjoint, so ends are sorted along with starts
+        i = bisect.bisect_right(self.ends, at)
+        if i == len(self.starts):
+            return self.horizon
+        if self.starts[i] <= at:
+            return None
+        return self.starts[i]
+
+
+def feasible_runs(
+    free: dict[str, list[list[Interval]]], needs: dict[str, int], duration: timedelta
+) -> list[Interval]:
+    """Closed ranges of start times at which every type has ``needs`` devices free.
+
+    ``free`` holds, per device type, each device's free windows of at least
+    ``duration``. The ranges come back sorted and disjoint.
+    """
+    events = []
+    for device_type, devices in free.items():
+        for windows in devices:
+            for start, end in windows:
+                events.append((start, _OPEN, device_type))
+                events.append((end - duration, _CLOSE, device_type))
+    # At equal instants openings go first: start ranges are closed at both ends
+    events.sort(key=lambda event: (event[0], event[1]))
+
+    covering: Counter[str] = Counter()
+    satisfied = 0
+    runs: list[Interval] = []
+    run_start = None
+    for at, kind, device_type in events:
+        need = needs[device_type]
+        if kind == _OPEN:
+            covering[device_type] += 1
+            if covering[device_type] == need:
+                satisfied += 1
+                if satisfied == len(needs):
+                    run_start = at
+        else:
+            if covering[device_type] == need:
+                if satisfied == len(needs):
+                    runs.append((run_start, at))
+                satisfied -= 1
+            covering[device_type] -= 1
+    return runs
+
+
+def nearest_starts(
+    runs: list[Interval], preferred: datetime, limit: int, exclude: datetime
+) -> list[datetime]:
+    """The start closest to ``preferred`` in each run, nearest ``limit`` first, in time order."""
+    candidates = {end if end < preferred else max(start, preferred) for start, end in runs}
+    candidates.discard(exclude)
+    return sorted(sorted(candidates, key=lambda t: abs(t - preferred))[:limit])
+
+
+async def _device_pools(
+    db: AsyncSession,
+    query: AllocationQuery,
+    needs: dict[str, int],
+    token: str,
+    http_client: httpx.AsyncClient | None = None,
+) -> dict[str, list[tuple[uuid.UUID, str]]]:
+    fresh = device_read_model.is_fresh()
+    if not fresh and device_read_model.staleness is None:
+        raise RuntimeError("Device read-model has not loaded yet; try again shortly")
+
+    stmt = select(DeviceReplica.id, DeviceReplica.name, DeviceReplica.device_type).where(
+        DeviceReplica.topology_type == query.topology_type,
+        DeviceReplica.device_type.in_(list(needs)),
+    )
+    if fresh:
+        # The same rule create_reservation applies to every device
+        stmt = stmt.where(DeviceReplica.status == "AVAILABLE")
+    rows = (await db.execute(stmt.order_by(DeviceReplica.name))).all()
+    if not fresh and rows:
+        # A stale model answers nothing locally, so this asks inventory
+        try:
+            found, _ = await lookup_devices([row.id for row in rows], token, http_client, db)
+        except Exception as exc:
+            raise RuntimeError(f"Failed to contact inventory service: {exc}") from exc
+        rows = [
+            row for row in rows
+            if row.id in found
+            and found[row.id]["status"] == "AVAILABLE"
+            and found[row.id]["topology_type"] == query.topology_type.value
+        ]
+
+    pools: dict[str, list[tuple[uuid.UUID, str]]] = {device_type: [] for device_type in needs}
+    for device_id, name, device_type in rows:
+        pools[device_type].append((device_id, name))
+    return pools
+
+
+async def allocate(
+    db: AsyncSession,
+    query: AllocationQuery,
+    token: str,
+    now: datetime | None = None,
+    http_client: httpx.AsyncClient | None = None,
+) -> dict:
+    """Find the earliest slot and the devices to book in it.
+
+    Raises ValueError for a request no pool can satisfy, LookupError when no
+    window before ``search_until`` has enough devices free at the same time, and
+    RuntimeError while the device read-model has never loaded or, when it is
+    stale, inventory cannot be reached.
+    """
+    needs: Counter[str] = Counter()
+    for item in query.items:
+        needs[item.device_type] += item.count
+    duration = timedelta(minutes=query.duration_minutes)
+    earliest = now or utcnow()
+    preferred = max(as_utc(query.start), earliest) if query.start else earliest
+    horizon = as_utc(query.search_until) if query.search_until else preferred + DEFAULT_SEARCH
+    if horizon - earliest > MAX_HORIZON:
+        raise ValueError(f"Search horizon cannot exceed {MAX_HORIZON.days} days")
+    if horizon - preferred < duration:
+        raise ValueError("search_until leaves no room for the requested duration")
+
+    pools = await _device_pools(db, query, needs, token, http_client)
+    short = [
+        f"{need} {device_type} requested, {len(pools[device_type])} available"
+        for device_type, need in needs.items()
+        if len(pools[device_type]) < need
+    ]
+    if short:
+        raise ValueError(
+            f"Not enough {query.topology_type.value} devices: {'; '.join(short)}"
+        )
+
+    device_ids = [device_id for pool in pools.values() for device_id, _ in pool]
+    busy = await get_busy(db, device_ids, earliest, horizon)
+    free = {
+        device_type: [
+            free_windows(busy[device_id], earliest, horizon, duration) for device_id, _ in pool
+        ]
+        for device_type, pool in pools.items()
+    }
+    runs = feasible_runs(free, needs, duration)
+    slot = next((max(start, preferred) for start, end in runs if end >= preferred), None)
+    if slot is None:
+        raise LookupError(
+            f"No window before {horizon.isoformat()} has enough devices free at the same time"
+        )
+
+    devices = []
+    for device_type, pool in pools.items():
+        fits = []
+        for device_id, name in pool:
+            until = BusyIndex(busy[device_id], horizon).free_until(slot)
+            if until is not None and until >= slot + duration:
+                fits.append((until, name, device_id))
+        fits.sort()
+        devices.extend(
+            {"id": device_id, "name": name, "device_type": device_type}
+            for _, name, device_id in fits[:needs[device_type]]
+        )
+
+    conflict = slot != preferred
+    alternatives = (
+        nearest_starts(runs, preferred, query.alternatives, exclude=slot) if conflict else []
+    )
+    return {
+        "start": slot,
+        "end": slot + duration,
+        "devices": devices,
+        "conflict": conflict,
+        "alternatives": [{"start": t, "end": t + duration} for t in alternatives],
+    }
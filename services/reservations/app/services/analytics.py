@@ -0,0 +1,299 @@
+"""
+Utilization analytics over finished reservations.
+
+Busy time is kept as a NumPy matrix of busy seconds per (device, hourly slot)
+covering the last ``analytics_window_days``. Interval rows are turned into that
+matrix without Python loops over slots: the partial first and last slot of each
+interval are accumulated with ``bincount``, and the whole slots in between with a
+difference array and a cumulative sum. A device's bookings never overlap (the
+exclusion constraint), so slot values stay within the slot length.
+
+The matrix is built once and then topped up with the reservation_devices rows
+that finished since the previous refresh, found through ix_reservation_devices_end.
+The grid extends a week past the moment it was built; after that it is rebuilt
+with a fresh window. Reports (hour-of-week heatmaps, utilization, peak
+concurrency, idle devices) are matrix products over it and are cached until the
+next refresh. Heatmap hours are UTC. Bookings released early count until their
+booked end, and months archived by ``app.services.partitions`` drop out.
+"""
+
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models.device import DeviceReplica
+from app.models.reservation import ReservationDevice, ReservationStatus, TopologyType
+from app.utils.time import as_utc, utcnow
+
+SLOT = timedelta(hours=1)
+SLOT_SECONDS = int(SLOT.total_seconds())
+HOURS_PER_WEEK = 7 * 24
+# How far past its build time the grid reaches before it is rebuilt
+_GRID_SLACK = timedelta(days=7)
+
+
+def occupancy(
+    device_index: np.ndarray,
+    starts: np.ndarray,
+    ends: np.ndarray,
+    n_devices: int,
+    n_slots: int,
+) -> np.ndarray:
+    """Busy seconds per (device, slot) for intervals in whole seconds from the grid
+    origin. Intervals are clipped to the grid."""
+    horizon = n_slots * SLOT_SECONDS
+    starts = np.clip(starts, 0, horizon)
+    ends = np.clip(ends, 0, horizon)
+    keep = ends > starts
+    device_index, starts, ends = device_index[keep], starts[keep], ends[keep]
+
+    first = starts // SLOT_SECONDS
+    # Slot holding the last busy second
+    last = (ends - 1) // SLOT_SECONDS
+    width = n_slots + 1
+    base = device_index * width
+    single = first == last
+
+    # Partial slots: the whole interval when it fits in one slot, otherwise its
+    # head in the first slot and its tail in the last
+    partial_index = np.concatenate(
+        [base + first, base[~single] + last[~single]]
+    )
+    partial_seconds = np.concatenate(
+        [
+            np.where(single, ends - starts, (first + 1) * SLOT_SECONDS - starts),
+            (ends - last * SLOT_SECONDS)[~single],
+        ]
+    )
+    partial = np.bincount(partial_index, weights=partial_seconds, minlength=n_devices * width)
+
+    # Whole slots first+1 .. last-1 as a difference array
+    multi = ~single
+    full_index = np.concatenate([base[multi] + first[multi] + 1, base[multi] + last[multi]])
+    full_weights = np.concatenate(
+        [np.full(multi.sum(), SLOT_SECONDS), np.full(multi.sum(), -SLOT_SECONDS)]
+    )
+    full = np.bincount(full_index, weights=full_weights, minlength=n_devices * width)
+
+    grid = partial.reshape(n_devices, width) + full.reshape(n_devices, width).cumsum(axis=1)
+    return grid[:, :n_slots].astype(np.float32)
+
+
+def hour_of_week(origin: datetime, n_slots: int) -> np.ndarray:
+    """Hour of the week (0 = Monday 00:00 UTC) of each slot of a grid starting at ``origin``."""
+    origin = as_utc(origin)
+    offset = origin.weekday() * 24 + origin.hour
+    return (offset + np.arange(n_slots)) % HOURS_PER_WEEK
+
+
+def _percent(numerator: np.ndarray, denominator) -> np.ndarray:
+    return np.round(
+        np.divide(
+            100.0 * numerator, denominator,
+            out=np.zeros(np.shape(numerator)), where=np.asarray(denominator) > 0,
+        ),
+        1,
+    )
+
+
+class UtilizationAnalytics:
+    """Per-process cache of the busy-seconds grid and the reports built from it."""
+
+    def __init__(
+        self,
+        window_days: int = settings.analytics_window_days,
+        refresh_seconds: int = settings.analytics_refresh_seconds,
+    ) -> None:
+        self._window = timedelta(days=window_days)
+        self._refresh_interval = timedelta(seconds=refresh_seconds)
+        self._lock = asyncio.Lock()
+        self._origin: datetime | None = None
+        self._grid_end: datetime | None = None
+        # Rows ending after this have not been loaded yet
+        self._watermark: datetime | None = None
+        self._refreshed_at: datetime | None = None
+        self._devices: dict[uuid.UUID, int] = {}
+        self._busy = np.zeros((0, 0), dtype=np.float32)
+        # Seconds from the origin at which each device was last busy; -1 for never
+        self._last_end = np.zeros(0, dtype=np.int64)
+        self._reports: dict[tuple, dict] = {}
+
+    def _reset(self, now: datetime) -> None:
+        hour = now.replace(minute=0, second=0, microsecond=0)
+        self._origin = hour - self._window
+        self._grid_end = hour + _GRID_SLACK
+        self._watermark = self._origin
+        self._devices = {}
+        n_slots = int((self._grid_end - self._origin) / SLOT)
+        self._busy = np.zeros((0, n_slots), dtype=np.float32)
+        self._last_end = np.zeros(0, dtype=np.int64)
+
+    def _add(self, rows: list) -> None:
+        new = [row.device_id for row in rows if row.device_id not in self._devices]
+        for device_id in dict.fromkeys(new):
+            self._devices[device_id] = len(self._devices)
+        grow = len(self._devices) - self._busy.shape[0]
+        if grow:
+            self._busy = np.vstack(
+                [self._busy, np.zeros((grow, self._busy.shape[1]), dtype=np.float32)]
+            )
+            self._last_end = np.concatenate([self._last_end, np.full(grow, -1, dtype=np.int64)])
+
+        origin = self._origin.timestamp()
+        device_index = np.fromiter(
+            (self._devices[row.device_id] for row in rows), dtype=np.int64, count=len(rows)
+        )
+        starts = np.fromiter(
+            (as_utc(row.start_time).timestamp() - origin for row in rows),
+            dtype=np.float64, count=len(rows),
+        ).astype(np.int64)
+        ends = np.fromiter(
+            (as_utc(row.end_time).timestamp() - origin for row in rows),
+            dtype=np.float64, count=len(rows),
+        ).astype(np.int64)
+        self._busy += occupancy(device_index, starts, ends, *self._busy.shape)
+        np.maximum.at(self._last_end, device_index, ends)
+
+    async def refresh(self, db: AsyncSession, now: datetime | None = None) -> int:
+        """Load the rows that finished since the last refresh; return how many."""
+        now = now or utcnow()
+        if self._origin is None or now >= self._grid_end:
+            self._reset(now)
+        result = await db.execute(
+            select(
+                ReservationDevice.device_id,
+                ReservationDevice.start_time,
+                ReservationDevice.end_time,
+            ).where(
+                ReservationDevice.status.in_(
+                    [ReservationStatus.ACTIVE, ReservationStatus.COMPLETED]
+                ),
+                ReservationDevice.end_time > self._watermark,
+                ReservationDevice.end_time <= now,
+            )
+        )
+        rows = result.all()
+        if rows:
+            await asyncio.to_thread(self._add, rows)
+        self._watermark = now
+        self._refreshed_at = now
+        self._reports.clear()
+        return len(rows)
+
+    async def report(
+        self,
+        db: AsyncSession,
+        device_type: str | None = None,
+        topology_type: TopologyType | None = None,
+        idle_threshold_percent: float = settings.analytics_idle_threshold_percent,
+        device_heatmaps: bool = False,
+    ) -> dict:
+        """Utilization report over the window, from cache when nothing new has finished."""
+        async with self._lock:
+            now = utcnow()
+            if self._refreshed_at is None or now - self._refreshed_at >= self._refresh_interval:
+                await self.refresh(db, now)
+            key = (device_type, topology_type, idle_threshold_percent, device_heatmaps)
+            if key not in self._reports:
+                query = select(DeviceReplica.id, DeviceReplica.name, DeviceReplica.device_type)
+                if device_type is not None:
+                    query = query.where(DeviceReplica.device_type == device_type)
+                if topology_type is not None:
+                    query = query.where(DeviceReplica.topology_type == topology_type)
+                devices = {row.id: (row.name, row.device_type) for row in await db.execute(query)}
+                if device_type is None and topology_type is None:
+                    # Booked devices the read-model does not know (since deleted)
+                    for device_id in self._devices:
+                        devices.setdefault(device_id, (None, None))
+                self._reports[key] = await asyncio.to_thread(
+                    self._build, devices, self._refreshed_at,
+                    idle_threshold_percent, device_heatmaps,
+                )
+            return self._reports[key]
+
+    def _build(
+        self,
+        devices: dict[uuid.UUID, tuple[str | None, str | None]],
+        now: datetime,
+        idle_threshold_percent: float,
+        device_heatmaps: bool,
+    ) -> dict:
+        ids = list(devices)
+        window_seconds = (now - self._origin).total_seconds()
+        elapsed = min(int(np.ceil(window_seconds / SLOT_SECONDS)), self._busy.shape[1])
+
+        # Devices never booked in the window get an all-zero row
+        rows = np.array([self._devices.get(d, -1) for d in ids], dtype=np.int64)
+        busy = np.zeros((len(ids), elapsed), dtype=np.float32)
+        known = rows >= 0
+        busy[known] = self._busy[rows[known], :elapsed]
+        last_end = np.full(len(ids), -1, dtype=np.int64)
+        last_end[known] = self._last_end[rows[known]]
+
+        utilization = _percent(busy.sum(axis=1), window_seconds)
+        weeks = np.zeros((elapsed, HOURS_PER_WEEK), dtype=np.float32)
+        weeks[np.arange(elapsed), hour_of_week(self._origin, elapsed)] = 1.0
+        slot_capacity = weeks.sum(axis=0) * SLOT_SECONDS
+        heatmap = _percent(busy @ weeks, slot_capacity)
+        in_use = (busy > 0).astype(np.float32)
+        concurrency = in_use.sum(axis=0)
+
+        types = sorted({t for _, t in devices.values() if t is not None})
+        membership = np.array(
+            [[devices[d][1] == t for d in ids] for t in types], dtype=np.float32
+        ).reshape(len(types), len(ids))
+        type_counts = membership.sum(axis=1)
+        type_concurrency = membership @ in_use
+
+        def slot_time(index: int) -> datetime | None:
+            return self._origin + index * SLOT if elapsed else None
+
+        def last_used(offset: int) -> datetime | None:
+            return self._origin + timedelta(seconds=int(offset)) if offset >= 0 else None
+
+        report = {
+            "window_start": self._origin,
+            "window_end": now,
+            "devices": [
+                {
+                    "device_id": device_id,
+                    "name": devices[device_id][0],
+                    "device_type": devices[device_id][1],
+                    "utilization": float(utilization[i]),
+                    "last_used": last_used(last_end[i]),
+                    "heatmap": heatmap[i].tolist() if device_heatmaps else None,
+                }
+                for i, device_id in enumerate(ids)
+            ],
+            "types": [
+                {
+                    "device_type": device_type,
+                    "devices": int(type_counts[t]),
+                    "utilization": float(
+                        np.round(membership[t] @ utilization / type_counts[t], 1)
+                    ),
+                    "peak_concurrency": int(type_concurrency[t].max(initial=0)),
+                    "peak_at": slot_time(int(type_concurrency[t].argmax()))
+                    if type_concurrency[t].any() else None,
+                    "heatmap": np.round(
+                        membership[t] @ heatmap / type_counts[t], 1
+                    ).tolist(),
+                }
+                for t, device_type in enumerate(types)
+            ],
+            "peak_concurrency": int(concurrency.max(initial=0)),
+            "peak_at": slot_time(int(concurrency.argmax())) if concurrency.any() else None,
+        }
+        report["idle_devices"] = sorted(
+            (d for d in report["devices"] if d["utilization"] < idle_threshold_percent),
+            key=lambda d: d["utilization"],
+        )
+        return report
+
+
+utilization_analytics = UtilizationAnalytics()
@@ -0,0 +1,97 @@
+"""
+Free/busy computation for a set of devices over a time horizon.
+
+One indexed query returns every ACTIVE/PENDING reservation_devices row for the
+requested devices that overlaps the horizon, ordered by (device_id, start_time).
+Busy intervals are then merged per device with a single sort-and-sweep pass, and
+the common free windows are the gaps in the union of all devices' busy intervals.
+Occurrences of recurring series that are not yet materialized are expanded over
+the horizon and counted as busy too.
+"""
+
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.reservation import ReservationDevice, ReservationStatus
+from app.services.recurrence import series_busy_windows
+from app.utils.time import as_utc
+
+Interval = tuple[datetime, datetime]
+
+
+def merge_intervals(intervals: list[Interval]) -> list[Interval]:
+    """Merge overlapping or touching half-open intervals. Input need not be sorted."""
+    merged: list[Interval] = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def free_windows(
+    busy: list[Interval], start: datetime, end: datetime, min_duration: timedelta
+) -> list[Interval]:
+    """Gaps in sorted, merged ``busy`` within [start, end) lasting at least ``min_duration``."""
+    windows: list[Interval] = []
+    cursor = start
+    for busy_start, busy_end in busy:
+        if busy_start - cursor >= min_duration and busy_start > cursor:
+            windows.append((cursor, busy_start))
+        cursor = max(cursor, busy_end)
+    if end - cursor >= min_duration and end > cursor:
+        windows.append((cursor, end))
+    return windows
+
+
+async def get_busy(
+    db: AsyncSession, device_ids: list[uuid.UUID], start: datetime, end: datetime
+) -> dict[uuid.UUID, list[Interval]]:
+    """Sorted, merged busy intervals per device, clipped to [start, end)."""
+    start, end = as_utc(start), as_utc(end)
+    pending_series = await series_busy_windows(db, device_ids, start, end)
+    result = await db.execute(
+        select(
+            ReservationDevice.device_id,
+            ReservationDevice.start_time,
+            ReservationDevice.end_time,
+        )
+        .where(
+            and_(
+                ReservationDevice.device_id.in_(device_ids),
+                ReservationDevice.status.in_(
+                    [ReservationStatus.ACTIVE, ReservationStatus.PENDING]
+                ),
+                ReservationDevice.start_time < end,
+                ReservationDevice.end_time > start,
+            )
+        )
+        .order_by(ReservationDevice.device_id, ReservationDevice.start_time)
+    )
+
+    raw: dict[uuid.UUID, list[Interval]] = {device_id: [] for device_id in device_ids}
+    for device_id, busy_start, busy_end in result.all():
+        raw[device_id].append((max(as_utc(busy_start), start), min(as_utc(busy_end), end)))
+    for device_id, intervals in pending_series.items():
+        raw[device_id].extend((max(s, start), min(e, end)) for s, e in intervals)
+
+    return {device_id: merge_intervals(intervals) for device_id, intervals in raw.items()}
+
+
+async def get_free_busy(
+    db: AsyncSession,
+    device_ids: list[uuid.UUID],
+    start: datetime,
+    end: datetime,
+    min_duration: timedelta = timedelta(0),
+) -> tuple[dict[uuid.UUID, list[Interval]], list[Interval]]:
+    """Return (busy intervals per device, common free windows) clipped to [start, end)."""
+    start, end = as_utc(start), as_utc(end)
+    busy = await get_busy(db, device_ids, start, end)
+    combined = merge_intervals([iv for intervals in busy.values() for iv in intervals])
+    return busy, free_windows(combined, start, end, min_duration)
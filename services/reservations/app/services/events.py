@@ -0,0 +1,36 @@
+"""
+Outbox event builders shared by the request handlers and the background tasks.
+
+Events are only added to the session here; they commit (or roll back) with the
+caller's change and the outbox relay publishes them to NATS afterwards.
+"""
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.outbox import OutboxEvent
+from app.models.reservation import Reservation
+
+
+def enqueue_event(db: AsyncSession, subject: str, event: dict) -> None:
+    """Write an event to the outbox; it commits (or rolls back) with the caller's change."""
+    db.add(OutboxEvent(subject=subject, payload=event))
+
+
+CREATED_SUBJECT = "herd.reservations.created"
+
+
+def created_event(reservation: Reservation) -> dict:
+    return {
+        "event": "reservation.created",
+        "reservation_id": str(reservation.id),
+        "user_id": str(reservation.user_id),
+        "device_ids": list(reservation.device_ids),
+        "topology_type": reservation.topology_type.value,
+        "start_time": reservation.start_time.isoformat(),
+        "end_time": reservation.end_time.isoformat(),
+        "series_id": str(reservation.series_id) if reservation.series_id else None,
+    }
+
+
+def enqueue_created_event(db: AsyncSession, reservation: Reservation) -> None:
+    enqueue_event(db, CREATED_SUBJECT, created_event(reservation))
@@ -0,0 +1,138 @@
+"""
+Idempotency keys for reservation mutations.
+
+A request sent with an ``Idempotency-Key`` header first claims the key for its user
+in a short transaction of its own, so concurrent duplicates cannot both run. Once
+the request succeeds its response is stored on the claimed row, and retries with
+the same key are answered from that row without running the request again. A
+failed request releases its claim so the client can retry it.
+"""
+
+import hashlib
+import uuid
+from datetime import timedelta
+from typing import Any
+
+from sqlalchemy import and_, delete, or_, select, tuple_, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models.idempotency import IdempotencyKey
+from app.utils.time import utcnow
+
+KEY_TTL = timedelta(hours=settings.idempotency_key_ttl_hours)
+CLAIM_TIMEOUT = timedelta(seconds=settings.idempotency_claim_timeout_seconds)
+
+
+def request_fingerprint(method: str, path: str, body: str = "") -> str:
+    return hashlib.sha256(f"{method} {path}\n{body}".encode()).hexdigest()
+
+
+def _key_matches(user_id: uuid.UUID, key: str):
+    return and_(IdempotencyKey.user_id == user_id, IdempotencyKey.key == key)
+
+
+async def claim_key(
+    db: AsyncSession, user_id: uuid.UUID, key: str, fingerprint: str
+) -> IdempotencyKey | None:
+    """Claim ``key`` for a new request, or return the completed row to replay.
+
+    Expired rows and claims abandoned for longer than ``CLAIM_TIMEOUT`` (the
+    request's replica died) are taken over. Commits either way.
+    Raises ValueError if the key was used for a different request, and LookupError
+    while the request holding the key is still running.
+    """
+    now = utcnow()
+    insert = pg_insert if db.bind.dialect.name == "postgresql" else sqlite_insert
+    result = await db.execute(
+        insert(IdempotencyKey)
+        .values(
+            user_id=user_id, key=key, fingerprint=fingerprint,
+            created_at=now, expires_at=now + KEY_TTL,
+        )
+        .on_conflict_do_nothing(index_elements=[IdempotencyKey.user_id, IdempotencyKey.key])
+        .returning(IdempotencyKey.key)
+    )
+    claimed = result.first() is not None
+    if not claimed:
+        result = await db.execute(
+            update(IdempotencyKey)
+            .where(
+                _key_matches(user_id, key),
+                or_(
+                    IdempotencyKey.expires_at <= now,
+                    and_(
+                        IdempotencyKey.status_code.is_(None),
+                        IdempotencyKey.created_at < now - CLAIM_TIMEOUT,
+                    ),
+                ),
+            )
+            .values(
+                fingerprint=fingerprint, status_code=None, response=None,
+                created_at=now, expires_at=now + KEY_TTL,
+            )
+            .returning(IdempotencyKey.key)
+            .execution_options(synchronize_session=False)
+        )
+        claimed = result.first() is not None
+
+    existing = None
+    if not claimed:
+        result = await db.execute(select(IdempotencyKey).where(_key_matches(user_id, key)))
+        existing = result.scalar_one_or_none()
+    await db.commit()
+    if claimed:
+        return None
+
+    if existing is not None and existing.fingerprint != fingerprint:
+        raise ValueError("Idempotency-Key was already used for a different request")
+    if existing is None or existing.status_code is None:
+        raise LookupError("A request with this Idempotency-Key is still in progress")
+    return existing
+
+
+async def complete_key(
+    db: AsyncSession, user_id: uuid.UUID, key: str, status_code: int, response: Any
+) -> None:
+    """Store the response of a claimed request so retries can replay it."""
+    await db.execute(
+        update(IdempotencyKey)
+        .where(_key_matches(user_id, key))
+        .values(status_code=status_code, response=response)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+
+
+async def release_key(db: AsyncSession, user_id: uuid.UUID, key: str) -> None:
+    """Drop the claim of a request that failed, so that a retry runs it again."""
+    await db.rollback()
+    await db.execute(
+        delete(IdempotencyKey).where(
+            _key_matches(user_id, key), IdempotencyKey.status_code.is_(None)
+        )
+    )
+    await db.commit()
+
+
+async def purge_expired_keys(db: AsyncSession, batch_size: int = 1000) -> int:
+    """Delete expired rows in batches, walking ix_idempotency_keys_expires_at."""
+    now = utcnow()
+    purged = 0
+    while True:
+        expired = (
+            select(IdempotencyKey.user_id, IdempotencyKey.key)
+            .where(IdempotencyKey.expires_at <= now)
+            .limit(batch_size)
+        )
+        result = await db.execute(
+            delete(IdempotencyKey).where(
+                tuple_(IdempotencyKey.user_id, IdempotencyKey.key).in_(expired)
+            )
+        )
+        await db.commit()
+        purged += result.rowcount
+        if result.rowcount < batch_size:
+            return purged
@@ -0,0 +1,311 @@
+"""
+Monthly range partitions of ``reservations`` by ``end_time`` (PostgreSQL only).
+
+Each month gets its own partition, created ``reservation_partition_premake_months``
+ahead; a DEFAULT partition catches bookings further out until their month comes
+within that horizon and is split out of it. Finished reservations thus
+end up in past months' partitions by themselves, and queries that only need live
+(PENDING/ACTIVE) rows bound ``end_time`` below by ``live_since`` so the planner
+prunes every older partition.
+
+A month is archived once it is ``reservation_archive_after_months`` old: its
+reservation_devices rows are moved to a table of their own (the foreign key would
+block the detach) and the partition is detached. If ``reservation_archive_dir`` is
+set both tables are then exported there as gzipped NDJSON,
+``reservations_pYYYY_MM.ndjson.gz`` and ``reservation_devices_pYYYY_MM.ndjson.gz``,
+and dropped; otherwise they stay behind as plain tables.
+"""
+
+import asyncio
+import gzip
+import logging
+import os
+from datetime import datetime, timezone
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.utils.time import utcnow
+
+logger = logging.getLogger(__name__)
+
+_schema = settings.db_schema or None
+_prefix = f"{_schema}." if _schema else ""
+
+PARENT = "reservations"
+DEFAULT_PARTITION = "reservations_default"
+_EXPORT_BATCH = 1000
+
+
+def month_start(value: datetime) -> datetime:
+    value = value.astimezone(timezone.utc)
+    return datetime(value.year, value.month, 1, tzinfo=timezone.utc)
+
+
+def add_months(month: datetime, months: int) -> datetime:
+    index = month.year * 12 + month.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1, tzinfo=timezone.utc)
+
+
+def partition_name(month: datetime) -> str:
+    return f"{PARENT}_p{month:%Y_%m}"
+
+
+def live_since(now: datetime | None = None) -> datetime:
+    """Lower bound on ``end_time`` for every PENDING/ACTIVE reservation.
+
+    The lifecycle scheduler completes reservations as they end, so nothing live is
+    older than the previous month; its periodic reconciliation sweep does not rely
+    on this bound and catches anything left over from a long outage. Only the
+    scheduler's own sweeps use it: reads and status changes made for users check
+    the status alone, so a reservation left live by an outage stays visible and
+    can still be cancelled or released.
+    """
+    return add_months(month_start(now or utcnow()), -1)
+
+
+def devices_table_name(partition: str) -> str:
+    """Where an archived month's reservation_devices rows are kept."""
+    return "reservation_devices" + partition.removeprefix(PARENT)
+
+
+def _literal(value: datetime) -> str:
+    # Partition bounds are DDL and cannot be bound parameters
+    return f"'{value.isoformat()}'"
+
+
+async def is_partitioned(db: AsyncSession) -> bool:
+    if db.bind.dialect.name != "postgresql":
+        return False
+    result = await db.execute(
+        text(
+            "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table "
+            "WHERE partrelid = to_regclass(:parent))"
+        ),
+        {"parent": f"{_prefix}{PARENT}"},
+    )
+    return bool(result.scalar())
+
+
+async def list_partitions(db: AsyncSession) -> list[dict]:
+    """Attached partitions with their bounds and planner row estimates, oldest first."""
+    result = await db.execute(
+        text(
+            "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) AS bound, "
+            "greatest(c.reltuples, 0)::bigint AS estimated_rows "
+            "FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = to_regclass(:parent) ORDER BY c.relname"
+        ),
+        {"parent": f"{_prefix}{PARENT}"},
+    )
+    return [dict(row._mapping) for row in result]
+
+
+async def _split_default(db: AsyncSession, name: str, lo: datetime, hi: datetime) -> int:
+    """Create partition ``name`` for [lo, hi) when the DEFAULT partition already holds
+    rows for it, and move them over; return how many reservations moved.
+
+    PostgreSQL refuses a new partition while the default holds rows in its range,
+    and detaching the default is blocked by the reservation_devices foreign key.
+    So the month's reservations and their device rows are copied aside and deleted
+    (the device rows by cascade), the partition is created, and both are inserted
+    back, all in the caller's transaction.
+    """
+    month = {"lo": lo, "hi": hi}
+    await db.execute(
+        text(
+            "CREATE TEMP TABLE split_reservations ON COMMIT DROP AS "
+            f"SELECT * FROM {_prefix}{DEFAULT_PARTITION} WHERE end_time >= :lo AND end_time < :hi"
+        ),
+        month,
+    )
+    await db.execute(
+        text(
+            "CREATE TEMP TABLE split_reservation_devices ON COMMIT DROP AS "
+            f"SELECT rd.* FROM {_prefix}reservation_devices rd "
+            "JOIN split_reservations r ON rd.reservation_id = r.id AND rd.end_time = r.end_time"
+        )
+    )
+    moved = await db.execute(
+        text(
+            f"DELETE FROM {_prefix}{DEFAULT_PARTITION} "
+            "WHERE end_time >= :lo AND end_time < :hi"
+        ),
+        month,
+    )
+    await db.execute(
+        text(
+            f"CREATE TABLE {_prefix}{name} PARTITION OF {_prefix}{PARENT} "
+            f"FOR VALUES FROM ({_literal(lo)}) TO ({_literal(hi)})"
+        )
+    )
+    await db.execute(text(f"INSERT INTO {_prefix}{name} SELECT * FROM split_reservations"))
+    await db.execute(
+        text(
+            f"INSERT INTO {_prefix}reservation_devices "
+            "SELECT * FROM split_reservation_devices"
+        )
+    )
+    # Another month may be split in the same transaction
+    await db.execute(text("DROP TABLE split_reservation_devices, split_reservations"))
+    return moved.rowcount
+
+
+async def ensure_partitions(
+    db: AsyncSession,
+    now: datetime | None = None,
+    months_ahead: int = settings.reservation_partition_premake_months,
+) -> list[str]:
+    """Create the monthly partitions from the current month to ``months_ahead``.
+
+    A month whose rows already sit in the DEFAULT partition (booked beyond the
+    horizon) is split out of it, so those rows are pruned and archived like any
+    other. Does not commit.
+    """
+    existing = {p["relname"] for p in await list_partitions(db)}
+    current = month_start(now or utcnow())
+    created = []
+    for offset in range(months_ahead + 1):
+        lo, hi = add_months(current, offset), add_months(current, offset + 1)
+        name = partition_name(lo)
+        if name in existing:
+            continue
+        in_default = await db.execute(
+            text(
+                f"SELECT EXISTS (SELECT 1 FROM {_prefix}{DEFAULT_PARTITION} "
+                "WHERE end_time >= :lo AND end_time < :hi)"
+            ),
+            {"lo": lo, "hi": hi},
+        )
+        if in_default.scalar():
+            moved = await _split_default(db, name, lo, hi)
+            logger.info(
+                "Moved %d reservations from the default partition into %s", moved, name,
+                extra={"action": "partition_split", "partition": name},
+            )
+        else:
+            await db.execute(
+                text(
+                    f"CREATE TABLE {_prefix}{name} PARTITION OF {_prefix}{PARENT} "
+                    f"FOR VALUES FROM ({_literal(lo)}) TO ({_literal(hi)})"
+                )
+            )
+        created.append(name)
+    return created
+
+
+async def _export(db: AsyncSession, table: str, path: str) -> int:
+    """Stream a detached partition to ``path`` as gzipped NDJSON; return the row count."""
+    result = await db.stream(text(f"SELECT row_to_json(t)::text FROM {_prefix}{table} t"))
+    tmp = f"{path}.tmp"
+    rows = 0
+    try:
+        with gzip.open(tmp, "wt", encoding="utf-8") as fh:
+            async for batch in result.partitions(_EXPORT_BATCH):
+                await asyncio.to_thread(fh.writelines, [row[0] + "\n" for row in batch])
+                rows += len(batch)
+    finally:
+        # End the transaction: its open cursor would block dropping the table
+        await db.rollback()
+    os.replace(tmp, path)
+    return rows
+
+
+async def _detached_partitions(db: AsyncSession) -> list[str]:
+    """Month tables no longer attached to the parent, e.g. left by an interrupted archive."""
+    result = await db.execute(
+        text(
+            "SELECT c.relname FROM pg_class c "
+            "JOIN pg_namespace n ON n.oid = c.relnamespace "
+            "WHERE n.nspname = coalesce(:schema, current_schema()) AND c.relkind = 'r' "
+            "AND NOT c.relispartition AND c.relname LIKE :pattern ORDER BY c.relname"
+        ),
+        {"schema": _schema, "pattern": f"{PARENT}\\_p%"},
+    )
+    return list(result.scalars())
+
+
+async def _table_exists(db: AsyncSession, table: str) -> bool:
+    result = await db.execute(
+        text("SELECT to_regclass(:table) IS NOT NULL"), {"table": f"{_prefix}{table}"}
+    )
+    return bool(result.scalar())
+
+
+async def archive_partitions(
+    db: AsyncSession,
+    now: datetime | None = None,
+    after_months: int = settings.reservation_archive_after_months,
+    archive_dir: str = settings.reservation_archive_dir,
+) -> list[str]:
+    """Detach (and optionally export and drop) months older than ``after_months``.
+
+    Commits after each partition. A month that still has PENDING/ACTIVE rows is
+    left attached until the lifecycle scheduler has finished them. Its
+    reservation_devices rows go to ``devices_table_name(month)``. With
+    ``archive_dir`` set, every detached month table and its device rows are
+    exported and dropped, including any left behind by an earlier run that
+    failed half-way.
+    """
+    cutoff = add_months(month_start(now or utcnow()), -after_months)
+    archived = []
+    for partition in await list_partitions(db):
+        name = partition["relname"]
+        if name == DEFAULT_PARTITION or name >= partition_name(cutoff):
+            continue
+        live = await db.execute(
+            text(
+                f"SELECT count(*) FROM {_prefix}{name} "
+                "WHERE status IN ('PENDING', 'ACTIVE')"
+            )
+        )
+        if live.scalar():
+            logger.warning("Not archiving partition %s: it still has live reservations", name)
+            continue
+
+        # The devices' foreign key would block the detach, and finished rows are
+        # never needed for conflict checks: move them out beside the month
+        devices = devices_table_name(name)
+        await db.execute(
+            text(
+                f"CREATE TABLE IF NOT EXISTS {_prefix}{devices} "
+                f"(LIKE {_prefix}reservation_devices)"
+            )
+        )
+        await db.execute(
+            text(
+                f"WITH moved AS (DELETE FROM {_prefix}reservation_devices rd "
+                f"USING {_prefix}{name} r WHERE rd.reservation_id = r.id RETURNING rd.*) "
+                f"INSERT INTO {_prefix}{devices} SELECT * FROM moved"
+            )
+        )
+        await db.execute(text(f"ALTER TABLE {_prefix}{PARENT} DETACH PARTITION {_prefix}{name}"))
+        await db.commit()
+        logger.info(
+            "Detached partition %s", name,
+            extra={"action": "partition_detach", "partition": name},
+        )
+        archived.append(name)
+
+    if archive_dir:
+        for name in await _detached_partitions(db):
+            path = os.path.join(archive_dir, f"{name}.ndjson.gz")
+            devices = devices_table_name(name)
+            devices_path = os.path.join(archive_dir, f"{devices}.ndjson.gz")
+            # Device rows first: once the month table is dropped this one is orphaned
+            device_rows = 0
+            if await _table_exists(db, devices):
+                device_rows = await _export(db, devices, devices_path)
+            rows = await _export(db, name, path)
+            await db.execute(text(f"DROP TABLE IF EXISTS {_prefix}{devices}"))
+            await db.execute(text(f"DROP TABLE {_prefix}{name}"))
+            await db.commit()
+            logger.info(
+                "Archived partition %s (%d rows) to %s and its %d device rows to %s",
+                name, rows, path, device_rows, devices_path,
+                extra={"action": "partition_archive", "partition": name},
+            )
+            if name not in archived:
+                archived.append(name)
+    return archived
@@ -0,0 +1,213 @@
+"""
+Recurring reservations: RRULE expansion and lazy occurrence materialization.
+
+A series stores its rule and the window of its first occurrence. Occurrences are
+written as ordinary reservations only once they come within
+``recurrence_materialize_ahead_hours`` (at creation, then by the lifecycle task).
+Until then, conflict checks expand the rule over just the window being checked, so
+a year-long series costs one row plus a handful of near-term occurrences.
+"""
+
+import bisect
+import uuid
+from collections.abc import Iterable
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from dateutil.rrule import rrule, rrulestr
+from sqlalchemy import Select, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.reservation import (
+    Reservation,
+    ReservationDevice,
+    ReservationSeries,
+    ReservationSeriesDevice,
+    ReservationStatus,
+)
+from app.services.events import enqueue_created_event
+from app.utils.time import as_utc
+
+Interval = tuple[datetime, datetime]
+
+# Bounded so a series can always be fully expanded when it is created
+MAX_SERIES_SPAN = timedelta(days=366)
+ALLOWED_FREQUENCIES = {"DAILY", "WEEKLY", "MONTHLY", "YEARLY"}
+
+
+@lru_cache(maxsize=1024)
+def parse_rule(rule: str, start_time: datetime, tz: str) -> rrule:
+    """Parse an RRULE anchored at ``start_time`` and expanded in zone ``tz``.
+
+    Raises ValueError for unknown zones, malformed rules and sub-daily frequencies.
+    """
+    body = rule.strip()
+    if body.upper().startswith("RRULE:"):
+        body = body[len("RRULE:"):]
+    parts = dict(part.split("=", 1) for part in body.upper().split(";") if "=" in part)
+    if parts.get("FREQ") not in ALLOWED_FREQUENCIES:
+        raise ValueError(
+            f"Recurrence FREQ must be one of {', '.join(sorted(ALLOWED_FREQUENCIES))}"
+        )
+    try:
+        zone = ZoneInfo(tz)
+    except (ZoneInfoNotFoundError, ValueError) as exc:
+        raise ValueError(f"Unknown timezone: {tz}") from exc
+    try:
+        parsed = rrulestr(body, dtstart=as_utc(start_time).astimezone(zone))
+    except (ValueError, TypeError) as exc:
+        raise ValueError(f"Invalid recurrence rule: {exc}") from exc
+    if not isinstance(parsed, rrule):
+        raise ValueError("Invalid recurrence rule: expected a single RRULE")
+    return parsed
+
+
+def series_rule(series: ReservationSeries) -> rrule:
+    return parse_rule(series.rrule, as_utc(series.start_time), series.timezone)
+
+
+def series_duration(series: ReservationSeries) -> timedelta:
+    return as_utc(series.end_time) - as_utc(series.start_time)
+
+
+def occurrence_starts(rule: rrule, lo: datetime, hi: datetime) -> list[datetime]:
+    """Occurrence start times in [lo, hi), in UTC."""
+    return [as_utc(s) for s in rule.between(lo, hi, inc=True) if s < hi]
+
+
+def series_end(rule: rrule, start_time: datetime, end_time: datetime) -> datetime:
+    """End of the last occurrence; the rule must finish within ``MAX_SERIES_SPAN``."""
+    limit = as_utc(start_time) + MAX_SERIES_SPAN
+    if rule.after(limit) is not None:
+        raise ValueError("Recurrence must end (COUNT or UNTIL) within 366 days")
+    last = rule.before(limit, inc=True)
+    if last is None:
+        raise ValueError("Recurrence rule produces no occurrences")
+    return as_utc(last) + (end_time - start_time)
+
+
+def overlaps_any(windows: list[Interval], start: datetime, end: datetime) -> bool:
+    """Whether [start, end) overlaps any of the sorted, disjoint ``windows``."""
+    i = bisect.bisect_left(windows, (end,))
+    return i > 0 and windows[i - 1][1] > start
+
+
+def pending_series(device_ids: list[uuid.UUID], start: datetime, end: datetime) -> Select:
+    """Active series on ``device_ids`` that may still have unmaterialized
+    occurrences overlapping [start, end)."""
+    return select(ReservationSeries).where(
+        ReservationSeries.id.in_(
+            select(ReservationSeriesDevice.series_id).where(
+                ReservationSeriesDevice.device_id.in_(device_ids)
+            )
+        ),
+        ReservationSeries.status == ReservationStatus.ACTIVE,
+        ReservationSeries.materialized_until < end,
+        ReservationSeries.materialized_until < ReservationSeries.until,
+        ReservationSeries.until > start,
+    )
+
+
+def expand_busy_windows(
+    series_rows: Iterable, device_ids: list[uuid.UUID], start: datetime, end: datetime
+) -> dict[uuid.UUID, list[Interval]]:
+    """Expand ``pending_series`` results (entities or rows) into per-device windows."""
+    start, end = as_utc(start), as_utc(end)
+    wanted = set(device_ids)
+    busy: dict[uuid.UUID, list[Interval]] = {}
+    for series in series_rows:
+        duration = series_duration(series)
+        lo = max(as_utc(series.materialized_until), start - duration)
+        windows = [
+            (s, s + duration)
+            for s in occurrence_starts(series_rule(series), lo, end)
+            if s + duration > start
+        ]
+        if not windows:
+            continue
+        for device_id in series.device_ids:
+            if uuid.UUID(device_id) in wanted:
+                busy.setdefault(uuid.UUID(device_id), []).extend(windows)
+    return busy
+
+
+async def series_busy_windows(
+    db: AsyncSession, device_ids: list[uuid.UUID], start: datetime, end: datetime
+) -> dict[uuid.UUID, list[Interval]]:
+    """Not-yet-materialized occurrences of active series on ``device_ids`` that
+    overlap [start, end).
+
+    Callers must run this before reading reservation_devices: if the materializer
+    commits in between, its rows are then visible to the later query.
+    """
+    start, end = as_utc(start), as_utc(end)
+    result = await db.execute(pending_series(device_ids, start, end))
+    return expand_busy_windows(result.scalars(), device_ids, start, end)
+
+
+def materialize(
+    db: AsyncSession, series: ReservationSeries, horizon: datetime
+) -> list[Reservation]:
+    """Write the series' occurrences starting before ``horizon`` as reservations.
+
+    Occurrences that have already ended are skipped. Adds the rows and their created
+    events to the session without committing.
+    """
+    now = datetime.now(timezone.utc)
+    duration = series_duration(series)
+    reservations = []
+    for start in occurrence_starts(
+        series_rule(series), as_utc(series.materialized_until), horizon
+    ):
+        end = start + duration
+        if end <= now:
+            continue
+        status = ReservationStatus.PENDING if start > now else ReservationStatus.ACTIVE
+        reservation = Reservation(
+            id=uuid.uuid4(),
+            user_id=series.user_id,
+            series_id=series.id,
+            device_ids=list(dict.fromkeys(series.device_ids)),
+            topology_type=series.topology_type,
+            purpose=series.purpose,
+            start_time=start,
+            end_time=end,
+            status=status,
+            devices=[
+                ReservationDevice(
+                    device_id=uuid.UUID(device_id),
+                    start_time=start,
+                    end_time=end,
+                    status=status,
+                )
+                # Series stored before device_ids were de-duplicated may repeat one
+                for device_id in dict.fromkeys(series.device_ids)
+            ],
+        )
+        db.add(reservation)
+        enqueue_created_event(db, reservation)
+        reservations.append(reservation)
+    series.materialized_until = horizon
+    return reservations
+
+
+async def materialize_due_series(db: AsyncSession, horizon: datetime) -> list[Reservation]:
+    """Materialize every active series up to ``horizon``. Does not commit.
+
+    No conflict check is needed: a series' occurrences were checked when it was
+    created, and every later booking checks the unmaterialized ones.
+    """
+    result = await db.execute(
+        select(ReservationSeries)
+        .where(
+            ReservationSeries.status == ReservationStatus.ACTIVE,
+            ReservationSeries.materialized_until < horizon,
+            ReservationSeries.materialized_until < ReservationSeries.until,
+        )
+        .with_for_update(skip_locked=True)
+    )
+    created: list[Reservation] = []
+    for series in result.scalars():
+        created.extend(materialize(db, series, horizon))
+    return created
@@ -4,45 +4,235 @@ Reservation service: core business logic.
 Key rules enforced here:
 1. All requested devices must exist in the inventory service.
 2. All devices must share the same topology_type (no mixing PHYSICAL + CLOUD).
-3. No time-window overlap with existing active reservations for the same devices.
-4. On success, emit a NATS event to notify downstream services.
+3. No time-window overlap with existing active reservations for the same devices,
+   including occurrences of recurring series that are not yet materialized.
+4. On create/cancel/release, write an event to the transactional outbox; the relay
+   publishes it to NATS after commit.
 5. On create/cancel/release, update device statuses in inventory (best-effort).
+6. Cancel/release grant waitlisted bookings that now fit, oldest first.
 """
 
 import asyncio
+import base64
 import hashlib
-import json
 import logging
 import uuid
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 
 import httpx
-from sqlalchemy import and_, select, text
+from sqlalchemy import (
+    Select,
+    String,
+    and_,
+    cast,
+    column,
+    exists,
+    func,
+    insert,
+    literal,
+    literal_column,
+    select,
+    text,
+    true,
+    tuple_,
+    update,
+    values,
+)
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.config import settings
-from app.models.reservation import Reservation, ReservationStatus, TopologyType
-from app.schemas.reservation import ReservationCreate
+from app.inventory_client import inventory_client, update_device_statuses
+from app.models.outbox import OutboxEvent
+from app.models.reservation import (
+    Reservation,
+    ReservationDevice,
+    ReservationSeries,
+    ReservationSeriesDevice,
+    ReservationStatus,
+    TopologyType,
+)
+from app.models.waitlist import WaitlistDevice, WaitlistEntry, WaitlistStatus
+from app.schemas.reservation import ReservationCreate, ReservationSeriesCreate
+from app.schemas.waitlist import WaitlistCreate
+from app.services.events import (
+    CREATED_SUBJECT,
+    created_event,
+    enqueue_created_event,
+    enqueue_event,
+)
+from app.services.recurrence import (
+    expand_busy_windows,
+    materialize,
+    occurrence_starts,
+    overlaps_any,
+    parse_rule,
+    pending_series,
+    series_busy_windows,
+    series_end,
+)
+from app.services.waitlist import (
+    GRANTED_SUBJECT,
+    FreedWindow,
+    affected_waiters,
+    finish_entry,
+    waitlist_event,
+)
+from app.tasks.device_sync import device_read_model
+from app.tasks.lifecycle import lifecycle_scheduler
+from app.tasks.outbox import outbox_relay
+from app.utils.time import as_utc, utcnow
 
 logger = logging.getLogger(__name__)
 
+# Most IDs Inventory's devices:batchGet accepts in one request
+_BATCH_GET_MAX_IDS = 500
 
-async def _fetch_devices(device_ids: list[uuid.UUID], token: str) -> list[dict]:
-    """Fetch device info from Inventory service concurrently."""
-    async with httpx.AsyncClient() as client:
 
-        async def fetch_one(device_id: uuid.UUID) -> dict:
-            resp = await client.get(
-                f"{settings.inventory_service_url}/devices/{device_id}",
-                headers={"Authorization": f"Bearer {token}"},
-                timeout=10.0,
+async def lookup_devices(
+    device_ids: list[uuid.UUID],
+    token: str,
+    http_client: httpx.AsyncClient | None = None,
+    db: AsyncSession | None = None,
+) -> tuple[dict[uuid.UUID, dict], list[uuid.UUID]]:
+    """Look devices up, locally when the device read-model is fresh.
+
+    Anything the read-model cannot answer (it is stale, or the device is newer than
+    the last event) is fetched from the Inventory service in batch requests of at
+    most ``_BATCH_GET_MAX_IDS``, sent concurrently.
+    Returns (found devices keyed by ID, IDs inventory does not know).
+    """
+    found = await device_read_model.lookup(db, device_ids) if db is not None else {}
+    remaining = [d for d in dict.fromkeys(device_ids) if d not in found]
+    if not remaining:
+        return found, []
+
+    async with inventory_client(http_client) as client:
+        responses = await asyncio.gather(
+            *(
+                client.post(
+                    "/devices:batchGet",
+                    json={"ids": [str(d) for d in remaining[i:i + _BATCH_GET_MAX_IDS]]},
+                    headers={"Authorization": f"Bearer {token}"},
+                )
+                for i in range(0, len(remaining), _BATCH_GET_MAX_IDS)
             )
-            if resp.status_code == 404:
-                raise ValueError(f"Device {device_id} not found in inventory")
-            resp.raise_for_status()
-            return resp.json()
+        )
+    missing = []
+    for resp in responses:
+        resp.raise_for_status()
+        body = resp.json()
+        found.update((uuid.UUID(d["id"]), d) for d in body["devices"])
+        missing.extend(uuid.UUID(d) for d in body["missing"])
+    return found, missing
+
+
+async def _fetch_devices(
+    device_ids: list[uuid.UUID],
+    token: str,
+    http_client: httpx.AsyncClient | None = None,
+    db: AsyncSession | None = None,
+) -> list[dict]:
+    """Fetch device info for validation; every device must exist."""
+    found, missing = await lookup_devices(device_ids, token, http_client, db)
+    if missing:
+        raise ValueError(
+            f"Devices not found in inventory: {', '.join(str(d) for d in missing)}"
+        )
+    return list(found.values())
+
+
+# A booking that waits for its time window may queue behind other reservations,
+# but not for a device that is out of service
+_WAITLIST_STATUSES = ("AVAILABLE", "RESERVED")
+
+
+def _validate_devices(
+    devices: list[dict], statuses: tuple[str, ...] = ("AVAILABLE",)
+) -> TopologyType:
+    """Enforce topology uniformity and that every device's status is one of
+    ``statuses``; return the shared topology type."""
+    topology_types = {d["topology_type"] for d in devices}
+    if len(topology_types) > 1:
+        raise ValueError(
+            f"All devices must share the same topology type. Found: {', '.join(topology_types)}"
+        )
+
+    unavailable = [d["name"] for d in devices if d["status"] not in statuses]
+    if unavailable:
+        raise ValueError(
+            f"The following devices are not available: {', '.join(unavailable)}"
+        )
+    return TopologyType(topology_types.pop())
+
+
+def _new_reservation(
+    data: ReservationCreate, user_id: uuid.UUID, topology_type: TopologyType
+) -> Reservation:
+    """Build a reservation with device_ids as JSON-serializable strings, plus one
+    indexed reservation_devices row per device."""
+    return Reservation(
+        id=uuid.uuid4(),
+        user_id=user_id,
+        device_ids=[str(d) for d in data.device_ids],
+        topology_type=topology_type,
+        purpose=data.purpose,
+        start_time=data.start_time,
+        end_time=data.end_time,
+        status=ReservationStatus.ACTIVE,
+        created_at=utcnow(),
+        devices=[
+            ReservationDevice(
+                device_id=device_id,
+                start_time=data.start_time,
+                end_time=data.end_time,
+                status=ReservationStatus.ACTIVE,
+            )
+            for device_id in dict.fromkeys(data.device_ids)
+        ],
+    )
+
+
+def _dialect(db: AsyncSession) -> str:
+    return db.bind.dialect.name if db.bind else ""
+
+
+def _window_overlaps(db: AsyncSession, start_time: datetime, end_time: datetime):
+    """Half-open overlap predicate on ReservationDevice.
 
-        return await asyncio.gather(*[fetch_one(did) for did in device_ids])
+    On PostgreSQL this is written as a tstzrange overlap so the planner can use the
+    GiST index behind the exclusion constraint; elsewhere it is plain comparisons.
+    """
+    if _dialect(db) == "postgresql":
+        bounds = literal_column("'[)'")
+        return func.tstzrange(
+            ReservationDevice.start_time, ReservationDevice.end_time, bounds
+        ).op("&&")(func.tstzrange(start_time, end_time, bounds))
+    return and_(ReservationDevice.start_time < end_time, ReservationDevice.end_time > start_time)
+
+
+def _conflicting_devices(
+    db: AsyncSession,
+    device_ids: list[uuid.UUID],
+    start_time: datetime,
+    end_time: datetime,
+    exclude_id: uuid.UUID | None = None,
+) -> Select:
+    """Devices with an ACTIVE/PENDING reservation row overlapping [start_time, end_time)."""
+    query = (
+        select(ReservationDevice.device_id)
+        .where(
+            ReservationDevice.device_id.in_(device_ids),
+            ReservationDevice.status.in_(
+                [ReservationStatus.ACTIVE, ReservationStatus.PENDING]
+            ),
+            _window_overlaps(db, start_time, end_time),
+        )
+        .distinct()
+    )
+    if exclude_id:
+        query = query.where(ReservationDevice.reservation_id != exclude_id)
+    return query
 
 
 async def _check_conflicts(
@@ -55,82 +245,146 @@ async def _check_conflicts(
     """
     Returns a list of device_ids that have conflicting reservations in the given window.
     Conflict = any ACTIVE/PENDING reservation overlapping [start_time, end_time).
+    Only rows for the requested devices are read, via the per-device index;
+    not-yet-materialized occurrences of recurring series are expanded first.
     """
-    query = select(Reservation).where(
-        and_(
-            Reservation.status.in_([ReservationStatus.ACTIVE, ReservationStatus.PENDING]),
-            Reservation.start_time < end_time,
-            Reservation.end_time > start_time,
-        )
+    conflicting = set(await series_busy_windows(db, device_ids, start_time, end_time))
+    result = await db.execute(
+        _conflicting_devices(db, device_ids, start_time, end_time, exclude_id)
     )
-    if exclude_id:
-        query = query.where(Reservation.id != exclude_id)
-
-    result = await db.execute(query)
-    conflicting_reservations = result.scalars().all()
-
-    # device_ids stored as JSON strings; normalize for comparison
-    requested_str = {str(d) for d in device_ids}
-    conflicting_devices: list[uuid.UUID] = []
+    conflicting.update(result.scalars().all())
+    return list(conflicting)
 
-    for res in conflicting_reservations:
-        existing_str = {str(d) for d in res.device_ids}
-        overlap = requested_str & existing_str
-        conflicting_devices.extend(uuid.UUID(d) for d in overlap)
-
-    return list(set(conflicting_devices))
 
+async def set_device_rows_status(
+    db: AsyncSession, reservation_ids: list[uuid.UUID], status: ReservationStatus
+) -> None:
+    """Mirror a reservation status change onto its reservation_devices rows.
 
-async def _publish_nats_event(nc, event: dict) -> None:
-    """Publish a NATS event using the provided connection. Errors are logged, never raised."""
-    if nc is None:
+    Does not commit; callers include it in the same transaction as the status change.
+    """
+    if not reservation_ids:
         return
-    try:
-        js = nc.jetstream()
-        await js.publish(
-            "herd.reservations.created",
-            json.dumps(event, default=str).encode(),
-        )
-    except Exception:
-        logger.error("Failed to publish NATS event: %s", event.get("event"), exc_info=True)
+    await db.execute(
+        update(ReservationDevice)
+        .where(ReservationDevice.reservation_id.in_(reservation_ids))
+        .values(status=status)
+    )
 
 
 async def _update_device_statuses(
-    device_ids: list[uuid.UUID], status: str, token: str
+    device_ids: list[uuid.UUID],
+    status: str,
+    token: str,
+    http_client: httpx.AsyncClient | None = None,
 ) -> None:
-    """Best-effort update of device statuses in the inventory service."""
-    if not settings.internal_api_token:
-        return
+    """Best-effort update of device statuses in the inventory service, in one bulk call."""
+    await update_device_statuses(device_ids, status, http_client)
 
-    async with httpx.AsyncClient() as client:
 
-        async def update_one(device_id: uuid.UUID) -> None:
-            try:
-                await client.post(
-                    f"{settings.inventory_service_url}/devices/{device_id}/status",
-                    json={"status": status},
-                    headers={"X-Internal-Token": settings.internal_api_token},
-                    timeout=10.0,
-                )
-            except Exception:
-                logger.error(
-                    "Failed to update device %s status to %s", device_id, status, exc_info=True
-                )
-
-        await asyncio.gather(*[update_one(did) for did in device_ids])
+def _lock_keys(device_ids: list[uuid.UUID]) -> list[int]:
+    return sorted(
+        {int(hashlib.sha256(str(d).encode()).hexdigest()[:15], 16) for d in device_ids}
+    )
 
 
 async def _acquire_device_locks(db: AsyncSession, device_ids: list[uuid.UUID]) -> None:
-    """Acquire PostgreSQL advisory locks for each device to prevent race conditions.
-    Locks are sorted to avoid deadlocks and auto-release on transaction commit.
-    No-op on SQLite (tests).
+    """Acquire a PostgreSQL advisory lock per device, all in one statement.
+    Keys are locked in ascending order (unnest preserves array order) to avoid
+    deadlocks and auto-release on transaction commit. No-op on SQLite (tests).
+
+    This deliberately stays separate from the conflict check: a READ COMMITTED
+    statement takes its snapshot when it starts, so a check in the same statement
+    would miss a reservation committed while it waited for a lock.
     """
-    dialect = db.bind.dialect.name if db.bind else ""
-    if dialect != "postgresql":
+    if _dialect(db) != "postgresql":
         return
-    for device_id_str in sorted(str(d) for d in device_ids):
-        lock_key = int(hashlib.sha256(device_id_str.encode()).hexdigest()[:15], 16)
-        await db.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": lock_key})
+    await db.execute(
+        text("SELECT count(pg_advisory_xact_lock(k)) FROM unnest(CAST(:keys AS bigint[])) AS k"),
+        {"keys": _lock_keys(device_ids)},
+    )
+
+
+async def _insert_unless_conflicting(
+    db: AsyncSession, reservation: Reservation
+) -> list[uuid.UUID]:
+    """PostgreSQL: conflict check and every insert in one data-modifying CTE.
+
+    The reservation, its reservation_devices rows and the outbox event are only
+    inserted when no materialized reservation overlaps. Series that may have
+    unmaterialized occurrences in the window come back in the same statement (and
+    snapshot) and are expanded here. Returns the conflicting device IDs; the caller
+    rolls back if there are any.
+    """
+    device_ids = [row.device_id for row in reservation.devices]
+    start_time, end_time = reservation.start_time, reservation.end_time
+    conflicts = _conflicting_devices(db, device_ids, start_time, end_time).cte("conflicts")
+
+    table = Reservation.__table__
+    columns = {
+        "id": reservation.id,
+        "user_id": reservation.user_id,
+        "device_ids": reservation.device_ids,
+        "topology_type": reservation.topology_type,
+        "purpose": reservation.purpose,
+        "start_time": start_time,
+        "end_time": end_time,
+        "status": reservation.status,
+        "created_at": reservation.created_at,
+    }
+    inserted = (
+        insert(table)
+        .from_select(
+            list(columns),
+            select(*(literal(v, table.c[k].type) for k, v in columns.items())).where(
+                ~exists(conflicts.select())
+            ),
+        )
+        .returning(table.c.id)
+        .cte("inserted")
+    )
+
+    rd = ReservationDevice.__table__
+    requested = values(column("device_id", rd.c.device_id.type), name="requested").data(
+        [(d,) for d in device_ids]
+    )
+    inserted_devices = insert(rd).from_select(
+        ["reservation_id", "device_id", "start_time", "end_time", "status"],
+        select(
+            inserted.c.id,
+            requested.c.device_id,
+            literal(start_time, rd.c.start_time.type),
+            literal(end_time, rd.c.end_time.type),
+            literal(reservation.status, rd.c.status.type),
+        ).select_from(inserted.join(requested, true())),
+    ).cte("inserted_devices")
+
+    outbox = OutboxEvent.__table__
+    inserted_event = insert(outbox).from_select(
+        ["id", "subject", "payload"],
+        select(
+            literal(uuid.uuid4(), outbox.c.id.type),
+            literal(CREATED_SUBJECT, outbox.c.subject.type),
+            literal(created_event(reservation), outbox.c.payload.type),
+        ).select_from(inserted),
+    ).cte("inserted_event")
+
+    # An aggregate without GROUP BY always yields one row, series or not
+    conflicting = select(func.array_agg(conflicts.c.device_id).label("devices")).subquery()
+    candidates = pending_series(device_ids, start_time, end_time).cte("candidates")
+    result = await db.execute(
+        select(conflicting.c.devices, candidates)
+        .select_from(conflicting.outerjoin(candidates, true()))
+        .add_cte(inserted_devices, inserted_event)
+    )
+    rows = result.all()
+    busy = set(rows[0].devices or [])
+    busy.update(
+        expand_busy_windows(
+            [row for row in rows if row.id is not None], device_ids, start_time, end_time
+        )
+    )
+    return list(busy)
 
 
 async def create_reservation(
@@ -138,55 +392,52 @@ async def create_reservation(
     data: ReservationCreate,
     user_id: uuid.UUID,
     token: str,
-    nats_conn=None,
+    http_client: httpx.AsyncClient | None = None,
 ) -> Reservation:
-    # 1. Fetch all devices from inventory (concurrently)
+    # 1. Fetch all devices, from the local read-model or inventory in one batch call
     try:
-        devices = await _fetch_devices(data.device_ids, token)
+        devices = await _fetch_devices(data.device_ids, token, http_client, db)
     except ValueError as exc:
         raise exc
     except Exception as exc:
         raise RuntimeError(f"Failed to contact inventory service: {exc}") from exc
 
-    # 2. Validate topology_type uniformity
-    topology_types = {d["topology_type"] for d in devices}
-    if len(topology_types) > 1:
-        raise ValueError(
-            f"All devices must share the same topology type. Found: {', '.join(topology_types)}"
-        )
-    topology_type = TopologyType(topology_types.pop())
-
-    # 3. Check availability (status == AVAILABLE)
-    unavailable = [d["name"] for d in devices if d["status"] != "AVAILABLE"]
-    if unavailable:
-        raise ValueError(
-            f"The following devices are not available: {', '.join(unavailable)}"
-        )
+    # 2-3. Validate topology_type uniformity and availability (status == AVAILABLE)
+    topology_type = _validate_devices(devices)
 
     # 4. Acquire advisory locks to prevent concurrent conflicting reservations
     await _acquire_device_locks(db, data.device_ids)
 
-    # 5. Check time-window conflicts
-    conflicting = await _check_conflicts(db, data.device_ids, data.start_time, data.end_time)
-    if conflicting:
+    # 5-6. Check time-window conflicts, then create the reservation and its outbox
+    # event in the same transaction (a single statement on PostgreSQL)
+    reservation = _new_reservation(data, user_id, topology_type)
+    try:
+        if _dialect(db) == "postgresql":
+            conflicting = await _insert_unless_conflicting(db, reservation)
+        else:
+            conflicting = await _check_conflicts(
+                db, data.device_ids, data.start_time, data.end_time
+            )
+            if not conflicting:
+                db.add(reservation)
+                enqueue_created_event(db, reservation)
+        if conflicting:
+            await db.rollback()
+            raise LookupError(
+                f"Time conflict: devices {[str(d) for d in conflicting]} already reserved "
+                f"in the requested window"
+            )
+        await db.commit()
+    except IntegrityError as exc:
+        # The exclusion constraint caught an overlap the advisory locks did not
+        await db.rollback()
         raise LookupError(
-            f"Time conflict: devices {[str(d) for d in conflicting]} already reserved "
-            f"in the requested window"
-        )
-
-    # 6. Create reservation: store device_ids as JSON-serializable strings
-    reservation = Reservation(
-        user_id=user_id,
-        device_ids=[str(d) for d in data.device_ids],
-        topology_type=topology_type,
-        purpose=data.purpose,
-        start_time=data.start_time,
-        end_time=data.end_time,
-        status=ReservationStatus.ACTIVE,
+            "Time conflict: one or more devices are already reserved in the requested window"
+        ) from exc
+    outbox_relay.wake()
+    await lifecycle_scheduler.notify(
+        reservation.id, reservation.status, reservation.start_time, reservation.end_time
     )
-    db.add(reservation)
-    await db.commit()
-    await db.refresh(reservation)
 
     logger.info(
         "Reservation created: %s", reservation.id,
@@ -198,32 +449,204 @@ async def create_reservation(
     )
 
     # 7. Mark devices as RESERVED in inventory (best-effort)
-    await _update_device_statuses(data.device_ids, "RESERVED", token)
+    await _update_device_statuses(data.device_ids, "RESERVED", token, http_client)
 
-    # 8. Emit NATS event
-    await _publish_nats_event(
-        nats_conn,
-        {
-            "event": "reservation.created",
-            "reservation_id": str(reservation.id),
-            "user_id": str(user_id),
-            "device_ids": [str(d) for d in data.device_ids],
-            "topology_type": topology_type.value,
-            "start_time": data.start_time.isoformat(),
-            "end_time": data.end_time.isoformat(),
-        },
+    return reservation
+
+
+async def _busy_windows(
+    db: AsyncSession, device_ids: list[uuid.UUID], start_time: datetime, end_time: datetime
+) -> dict[uuid.UUID, list[tuple[datetime, datetime]]]:
+    """Existing ACTIVE/PENDING windows per device overlapping [start_time, end_time),
+    including unmaterialized occurrences of recurring series."""
+    busy = await series_busy_windows(db, device_ids, start_time, end_time)
+    result = await db.execute(
+        select(
+            ReservationDevice.device_id, ReservationDevice.start_time, ReservationDevice.end_time
+        ).where(
+            ReservationDevice.device_id.in_(device_ids),
+            ReservationDevice.status.in_(
+                [ReservationStatus.ACTIVE, ReservationStatus.PENDING]
+            ),
+            _window_overlaps(db, start_time, end_time),
+        )
     )
+    for row in result.all():
+        busy.setdefault(row.device_id, []).append((as_utc(row.start_time), as_utc(row.end_time)))
+    return busy
 
-    return reservation
+
+async def create_reservations_batch(
+    db: AsyncSession,
+    items: list[ReservationCreate],
+    user_id: uuid.UUID,
+    token: str,
+    atomic: bool = True,
+    http_client: httpx.AsyncClient | None = None,
+) -> list[Reservation | Exception]:
+    """Create many reservations with one inventory lookup, lock pass, conflict query
+    and commit.
+
+    Items are checked against existing bookings and against earlier items in the same
+    batch. Returns one entry per item, in order: the created reservation or the
+    ValueError/LookupError that rejected it. With ``atomic`` set, any rejection is
+    raised instead (prefixed with the item index) and nothing is written. Otherwise
+    each item is written under its own SAVEPOINT, so one the database still refuses
+    (the exclusion constraint) fails alone.
+    """
+    all_ids = list(dict.fromkeys(d for item in items for d in item.device_ids))
+    try:
+        found, _ = await lookup_devices(all_ids, token, http_client, db)
+    except Exception as exc:
+        raise RuntimeError(f"Failed to contact inventory service: {exc}") from exc
+
+    await _acquire_device_locks(db, all_ids)
+    busy = await _busy_windows(
+        db,
+        all_ids,
+        min(item.start_time for item in items),
+        max(item.end_time for item in items),
+    )
+
+    outcomes: list[Reservation | Exception] = []
+    for item in items:
+        start, end = as_utc(item.start_time), as_utc(item.end_time)
+        try:
+            missing = [d for d in item.device_ids if d not in found]
+            if missing:
+                raise ValueError(
+                    f"Devices not found in inventory: {', '.join(str(d) for d in missing)}"
+                )
+            topology_type = _validate_devices([found[d] for d in dict.fromkeys(item.device_ids)])
+            conflicting = [
+                d for d in dict.fromkeys(item.device_ids)
+                if any(s < end and e > start for s, e in busy.get(d, ()))
+            ]
+            if conflicting:
+                raise LookupError(
+                    f"Time conflict: devices {[str(d) for d in conflicting]} already reserved "
+                    f"in the requested window"
+                )
+        except (ValueError, LookupError) as exc:
+            outcomes.append(exc)
+            continue
+        for device_id in dict.fromkeys(item.device_ids):
+            busy.setdefault(device_id, []).append((start, end))
+        outcomes.append(_new_reservation(item, user_id, topology_type))
+
+    if atomic:
+        for index, outcome in enumerate(outcomes):
+            if isinstance(outcome, Exception):
+                raise type(outcome)(f"Item {index}: {outcome}")
+
+    if atomic:
+        for outcome in outcomes:
+            db.add(outcome)
+            enqueue_created_event(db, outcome)
+    else:
+        for index, outcome in enumerate(outcomes):
+            if not isinstance(outcome, Reservation):
+                continue
+            try:
+                async with db.begin_nested():
+                    db.add(outcome)
+                    enqueue_created_event(db, outcome)
+            except IntegrityError:
+                outcomes[index] = LookupError(
+                    "Time conflict: one or more devices are already reserved in the "
+                    "requested window"
+                )
+
+    reservations = [o for o in outcomes if isinstance(o, Reservation)]
+    if not reservations:
+        await db.rollback()
+        return outcomes
+
+    try:
+        await db.commit()
+    except IntegrityError as exc:
+        await db.rollback()
+        raise LookupError(
+            "Time conflict: one or more devices are already reserved in the requested window"
+        ) from exc
+    # Reload every row (server defaults included) in one query
+    await db.execute(
+        select(Reservation).where(Reservation.id.in_([r.id for r in reservations]))
+    )
+    outbox_relay.wake()
+    for reservation in reservations:
+        await lifecycle_scheduler.notify(
+            reservation.id, reservation.status, reservation.start_time, reservation.end_time
+        )
+
+    logger.info(
+        "Batch created %d of %d reservations", len(reservations), len(items),
+        extra={"action": "reservation_batch_create", "user_id": str(user_id)},
+    )
+
+    await _update_device_statuses(
+        list(dict.fromkeys(uuid.UUID(d) for r in reservations for d in r.device_ids)),
+        "RESERVED",
+        token,
+        http_client,
+    )
+    return outcomes
+
+
+# Shown when no status filter is given: what is still coming up or under way
+DEFAULT_LIST_STATUSES = (ReservationStatus.PENDING, ReservationStatus.ACTIVE)
+
+
+def encode_cursor(created_at: datetime, reservation_id: uuid.UUID) -> str:
+    raw = f"{as_utc(created_at).isoformat()}|{reservation_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
 
 
-async def list_user_reservations(db: AsyncSession, user_id: uuid.UUID) -> list[Reservation]:
+def decode_cursor(cursor: str) -> tuple[datetime, uuid.UUID]:
+    try:
+        created_at, reservation_id = base64.urlsafe_b64decode(cursor).decode().split("|")
+        return as_utc(datetime.fromisoformat(created_at)), uuid.UUID(reservation_id)
+    except ValueError as exc:
+        raise ValueError("Invalid cursor") from exc
+
+
+async def list_user_reservations(
+    db: AsyncSession,
+    user_id: uuid.UUID,
+    statuses: list[ReservationStatus] | None = None,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    cursor: str | None = None,
+    limit: int = 50,
+) -> tuple[list[Reservation], str | None]:
+    """One page of a user's reservations, newest first, and the cursor for the next.
+
+    Keyset pagination on (created_at, id) backed by ix_reservations_user_created, so
+    deep pages cost the same as the first. ``start``/``end`` keep reservations whose
+    window overlaps [start, end).
+    """
+    statuses = statuses or DEFAULT_LIST_STATUSES
+    query = select(Reservation).where(
+        Reservation.user_id == user_id,
+        Reservation.status.in_(statuses),
+    )
+    if start is not None:
+        query = query.where(Reservation.end_time > start)
+    if end is not None:
+        query = query.where(Reservation.start_time < end)
+    if cursor:
+        created_at, reservation_id = decode_cursor(cursor)
+        query = query.where(
+            tuple_(Reservation.created_at, Reservation.id) < tuple_(created_at, reservation_id)
+        )
     result = await db.execute(
-        select(Reservation)
-        .where(Reservation.user_id == user_id)
-        .order_by(Reservation.created_at.desc())
+        query.order_by(Reservation.created_at.desc(), Reservation.id.desc()).limit(limit + 1)
     )
-    return list(result.scalars().all())
+    reservations = list(result.scalars().all())
+    if len(reservations) <= limit:
+        return reservations, None
+    last = reservations[limit - 1]
+    return reservations[:limit], encode_cursor(last.created_at, last.id)
 
 
 async def get_reservation(
@@ -238,17 +661,134 @@ async def get_reservation(
     return result.scalar_one_or_none()
 
 
-async def cancel_reservation(
-    db: AsyncSession, reservation_id: uuid.UUID, user_id: uuid.UUID, token: str = ""
+async def _finish_reservation(
+    db: AsyncSession,
+    reservation_id: uuid.UUID,
+    user_id: uuid.UUID,
+    from_statuses: tuple[ReservationStatus, ...],
+    to_status: ReservationStatus,
+    subject: str,
+    event: str,
 ) -> Reservation | None:
-    reservation = await get_reservation(db, reservation_id, user_id)
-    if not reservation:
-        return None
-    if reservation.status in (ReservationStatus.COMPLETED, ReservationStatus.CANCELLED):
-        return reservation
-    reservation.status = ReservationStatus.CANCELLED
+    """Move a reservation from one of ``from_statuses`` to ``to_status`` together
+    with its reservation_devices rows and outbox event, then commit.
+
+    Returns the updated reservation, or None if it is not in ``from_statuses``
+    (or does not exist). On PostgreSQL everything runs as one data-modifying CTE.
+    The lookup is by ID and status alone: a live reservation the scheduler has not
+    finished yet can still be moved however old it is.
+    """
+    if _dialect(db) == "postgresql":
+        table = Reservation.__table__
+        updated = (
+            update(table)
+            .where(
+                table.c.id == reservation_id,
+                table.c.user_id == user_id,
+                table.c.status.in_(from_statuses),
+            )
+            .values(status=to_status)
+            .returning(*table.c)
+            .cte("updated")
+        )
+        rd = ReservationDevice.__table__
+        updated_devices = (
+            update(rd)
+            .where(rd.c.reservation_id.in_(select(updated.c.id)))
+            .values(status=to_status)
+            .cte("updated_devices")
+        )
+        outbox = OutboxEvent.__table__
+        updated_event = insert(outbox).from_select(
+            ["id", "subject", "payload"],
+            select(
+                literal(uuid.uuid4(), outbox.c.id.type),
+                literal(subject, outbox.c.subject.type),
+                func.json_build_object(
+                    *_json_pairs(
+                        event=literal(event, String),
+                        reservation_id=cast(updated.c.id, String),
+                        user_id=cast(updated.c.user_id, String),
+                        device_ids=updated.c.device_ids,
+                    )
+                ),
+            ).select_from(updated),
+        ).cte("updated_event")
+        result = await db.execute(
+            select(Reservation).from_statement(
+                select(updated).add_cte(updated_devices, updated_event)
+            )
+        )
+        reservation = result.scalar_one_or_none()
+    else:
+        result = await db.execute(
+            update(Reservation)
+            .where(
+                Reservation.id == reservation_id,
+                Reservation.user_id == user_id,
+                Reservation.status.in_(from_statuses),
+            )
+            .values(status=to_status)
+            .returning(Reservation)
+        )
+        reservation = result.scalar_one_or_none()
+        if reservation is not None:
+            await set_device_rows_status(db, [reservation.id], to_status)
+            enqueue_event(db, subject, _status_event(event, reservation))
     await db.commit()
-    await db.refresh(reservation)
+    return reservation
+
+
+def _json_pairs(**fields) -> list:
+    """Flatten keyword arguments into json_build_object's key, value arguments."""
+    return [arg for key, value in fields.items() for arg in (literal(key, String), value)]
+
+
+def _status_event(event: str, reservation: Reservation) -> dict:
+    return {
+        "event": event,
+        "reservation_id": str(reservation.id),
+        "user_id": str(reservation.user_id),
+        "device_ids": list(reservation.device_ids),
+    }
+
+
+async def _release_devices(
+    db: AsyncSession,
+    device_ids: list[uuid.UUID],
+    freed: list[FreedWindow],
+    token: str,
+    http_client: httpx.AsyncClient | None,
+) -> None:
+    """After a commit that ended bookings: mark ``device_ids`` AVAILABLE in
+    inventory (best-effort) and offer the ``freed`` windows to the waitlist."""
+    if device_ids:
+        await _update_device_statuses(device_ids, "AVAILABLE", token, http_client)
+    if freed:
+        await grant_waiters(db, freed, http_client, token)
+
+
+async def cancel_reservation(
+    db: AsyncSession,
+    reservation_id: uuid.UUID,
+    user_id: uuid.UUID,
+    token: str = "",
+    http_client: httpx.AsyncClient | None = None,
+) -> Reservation | None:
+    reservation = await _finish_reservation(
+        db, reservation_id, user_id,
+        (ReservationStatus.PENDING, ReservationStatus.ACTIVE),
+        ReservationStatus.CANCELLED,
+        "herd.reservations.cancelled",
+        "reservation.cancelled",
+    )
+    if reservation is None:
+        # Missing (404), or already completed/cancelled and returned unchanged
+        return await get_reservation(db, reservation_id, user_id)
+    outbox_relay.wake()
+    await lifecycle_scheduler.notify(
+        reservation.id, reservation.status, reservation.start_time, reservation.end_time
+    )
 
     logger.info(
         "Reservation cancelled: %s", reservation_id,
@@ -259,24 +799,35 @@ async def cancel_reservation(
         },
     )
 
-    # Mark devices as AVAILABLE in inventory (best-effort)
     device_ids = [uuid.UUID(d) for d in reservation.device_ids]
-    await _update_device_statuses(device_ids, "AVAILABLE", token)
-
+    await _release_devices(
+        db, device_ids, [(device_ids, reservation.start_time, reservation.end_time)],
+        token, http_client,
+    )
     return reservation
 
 
 async def release_reservation(
-    db: AsyncSession, reservation_id: uuid.UUID, user_id: uuid.UUID, token: str = ""
+    db: AsyncSession,
+    reservation_id: uuid.UUID,
+    user_id: uuid.UUID,
+    token: str = "",
+    http_client: httpx.AsyncClient | None = None,
 ) -> Reservation | None:
-    reservation = await get_reservation(db, reservation_id, user_id)
-    if not reservation:
-        return None
-    if reservation.status != ReservationStatus.ACTIVE:
-        return reservation
-    reservation.status = ReservationStatus.COMPLETED
-    await db.commit()
-    await db.refresh(reservation)
+    reservation = await _finish_reservation(
+        db, reservation_id, user_id,
+        (ReservationStatus.ACTIVE,),
+        ReservationStatus.COMPLETED,
+        "herd.reservations.released",
+        "reservation.released",
+    )
+    if reservation is None:
+        # Missing (404), or not ACTIVE and returned unchanged
+        return await get_reservation(db, reservation_id, user_id)
+    outbox_relay.wake()
+    await lifecycle_scheduler.notify(
+        reservation.id, reservation.status, reservation.start_time, reservation.end_time
+    )
 
     logger.info(
         "Reservation released: %s", reservation_id,
@@ -287,8 +838,392 @@ async def release_reservation(
         },
     )
 
-    # Mark devices as AVAILABLE in inventory (best-effort)
     device_ids = [uuid.UUID(d) for d in reservation.device_ids]
-    await _update_device_statuses(device_ids, "AVAILABLE", token)
-
+    await _release_devices(
+        db, device_ids, [(device_ids, reservation.start_time, reservation.end_time)],
+        token, http_client,
+    )
     return reservation
+
+
+async def join_waitlist(
+    db: AsyncSession,
+    data: WaitlistCreate,
+    user_id: uuid.UUID,
+    token: str,
+    http_client: httpx.AsyncClient | None = None,
+) -> WaitlistEntry:
+    """Queue a booking until its devices are free, then try to grant it right away
+    in case they freed up since it conflicted."""
+    start, end = as_utc(data.start_time), as_utc(data.end_time)
+    expires_at = as_utc(data.expires_at) if data.expires_at else start
+    if expires_at <= utcnow():
+        raise ValueError("expires_at must be in the future")
+    if expires_at > end:
+        raise ValueError("expires_at cannot be after end_time")
+
+    try:
+        devices = await _fetch_devices(data.device_ids, token, http_client, db)
+    except ValueError as exc:
+        raise exc
+    except Exception as exc:
+        raise RuntimeError(f"Failed to contact inventory service: {exc}") from exc
+    # Conflicts with other bookings are what the waitlist is for
+    topology_type = _validate_devices(devices, _WAITLIST_STATUSES)
+
+    device_ids = list(dict.fromkeys(data.device_ids))
+    entry = WaitlistEntry(
+        id=uuid.uuid4(),
+        user_id=user_id,
+        device_ids=[str(d) for d in data.device_ids],
+        topology_type=topology_type,
+        purpose=data.purpose,
+        start_time=start,
+        end_time=end,
+        expires_at=expires_at,
+        status=WaitlistStatus.WAITING,
+        created_at=utcnow(),
+        devices=[
+            WaitlistDevice(device_id=device_id, start_time=start, end_time=end)
+            for device_id in device_ids
+        ],
+    )
+    db.add(entry)
+    await db.commit()
+
+    logger.info(
+        "Waitlist entry created: %s", entry.id,
+        extra={"action": "waitlist_join", "entry_id": str(entry.id), "user_id": str(user_id)},
+    )
+    await grant_waiters(db, [(device_ids, start, end)], http_client, token)
+    await db.refresh(entry)
+    return entry
+
+
+async def _current_devices(
+    db: AsyncSession,
+    device_ids: list[uuid.UUID],
+    token: str,
+    http_client: httpx.AsyncClient | None,
+) -> dict[uuid.UUID, dict]:
+    """Devices as inventory sees them now, for re-checking waiters at grant time.
+
+    Without a user token (the lifecycle loop) only the local read-model can answer,
+    and nothing is known while it is stale. Lookup errors are logged, not raised.
+    """
+    if not device_ids:
+        return {}
+    if not token:
+        return await device_read_model.lookup(db, device_ids)
+    try:
+        found, _ = await lookup_devices(device_ids, token, http_client, db)
+    except Exception:
+        logger.warning("Could not check waitlisted devices with inventory", exc_info=True)
+        return {}
+    return found
+
+
+async def grant_waiters(
+    db: AsyncSession,
+    freed: list[FreedWindow],
+    http_client: httpx.AsyncClient | None = None,
+    token: str = "",
+) -> list[uuid.UUID]:
+    """Book every waitlist entry that fits now that ``freed`` windows are free.
+
+    Only entries waiting for one of the freed devices in an overlapping window are
+    read, oldest first. Their devices are checked again as in create_reservation:
+    an entry whose devices went out of service, or whose devices cannot be looked
+    up right now, keeps waiting. Each grant locks its devices, re-checks for
+    conflicts and commits on its own, so entries granted earlier in the pass take
+    precedence and a grant that raced another replica is simply skipped. The grant
+    is announced on NATS through the outbox, together with the reservation's
+    created event.
+
+    Runs in a session of its own, so rolling back a failed grant leaves the
+    caller's objects loaded. Returns the IDs of the reservations booked.
+    """
+    granted: list[tuple[uuid.UUID, ReservationStatus, ReservationCreate]] = []
+    async with AsyncSession(db.bind, expire_on_commit=False) as session:
+        waiters = [
+            (
+                entry.id,
+                entry.user_id,
+                entry.topology_type,
+                ReservationCreate(
+                    device_ids=[uuid.UUID(d) for d in entry.device_ids],
+                    purpose=entry.purpose,
+                    start_time=as_utc(entry.start_time),
+                    end_time=as_utc(entry.end_time),
+                ),
+                waitlist_event("waitlist.granted", entry),
+            )
+            for entry in await affected_waiters(session, freed, utcnow())
+        ]
+        devices = await _current_devices(
+            session,
+            list(dict.fromkeys(d for *_, data, _ in waiters for d in data.device_ids)),
+            token,
+            http_client,
+        )
+        for entry_id, user_id, topology_type, data, event in waiters:
+            try:
+                _validate_devices(
+                    [devices[d] for d in dict.fromkeys(data.device_ids)], _WAITLIST_STATUSES
+                )
+            except (KeyError, ValueError) as exc:
+                logger.info(
+                    "Waitlist entry %s not granted: %s", entry_id,
+                    "device status unknown" if isinstance(exc, KeyError) else exc,
+                    extra={"action": "waitlist_skip", "entry_id": str(entry_id)},
+                )
+                continue
+            await _acquire_device_locks(session, data.device_ids)
+            if await _check_conflicts(session, data.device_ids, data.start_time, data.end_time):
+                # Nothing written; ending the transaction releases the locks
+                await session.commit()
+                continue
+            reservation = _new_reservation(data, user_id, topology_type)
+            if not await finish_entry(session, entry_id, WaitlistStatus.GRANTED, reservation.id):
+                await session.commit()
+                continue
+            session.add(reservation)
+            enqueue_created_event(session, reservation)
+            enqueue_event(
+                session, GRANTED_SUBJECT, {**event, "reservation_id": str(reservation.id)}
+            )
+            try:
+                await session.commit()
+            except IntegrityError:
+                # The exclusion constraint caught an overlap the advisory locks did not
+                await session.rollback()
+                continue
+            granted.append((reservation.id, reservation.status, data))
+            logger.info(
+                "Waitlist entry granted: %s", entry_id,
+                extra={
+                    "action": "waitlist_grant",
+                    "entry_id": str(entry_id),
+                    "reservation_id": str(reservation.id),
+                    "user_id": str(user_id),
+                },
+            )
+
+    if not granted:
+        return []
+    outbox_relay.wake()
+    for reservation_id, status, data in granted:
+        await lifecycle_scheduler.notify(reservation_id, status, data.start_time, data.end_time)
+    await _update_device_statuses(
+        list(dict.fromkeys(d for _, _, data in granted for d in data.device_ids)),
+        "RESERVED",
+        "",
+        http_client,
+    )
+    return [reservation_id for reservation_id, _, _ in granted]
+
+
+async def create_series(
+    db: AsyncSession,
+    data: ReservationSeriesCreate,
+    user_id: uuid.UUID,
+    token: str,
+    http_client: httpx.AsyncClient | None = None,
+) -> ReservationSeries:
+    """Book a recurring series after checking every occurrence for conflicts.
+
+    Only occurrences inside the materialization horizon are written as reservations;
+    the lifecycle task writes the rest as they come due.
+    """
+    rule = parse_rule(data.rrule, data.start_time, data.timezone)
+    until = series_end(rule, data.start_time, data.end_time)
+    duration = data.end_time - data.start_time
+    windows = [(s, s + duration) for s in occurrence_starts(rule, as_utc(data.start_time), until)]
+    for (_, prev_end), (next_start, _) in zip(windows, windows[1:]):
+        if next_start < prev_end:
+            raise ValueError("Occurrences overlap each other; shorten the window or the rule")
+
+    try:
+        devices = await _fetch_devices(data.device_ids, token, http_client, db)
+    except ValueError as exc:
+        raise exc
+    except Exception as exc:
+        raise RuntimeError(f"Failed to contact inventory service: {exc}") from exc
+    topology_type = _validate_devices(devices)
+
+    await _acquire_device_locks(db, data.device_ids)
+    busy = await _busy_windows(db, data.device_ids, windows[0][0], windows[-1][1])
+    conflicting = [
+        device_id for device_id, intervals in busy.items()
+        if any(overlaps_any(windows, s, e) for s, e in intervals)
+    ]
+    if conflicting:
+        raise LookupError(
+            f"Time conflict: devices {[str(d) for d in conflicting]} already reserved "
+            f"during one or more occurrences"
+        )
+
+    series = ReservationSeries(
+        id=uuid.uuid4(),
+        user_id=user_id,
+        device_ids=[str(d) for d in data.device_ids],
+        topology_type=topology_type,
+        purpose=data.purpose,
+        rrule=data.rrule,
+        timezone=data.timezone,
+        start_time=data.start_time,
+        end_time=data.end_time,
+        until=until,
+        materialized_until=windows[0][0],
+        status=ReservationStatus.ACTIVE,
+        devices=[
+            ReservationSeriesDevice(device_id=device_id)
+            for device_id in dict.fromkeys(data.device_ids)
+        ],
+    )
+    db.add(series)
+    enqueue_event(
+        db,
+        "herd.reservations.series_created",
+        {
+            "event": "reservation.series_created",
+            "series_id": str(series.id),
+            "user_id": str(user_id),
+            "device_ids": list(series.device_ids),
+            "rrule": series.rrule,
+            "timezone": series.timezone,
+            "occurrences": len(windows),
+        },
+    )
+    # The series row must exist before its occurrences reference it
+    await db.flush()
+    occurrences = materialize(
+        db,
+        series,
+        datetime.now(timezone.utc) + timedelta(hours=settings.recurrence_materialize_ahead_hours),
+    )
+    try:
+        await db.commit()
+    except IntegrityError as exc:
+        await db.rollback()
+        raise LookupError(
+            "Time conflict: one or more devices are already reserved in the requested window"
+        ) from exc
+    await db.refresh(series)
+    outbox_relay.wake()
+    for reservation in occurrences:
+        await lifecycle_scheduler.notify(
+            reservation.id, reservation.status, reservation.start_time, reservation.end_time
+        )
+
+    logger.info(
+        "Reservation series created: %s (%d occurrences)", series.id, len(windows),
+        extra={
+            "action": "reservation_series_create",
+            "series_id": str(series.id),
+            "user_id": str(user_id),
+        },
+    )
+
+    # Occurrences already under way hold their devices now; later ones on activation
+    started = [r for r in occurrences if r.status == ReservationStatus.ACTIVE]
+    if started:
+        await _update_device_statuses(data.device_ids, "RESERVED", token, http_client)
+
+    return series
+
+
+async def list_user_series(db: AsyncSession, user_id: uuid.UUID) -> list[ReservationSeries]:
+    result = await db.execute(
+        select(ReservationSeries)
+        .where(ReservationSeries.user_id == user_id)
+        .order_by(ReservationSeries.created_at.desc())
+    )
+    return list(result.scalars().all())
+
+
+async def get_series(
+    db: AsyncSession, series_id: uuid.UUID, user_id: uuid.UUID
+) -> ReservationSeries | None:
+    result = await db.execute(
+        select(ReservationSeries).where(
+            ReservationSeries.id == series_id,
+            ReservationSeries.user_id == user_id,
+        )
+    )
+    return result.scalar_one_or_none()
+
+
+async def cancel_series(
+    db: AsyncSession,
+    series_id: uuid.UUID,
+    user_id: uuid.UUID,
+    token: str = "",
+    http_client: httpx.AsyncClient | None = None,
+) -> ReservationSeries | None:
+    """Stop a series and cancel its materialized occurrences that have not started.
+
+    An occurrence already under way is left running, and keeps its devices
+    IN_USE in inventory; release it to end it early. The cancelled windows are
+    offered to the waitlist.
+    """
+    series = await get_series(db, series_id, user_id)
+    if not series:
+        return None
+    if series.status != ReservationStatus.ACTIVE:
+        return series
+    series.status = ReservationStatus.CANCELLED
+    result = await db.execute(
+        update(Reservation)
+        .where(
+            Reservation.series_id == series_id,
+            Reservation.status == ReservationStatus.PENDING,
+        )
+        .values(status=ReservationStatus.CANCELLED)
+        .returning(Reservation.id, Reservation.start_time, Reservation.end_time)
+        .execution_options(synchronize_session=False)
+    )
+    cancelled = result.all()
+    await set_device_rows_status(db, [row.id for row in cancelled], ReservationStatus.CANCELLED)
+    enqueue_event(
+        db,
+        "herd.reservations.series_cancelled",
+        {
+            "event": "reservation.series_cancelled",
+            "series_id": str(series.id),
+            "user_id": str(user_id),
+            "device_ids": list(series.device_ids),
+            "cancelled_reservation_ids": [str(row.id) for row in cancelled],
+        },
+    )
+    await db.commit()
+    await db.refresh(series)
+    outbox_relay.wake()
+    for row in cancelled:
+        await lifecycle_scheduler.notify(
+            row.id, ReservationStatus.CANCELLED, row.start_time, row.end_time
+        )
+
+    logger.info(
+        "Reservation series cancelled: %s", series_id,
+        extra={
+            "action": "reservation_series_cancel",
+            "series_id": str(series_id),
+            "user_id": str(user_id),
+        },
+    )
+
+    running = await db.scalar(
+        select(Reservation.id).where(
+            Reservation.series_id == series_id,
+            Reservation.status == ReservationStatus.ACTIVE,
+        ).limit(1)
+    )
+    device_ids = [uuid.UUID(d) for d in series.device_ids]
+    await _release_devices(
+        db,
+        device_ids if cancelled and running is None else [],
+        [(device_ids, row.start_time, row.end_time) for row in cancelled],
+        token, http_client,
+    )
+    return series
@@ -0,0 +1,147 @@
+"""
+Waitlist storage and lookups.
+
+A booking that conflicted can be queued with a deadline. Each waiting entry keeps
+one waitlist_devices row per device, copied with its window and deleted as soon as
+the entry stops waiting, so the rows double as an index of who waits for what.
+When a reservation frees devices, ``affected_waiters`` reads only the rows for
+those devices and overlapping windows through ``ix_waitlist_devices_device``;
+the queue as a whole is never scanned. Granting (which books the reservation)
+lives in ``app.services.reservation_service``.
+"""
+
+import uuid
+from collections.abc import Iterable
+from datetime import datetime
+
+from sqlalchemy import and_, delete, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.waitlist import WaitlistDevice, WaitlistEntry, WaitlistStatus
+from app.services.events import enqueue_event
+from app.utils.time import as_utc
+
+GRANTED_SUBJECT = "herd.reservations.waitlist_granted"
+EXPIRED_SUBJECT = "herd.reservations.waitlist_expired"
+
+# (device IDs, start, end) of a window that just became free
+FreedWindow = tuple[Iterable[uuid.UUID], datetime, datetime]
+
+
+def waitlist_event(event: str, entry: WaitlistEntry) -> dict:
+    return {
+        "event": event,
+        "entry_id": str(entry.id),
+        "user_id": str(entry.user_id),
+        "device_ids": list(entry.device_ids),
+        "start_time": as_utc(entry.start_time).isoformat(),
+        "end_time": as_utc(entry.end_time).isoformat(),
+        "reservation_id": str(entry.reservation_id) if entry.reservation_id else None,
+    }
+
+
+async def affected_waiters(
+    db: AsyncSession, freed: list[FreedWindow], now: datetime
+) -> list[WaitlistEntry]:
+    """Unexpired waiting entries that want a freed device in an overlapping window,
+    oldest first."""
+    matches = [
+        and_(
+            WaitlistDevice.device_id.in_(list(device_ids)),
+            WaitlistDevice.start_time < end,
+            WaitlistDevice.end_time > start,
+        )
+        for device_ids, start, end in freed
+    ]
+    if not matches:
+        return []
+    result = await db.execute(
+        select(WaitlistEntry)
+        .where(
+            WaitlistEntry.id.in_(select(WaitlistDevice.entry_id).where(or_(*matches))),
+            WaitlistEntry.status == WaitlistStatus.WAITING,
+            WaitlistEntry.expires_at > now,
+        )
+        .order_by(WaitlistEntry.created_at, WaitlistEntry.id)
+    )
+    return list(result.scalars().all())
+
+
+async def finish_entry(
+    db: AsyncSession,
+    entry_id: uuid.UUID,
+    status: WaitlistStatus,
+    reservation_id: uuid.UUID | None = None,
+) -> bool:
+    """Move a waiting entry to ``status`` and drop its device rows.
+
+    Returns False if the entry was no longer waiting (another replica got there
+    first). Does not commit.
+    """
+    result = await db.execute(
+        update(WaitlistEntry)
+        .where(WaitlistEntry.id == entry_id, WaitlistEntry.status == WaitlistStatus.WAITING)
+        .values(status=status, reservation_id=reservation_id)
+        .returning(WaitlistEntry.id)
+        .execution_options(synchronize_session=False)
+    )
+    if result.first() is None:
+        return False
+    await db.execute(delete(WaitlistDevice).where(WaitlistDevice.entry_id == entry_id))
+    return True
+
+
+async def expire_waiters(db: AsyncSession, now: datetime) -> int:
+    """Expire every entry past its deadline, announcing each one, and commit."""
+    result = await db.execute(
+        update(WaitlistEntry)
+        .where(WaitlistEntry.status == WaitlistStatus.WAITING, WaitlistEntry.expires_at <= now)
+        .values(status=WaitlistStatus.EXPIRED)
+        .returning(WaitlistEntry)
+        .execution_options(synchronize_session=False)
+    )
+    expired = list(result.scalars().all())
+    if expired:
+        await db.execute(
+            delete(WaitlistDevice).where(WaitlistDevice.entry_id.in_([e.id for e in expired]))
+        )
+        for entry in expired:
+            enqueue_event(db, EXPIRED_SUBJECT, waitlist_event("waitlist.expired", entry))
+    await db.commit()
+    return len(expired)
+
+
+async def list_user_waitlist(
+    db: AsyncSession, user_id: uuid.UUID, limit: int = 100
+) -> list[WaitlistEntry]:
+    result = await db.execute(
+        select(WaitlistEntry)
+        .where(WaitlistEntry.user_id == user_id)
+        .order_by(WaitlistEntry.created_at.desc())
+        .limit(limit)
+    )
+    return list(result.scalars().all())
+
+
+async def get_waitlist_entry(
+    db: AsyncSession, entry_id: uuid.UUID, user_id: uuid.UUID
+) -> WaitlistEntry | None:
+    result = await db.execute(
+        select(WaitlistEntry).where(
+            WaitlistEntry.id == entry_id, WaitlistEntry.user_id == user_id
+        )
+    )
+    return result.scalar_one_or_none()
+
+
+async def cancel_waitlist_entry(
+    db: AsyncSession, entry_id: uuid.UUID, user_id: uuid.UUID
+) -> WaitlistEntry | None:
+    """Leave the waitlist; entries no longer waiting are returned unchanged."""
+    entry = await get_waitlist_entry(db, entry_id, user_id)
+    if entry is None or entry.status != WaitlistStatus.WAITING:
+        return entry
+    await finish_entry(db, entry_id, WaitlistStatus.CANCELLED)
+    await db.commit()
+    await db.refresh(entry)
+    return entry
@@ -0,0 +1,244 @@
+"""Local device read-model fed by inventory change events.
+
+Inventory announces every device change on core NATS (``herd.inventory.devices.>``)
+with a per-device version. One member of a queue group applies each event to the
+``device_replicas`` table, so reservation validation is a local indexed lookup
+instead of an HTTP round trip. Core NATS is at-most-once, so a full snapshot is
+taken at startup, after every reconnect and on a slow interval; rows and events
+only ever move a device forward in version. A delete leaves a tombstone at its
+version, so a snapshot read before the delete cannot bring the device back. Sync
+times come from the database's clock, so replicas agree on what a snapshot
+replaced.
+
+Each replica tracks how stale the model may be. That is zero while it is subscribed
+and connected, otherwise the time since it last knew the model was complete.
+Lookups return nothing once the staleness exceeds the configured bound, so callers
+fall back to HTTP.
+"""
+
+import asyncio
+import json
+import logging
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import httpx
+from sqlalchemy import case, delete, exists, func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.inventory_client import fetch_device_snapshot
+from app.models.device import DeviceReplica, DeviceTombstone
+from app.utils.time import as_utc, db_now
+
+logger = logging.getLogger(__name__)
+
+DEVICE_EVENTS_SUBJECT = "herd.inventory.devices"
+QUEUE_GROUP = "reservations-device-sync"
+_UPSERT_CHUNK = 500
+_RETRY_SECONDS = 10
+
+
+def _insert(db: AsyncSession):
+    return pg_insert if db.bind.dialect.name == "postgresql" else sqlite_insert
+
+
+async def _upsert(db: AsyncSession, devices: list[dict], *, touch: bool = False) -> None:
+    """Insert or advance rows; a row is only overwritten by a higher version.
+
+    With ``touch`` every given row gets a fresh ``synced_at`` even when its version
+    is unchanged, so a snapshot can prune everything it did not mention by time alone.
+    """
+    insert = _insert(db)
+    fields = ("name", "device_type", "topology_type", "status", "version")
+    for i in range(0, len(devices), _UPSERT_CHUNK):
+        stmt = insert(DeviceReplica).values(
+            [
+                {
+                    "id": uuid.UUID(str(d["id"])),
+                    "name": d["name"],
+                    "device_type": d.get("device_type"),
+                    "topology_type": d["topology_type"],
+                    "status": d["status"],
+                    "version": d["version"],
+                    "synced_at": db_now(),
+                }
+                for d in devices[i:i + _UPSERT_CHUNK]
+            ]
+        )
+        newer = DeviceReplica.version < stmt.excluded.version
+        if touch:
+            set_ = {
+                f: case((newer, stmt.excluded[f]), else_=getattr(DeviceReplica, f))
+                for f in fields
+            }
+            set_["synced_at"] = stmt.excluded.synced_at
+            stmt = stmt.on_conflict_do_update(index_elements=[DeviceReplica.id], set_=set_)
+        else:
+            set_ = {f: stmt.excluded[f] for f in (*fields, "synced_at")}
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[DeviceReplica.id], set_=set_, where=newer
+            )
+        await db.execute(stmt)
+
+
+class DeviceReadModel:
+    def __init__(
+        self,
+        session_factory: async_sessionmaker = AsyncSessionLocal,
+        snapshot_interval_seconds: int = settings.device_snapshot_interval_seconds,
+        max_staleness_seconds: float = settings.device_read_model_max_staleness_seconds,
+    ) -> None:
+        self._session_factory = session_factory
+        self._snapshot_interval = snapshot_interval_seconds
+        self._max_staleness = timedelta(seconds=max_staleness_seconds)
+        self._nats = None
+        # Subscribed and connected since the last complete snapshot
+        self._live = False
+        # Last moment the model was known to be complete, when not live
+        self._complete_at: datetime | None = None
+        self._snapshot_at: datetime | None = None
+        self._last_event_at: datetime | None = None
+        self._resync = asyncio.Event()
+
+    async def attach_nats(self, nc) -> None:
+        """Subscribe to inventory events; call before the first snapshot."""
+        self._nats = nc
+        await nc.subscribe(f"{DEVICE_EVENTS_SUBJECT}.>", queue=QUEUE_GROUP, cb=self._on_event)
+
+    async def on_disconnect(self) -> None:
+        if self._live:
+            self._live = False
+            self._complete_at = datetime.now(timezone.utc)
+
+    async def on_reconnect(self) -> None:
+        # Events published while we were away are lost; take a fresh snapshot
+        self._resync.set()
+
+    async def _on_event(self, msg) -> None:
+        try:
+            data = json.loads(msg.data)
+            async with self._session_factory() as db:
+                if data["event"] == "devices.changed":
+                    await _upsert(db, data["devices"])
+                elif data["event"] == "device.deleted":
+                    device_id = uuid.UUID(data["id"])
+                    stmt = _insert(db)(DeviceTombstone).values(
+                        id=device_id, version=data["version"], deleted_at=db_now()
+                    )
+                    await db.execute(
+                        stmt.on_conflict_do_update(
+                            index_elements=[DeviceTombstone.id],
+                            set_={
+                                "version": stmt.excluded.version,
+                                "deleted_at": stmt.excluded.deleted_at,
+                            },
+                            where=DeviceTombstone.version < stmt.excluded.version,
+                        )
+                    )
+                    await db.execute(
+                        delete(DeviceReplica).where(
+                            DeviceReplica.id == device_id,
+                            DeviceReplica.version < data["version"],
+                        )
+                    )
+                await db.commit()
+            self._last_event_at = datetime.now(timezone.utc)
+        except Exception:
+            logger.warning("Failed to apply inventory device event", exc_info=True)
+
+    async def snapshot(self, http_client: httpx.AsyncClient | None = None) -> int:
+        """Replace the model with inventory's current state; return the device count."""
+        # Staleness is timed locally; pruning by the database's clock
+        fetched_at = datetime.now(timezone.utc)
+        async with self._session_factory() as db:
+            started = as_utc(await db.scalar(select(db_now())))
+        devices = await fetch_device_snapshot(http_client)
+        async with self._session_factory() as db:
+            await _upsert(db, devices, touch=True)
+            # A device deleted while the snapshot was in flight stays deleted
+            await db.execute(
+                delete(DeviceReplica).where(
+                    exists().where(
+                        DeviceTombstone.id == DeviceReplica.id,
+                        DeviceTombstone.version >= DeviceReplica.version,
+                    )
+                )
+            )
+            # Every listed row was just touched; anything older belongs to a deleted
+            # device. Filtering by time alone keeps the statement's size constant.
+            await db.execute(delete(DeviceReplica).where(DeviceReplica.synced_at < started))
+            # The snapshot already reflects deletes from before it started
+            await db.execute(delete(DeviceTombstone).where(DeviceTombstone.deleted_at < started))
+            await db.commit()
+        self._snapshot_at = fetched_at
+        self._complete_at = fetched_at
+        self._live = self._nats is not None and self._nats.is_connected
+        logger.info("Device read-model snapshot: %d devices", len(devices))
+        return len(devices)
+
+    @property
+    def staleness(self) -> timedelta | None:
+        """Upper bound on how far behind inventory the model is; None before any snapshot."""
+        if self._snapshot_at is None:
+            return None
+        if self._live:
+            return timedelta(0)
+        return datetime.now(timezone.utc) - self._complete_at
+
+    def is_fresh(self) -> bool:
+        staleness = self.staleness
+        return staleness is not None and staleness <= self._max_staleness
+
+    async def lookup(
+        self, db: AsyncSession, device_ids: list[uuid.UUID]
+    ) -> dict[uuid.UUID, dict]:
+        """Devices known locally, in inventory's response shape; empty when stale."""
+        if not self.is_fresh():
+            return {}
+        result = await db.execute(
+            select(DeviceReplica).where(DeviceReplica.id.in_(device_ids))
+        )
+        return {
+            row.id: {
+                "id": str(row.id),
+                "name": row.name,
+                "topology_type": row.topology_type.value,
+                "status": row.status,
+            }
+            for row in result.scalars()
+        }
+
+    async def status(self) -> dict:
+        async with self._session_factory() as db:
+            count = await db.scalar(select(func.count()).select_from(DeviceReplica))
+        staleness = self.staleness
+        return {
+            "devices": count or 0,
+            "live": self._live,
+            "fresh": self.is_fresh(),
+            "staleness_seconds": staleness.total_seconds() if staleness is not None else None,
+            "snapshot_at": self._snapshot_at,
+            "last_event_at": self._last_event_at,
+        }
+
+    async def run(self, http_client: httpx.AsyncClient | None = None) -> None:
+        """Snapshot now, then again on reconnect or every snapshot interval."""
+        while True:
+            self._resync.clear()
+            timeout = self._snapshot_interval
+            try:
+                await self.snapshot(http_client)
+            except Exception:
+                logger.warning("Device read-model snapshot failed", exc_info=True)
+                timeout = min(timeout, _RETRY_SECONDS)
+            try:
+                await asyncio.wait_for(self._resync.wait(), timeout=timeout)
+            except TimeoutError:
+                pass
+
+
+device_read_model = DeviceReadModel()
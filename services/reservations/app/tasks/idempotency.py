@@ -0,0 +1,47 @@
+"""Background purge of expired idempotency keys.
+
+Runs on every replica: the delete is cheap (it walks the ``expires_at`` index) and
+concurrent sweeps simply find nothing left to delete.
+"""
+
+import asyncio
+import logging
+
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.services.idempotency import purge_expired_keys
+
+logger = logging.getLogger(__name__)
+
+
+class IdempotencyKeyCleaner:
+    def __init__(
+        self,
+        session_factory: async_sessionmaker = AsyncSessionLocal,
+        interval_seconds: int = settings.idempotency_cleanup_interval_seconds,
+    ) -> None:
+        self._session_factory = session_factory
+        self._interval = interval_seconds
+
+    async def purge(self) -> int:
+        async with self._session_factory() as db:
+            purged = await purge_expired_keys(db)
+        if purged:
+            logger.info(
+                "Purged %d expired idempotency keys", purged,
+                extra={"action": "idempotency_purge"},
+            )
+        return purged
+
+    async def run(self) -> None:
+        while True:
+            try:
+                await self.purge()
+            except Exception:
+                logger.error("Idempotency key purge failed", exc_info=True)
+            await asyncio.sleep(self._interval)
+
+
+idempotency_cleaner = IdempotencyKeyCleaner()
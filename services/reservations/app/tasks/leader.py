@@ -0,0 +1,188 @@
+"""Lease-based leader election so only one replica runs the lifecycle scheduler.
+
+Every replica periodically tries to take or renew a row in ``scheduler_leases``.
+The row is claimed with a conditional UPDATE that only succeeds for the current
+holder or once the lease has expired, so at most one instance holds it at a time.
+If the leader dies, another replica takes over once the TTL lapses.
+
+Lease times are read and written with the database's clock, so replicas whose
+clocks disagree still agree on who holds the lease. A replica times its own
+lease by the TTL the database granted, measured on its monotonic clock from just
+before the claim, so it gives up leadership no later than the others see it lapse.
+"""
+
+import asyncio
+import logging
+import os
+import socket
+import time
+import uuid
+from collections.abc import Awaitable, Callable
+from datetime import timedelta
+
+from sqlalchemy import case, insert, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.models.lease import SchedulerLease
+from app.utils.time import as_utc, db_now
+
+logger = logging.getLogger(__name__)
+
+
+class LeaderElector:
+    def __init__(
+        self,
+        name: str,
+        session_factory: async_sessionmaker = AsyncSessionLocal,
+        ttl_seconds: int = settings.leader_lease_ttl_seconds,
+    ) -> None:
+        self.name = name
+        self.instance_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._session_factory = session_factory
+        self._ttl = timedelta(seconds=ttl_seconds)
+        # Monotonic time our lease runs out, by the TTL the database granted
+        self._leader_until: float | None = None
+
+    @property
+    def is_leader(self) -> bool:
+        return self._leader_until is not None and self._leader_until > time.monotonic()
+
+    async def try_acquire(self) -> bool:
+        """Take the lease if it is free or expired, or renew it if we hold it."""
+        claimed_at = time.monotonic()
+        now, expires_at = db_now(), db_now(self._ttl.total_seconds())
+        async with self._session_factory() as db:
+            try:
+                result = await db.execute(
+                    update(SchedulerLease)
+                    .where(
+                        SchedulerLease.name == self.name,
+                        or_(
+                            SchedulerLease.holder == self.instance_id,
+                            SchedulerLease.expires_at <= now,
+                        ),
+                    )
+                    .values(
+                        holder=self.instance_id,
+                        acquired_at=case(
+                            (SchedulerLease.holder == self.instance_id, SchedulerLease.acquired_at),
+                            else_=now,
+                        ),
+                        renewed_at=now,
+                        expires_at=expires_at,
+                    )
+                    .returning(SchedulerLease.renewed_at, SchedulerLease.expires_at)
+                    .execution_options(synchronize_session=False)
+                )
+                lease = result.first()
+                if lease is None and await db.get(SchedulerLease, self.name) is None:
+                    result = await db.execute(
+                        insert(SchedulerLease)
+                        .values(
+                            name=self.name,
+                            holder=self.instance_id,
+                            acquired_at=now,
+                            renewed_at=now,
+                            expires_at=expires_at,
+                        )
+                        .returning(SchedulerLease.renewed_at, SchedulerLease.expires_at)
+                    )
+                    lease = result.first()
+                await db.commit()
+            except IntegrityError:
+                # Another replica inserted the row first
+                await db.rollback()
+                lease = None
+
+        if lease is None:
+            self._leader_until = None
+            return False
+        granted = (as_utc(lease.expires_at) - as_utc(lease.renewed_at)).total_seconds()
+        self._leader_until = claimed_at + granted
+        return True
+
+    async def release(self) -> None:
+        """Expire our lease immediately so another replica can take over."""
+        if self._leader_until is None:
+            return
+        self._leader_until = None
+        async with self._session_factory() as db:
+            await db.execute(
+                update(SchedulerLease)
+                .where(
+                    SchedulerLease.name == self.name,
+                    SchedulerLease.holder == self.instance_id,
+                )
+                .values(expires_at=db_now())
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
+
+    async def status(self) -> dict:
+        async with self._session_factory() as db:
+            lease = await db.get(SchedulerLease, self.name)
+            now = as_utc(await db.scalar(select(db_now())))
+        if lease is None:
+            leader, lease_age, expires_in = None, None, None
+        else:
+            expired = as_utc(lease.expires_at) <= now
+            leader = None if expired else lease.holder
+            lease_age = (now - as_utc(lease.acquired_at)).total_seconds()
+            expires_in = (as_utc(lease.expires_at) - now).total_seconds()
+        return {
+            "name": self.name,
+            "instance_id": self.instance_id,
+            "is_leader": self.is_leader,
+            "leader": leader,
+            "lease_age_seconds": lease_age,
+            "lease_expires_in_seconds": expires_in,
+        }
+
+    async def run(self, work: Callable[[], Awaitable[None]]) -> None:
+        """Campaign forever; run ``work`` only while holding the lease."""
+        renew_interval = self._ttl.total_seconds() / 3
+        task: asyncio.Task | None = None
+        logger.info("Leader election started for %s as %s", self.name, self.instance_id)
+        try:
+            while True:
+                try:
+                    await self.try_acquire()
+                except Exception:
+                    # Keep running on a transient DB error until our lease actually lapses
+                    logger.error("Lease renewal failed for %s", self.name, exc_info=True)
+
+                if task is not None and task.done():
+                    # Work that stops on its own would otherwise sit behind a lease
+                    # we keep renewing; log why and start it again
+                    if task.cancelled():
+                        logger.error("%s work was cancelled; restarting", self.name)
+                    elif task.exception() is not None:
+                        logger.error(
+                            "%s work failed; restarting", self.name, exc_info=task.exception()
+                        )
+                    else:
+                        logger.error("%s work returned; restarting", self.name)
+                    task = None
+                    if self.is_leader:
+                        task = asyncio.create_task(work())
+                elif self.is_leader and task is None:
+                    logger.info("Acquired %s leadership", self.name)
+                    task = asyncio.create_task(work())
+                elif not self.is_leader and task is not None:
+                    logger.warning("Lost %s leadership", self.name)
+                    task.cancel()
+                    await asyncio.gather(task, return_exceptions=True)
+                    task = None
+
+                await asyncio.sleep(renew_interval)
+        finally:
+            if task is not None:
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+            try:
+                await self.release()
+            except Exception:
+                logger.warning("Failed to release %s lease", self.name, exc_info=True)
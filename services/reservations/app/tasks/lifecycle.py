@@ -0,0 +1,360 @@
+"""Event-driven scheduler that auto-activates and auto-completes reservations.
+
+Upcoming start/end deadlines are kept in a min-heap and the scheduler sleeps until
+the earliest one. Reservation writes call ``track``/``forget`` so new or cancelled
+bookings take effect immediately. Transitions are applied set-based with
+``UPDATE ... RETURNING`` (backed by partial indexes on the status columns), and a
+slow reconciliation sweep reloads the heap in case anything was missed.
+
+Each reconciliation sweep also materializes upcoming occurrences of recurring
+series (see ``app.services.recurrence``), which then activate like any other
+PENDING reservation, and expires waitlist entries past their deadline. Devices
+freed by auto-completion are offered to the waitlist straight away.
+
+Only the elected leader runs the scheduler (see ``app.tasks.leader``). Writes on any
+replica go through ``notify``, which also fans the change out over core NATS so the
+leader's heap learns about bookings made elsewhere. Only a running scheduler keeps
+a heap: other replicas just pass their writes on, and a leader that loses the lease
+drops its heap, rebuilt by the first sweep whenever it leads again.
+"""
+
+import asyncio
+import heapq
+import json
+import logging
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import httpx
+from sqlalchemy import and_, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.inventory_client import update_device_statuses
+from app.models.reservation import Reservation, ReservationDevice, ReservationStatus
+from app.services.partitions import live_since
+from app.services.recurrence import materialize_due_series
+from app.services.waitlist import expire_waiters
+from app.tasks.outbox import outbox_relay
+from app.utils.time import as_utc
+
+logger = logging.getLogger(__name__)
+
+LIFECYCLE_SUBJECT = "herd.reservations.lifecycle"
+
+
+async def _update_device_statuses_internal(
+    device_ids: list[uuid.UUID], status: str, http_client: httpx.AsyncClient | None = None
+) -> None:
+    """Best-effort bulk device status update using internal token (no user JWT needed)."""
+    await update_device_statuses(device_ids, status, http_client)
+
+
+async def _transition(
+    db: AsyncSession,
+    from_status: ReservationStatus,
+    to_status: ReservationStatus,
+    deadline_column,
+    now: datetime,
+    since: datetime | None = None,
+) -> list:
+    """Move every reservation whose deadline has passed in one statement.
+
+    ``since`` bounds end_time from below so older partitions are pruned.
+    """
+    query = update(Reservation).where(Reservation.status == from_status, deadline_column <= now)
+    if since is not None:
+        query = query.where(Reservation.end_time >= since)
+    result = await db.execute(
+        query
+        .values(status=to_status)
+        .returning(
+            Reservation.id, Reservation.start_time, Reservation.end_time, Reservation.device_ids
+        )
+        .execution_options(synchronize_session=False)
+    )
+    rows = result.all()
+    if rows:
+        await db.execute(
+            update(ReservationDevice)
+            .where(ReservationDevice.reservation_id.in_([row.id for row in rows]))
+            .values(status=to_status)
+            .execution_options(synchronize_session=False)
+        )
+    return rows
+
+
+class LifecycleScheduler:
+    """Min-heap of (deadline, reservation_id) with lazy deletion."""
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker = AsyncSessionLocal,
+        reconcile_interval_seconds: int = settings.lifecycle_reconcile_interval_seconds,
+        materialize_ahead_hours: int = settings.recurrence_materialize_ahead_hours,
+    ) -> None:
+        self._session_factory = session_factory
+        self._reconcile_interval = timedelta(seconds=reconcile_interval_seconds)
+        self._materialize_ahead = timedelta(hours=materialize_ahead_hours)
+        self._heap: list[tuple[datetime, uuid.UUID]] = []
+        # Current deadline per reservation; heap entries that disagree are stale
+        self._deadlines: dict[uuid.UUID, datetime] = {}
+        self._wakeup = asyncio.Event()
+        self._nats = None
+        # Set while run() is going, i.e. while this replica leads
+        self._running = False
+
+    async def attach_nats(self, nc) -> None:
+        """Share track/forget updates with the other replicas over core NATS."""
+        self._nats = nc
+        await nc.subscribe(LIFECYCLE_SUBJECT, cb=self._on_remote)
+
+    async def _on_remote(self, msg) -> None:
+        if not self._running:
+            return
+        try:
+            data = json.loads(msg.data)
+            self.track(
+                uuid.UUID(data["reservation_id"]),
+                ReservationStatus(data["status"]),
+                datetime.fromisoformat(data["start_time"]),
+                datetime.fromisoformat(data["end_time"]),
+            )
+        except Exception:
+            logger.warning("Ignoring malformed lifecycle message", exc_info=True)
+
+    async def notify(
+        self,
+        reservation_id: uuid.UUID,
+        status: ReservationStatus,
+        start_time: datetime,
+        end_time: datetime,
+    ) -> None:
+        """Record a reservation write locally, if the scheduler runs here, and on
+        every other replica (best-effort)."""
+        if self._running:
+            self.track(reservation_id, status, start_time, end_time)
+        if self._nats is None:
+            return
+        try:
+            await self._nats.publish(
+                LIFECYCLE_SUBJECT,
+                json.dumps(
+                    {
+                        "reservation_id": str(reservation_id),
+                        "status": status.value,
+                        "start_time": as_utc(start_time).isoformat(),
+                        "end_time": as_utc(end_time).isoformat(),
+                    }
+                ).encode(),
+            )
+        except Exception:
+            logger.warning("Failed to broadcast lifecycle update", exc_info=True)
+
+    @property
+    def next_deadline(self) -> datetime | None:
+        self._drop_stale()
+        return self._heap[0][0] if self._heap else None
+
+    def track(
+        self,
+        reservation_id: uuid.UUID,
+        status: ReservationStatus,
+        start_time: datetime,
+        end_time: datetime,
+    ) -> None:
+        """Register (or move) the next deadline for a reservation."""
+        if status == ReservationStatus.PENDING:
+            deadline = as_utc(start_time)
+        elif status == ReservationStatus.ACTIVE:
+            deadline = as_utc(end_time)
+        else:
+            self.forget(reservation_id)
+            return
+        # Far-off deadlines are picked up by a later reconciliation sweep
+        horizon = datetime.now(timezone.utc) + 2 * self._reconcile_interval
+        if deadline > horizon:
+            self._deadlines.pop(reservation_id, None)
+            return
+        current = self.next_deadline
+        self._deadlines[reservation_id] = deadline
+        heapq.heappush(self._heap, (deadline, reservation_id))
+        if current is None or deadline < current:
+            self._wakeup.set()
+
+    def forget(self, reservation_id: uuid.UUID) -> None:
+        """Stop tracking a reservation; its heap entry is discarded when it surfaces."""
+        self._deadlines.pop(reservation_id, None)
+
+    def _drop_stale(self) -> None:
+        while self._heap:
+            deadline, reservation_id = self._heap[0]
+            if self._deadlines.get(reservation_id) == deadline:
+                return
+            heapq.heappop(self._heap)
+
+    def _pop_due(self, now: datetime) -> bool:
+        """Remove all due entries; return True if any live one was due."""
+        due = False
+        while (deadline := self.next_deadline) is not None and deadline <= now:
+            _, reservation_id = heapq.heappop(self._heap)
+            self._deadlines.pop(reservation_id, None)
+            due = True
+        return due
+
+    async def apply_due(
+        self, http_client: httpx.AsyncClient | None = None, full: bool = False
+    ) -> None:
+        """Apply every transition whose deadline has passed.
+
+        Deadline wake-ups only look at partitions that can hold live reservations;
+        ``full`` (the reconciliation sweep) also catches anything older.
+        """
+        now = datetime.now(timezone.utc)
+        since = None if full else live_since(now)
+        async with self._session_factory() as db:
+            activated = await _transition(
+                db, ReservationStatus.PENDING, ReservationStatus.ACTIVE,
+                Reservation.start_time, now, since,
+            )
+            completed = await _transition(
+                db, ReservationStatus.ACTIVE, ReservationStatus.COMPLETED,
+                Reservation.end_time, now, since,
+            )
+            await db.commit()
+
+        for row in activated:
+            logger.info(
+                "Auto-activated reservation %s", row.id,
+                extra={"action": "auto_activate", "reservation_id": str(row.id)},
+            )
+            self.track(row.id, ReservationStatus.ACTIVE, now, row.end_time)
+        for row in completed:
+            logger.info(
+                "Auto-completed reservation %s", row.id,
+                extra={"action": "auto_complete", "reservation_id": str(row.id)},
+            )
+            self.forget(row.id)
+
+        # Release devices for all completed reservations, then hold those of newly
+        # activated ones, in one bulk call each (best-effort, outside DB session)
+        released = list(
+            dict.fromkeys(uuid.UUID(d) for row in completed for d in row.device_ids)
+        )
+        await _update_device_statuses_internal(released, "AVAILABLE", http_client)
+        held = list(dict.fromkeys(uuid.UUID(d) for row in activated for d in row.device_ids))
+        if held:
+            await _update_device_statuses_internal(held, "RESERVED", http_client)
+
+        if completed:
+            # Imported here: reservation_service imports this module
+            from app.services.reservation_service import grant_waiters
+
+            async with self._session_factory() as db:
+                await grant_waiters(
+                    db,
+                    [
+                        ([uuid.UUID(d) for d in row.device_ids], row.start_time, row.end_time)
+                        for row in completed
+                    ],
+                    http_client,
+                )
+
+    async def materialize(self) -> int:
+        """Write recurring-series occurrences that fall inside the lookahead window."""
+        async with self._session_factory() as db:
+            occurrences = await materialize_due_series(
+                db, datetime.now(timezone.utc) + self._materialize_ahead
+            )
+            await db.commit()
+        if occurrences:
+            outbox_relay.wake()
+            logger.info(
+                "Materialized %d recurring occurrences", len(occurrences),
+                extra={"action": "materialize_occurrences"},
+            )
+        return len(occurrences)
+
+    async def expire_waitlist(self) -> int:
+        async with self._session_factory() as db:
+            expired = await expire_waiters(db, datetime.now(timezone.utc))
+        if expired:
+            outbox_relay.wake()
+            logger.info(
+                "Expired %d waitlist entries", expired, extra={"action": "waitlist_expire"}
+            )
+        return expired
+
+    async def reconcile(self, http_client: httpx.AsyncClient | None = None) -> None:
+        """Materialize upcoming occurrences, expire stale waitlist entries and apply
+        anything overdue, then rebuild the heap from the database."""
+        await self.materialize()
+        await self.expire_waitlist()
+        await self.apply_due(http_client, full=True)
+
+        horizon = datetime.now(timezone.utc) + 2 * self._reconcile_interval
+        async with self._session_factory() as db:
+            result = await db.execute(
+                select(
+                    Reservation.id, Reservation.status,
+                    Reservation.start_time, Reservation.end_time,
+                ).where(
+                    Reservation.end_time >= live_since(),
+                    or_(
+                        and_(
+                            Reservation.status == ReservationStatus.PENDING,
+                            Reservation.start_time <= horizon,
+                        ),
+                        and_(
+                            Reservation.status == ReservationStatus.ACTIVE,
+                            Reservation.end_time <= horizon,
+                        ),
+                    )
+                )
+            )
+            rows = result.all()
+
+        self._heap.clear()
+        self._deadlines.clear()
+        for row in rows:
+            self.track(row.id, row.status, row.start_time, row.end_time)
+
+    async def run(self, http_client: httpx.AsyncClient | None = None) -> None:
+        """Sleep until the next deadline or sweep, forever."""
+        logger.info(
+            "Lifecycle scheduler started, reconcile interval=%ds",
+            self._reconcile_interval.total_seconds(),
+        )
+        next_reconcile = datetime.now(timezone.utc)
+        self._running = True
+        try:
+            while True:
+                now = datetime.now(timezone.utc)
+                try:
+                    if now >= next_reconcile:
+                        await self.reconcile(http_client)
+                        next_reconcile = now + self._reconcile_interval
+                    elif self._pop_due(now):
+                        await self.apply_due(http_client)
+                except Exception:
+                    logger.error("Lifecycle cycle failed", exc_info=True)
+
+                # Clear before reading the heap so a track() in between still wakes us
+                self._wakeup.clear()
+                wake_at = next_reconcile
+                if (deadline := self.next_deadline) is not None:
+                    wake_at = min(wake_at, deadline)
+                timeout = max((wake_at - datetime.now(timezone.utc)).total_seconds(), 0)
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+                except TimeoutError:
+                    pass
+        finally:
+            # Leadership lost (or shutdown): whoever leads next keeps the heap
+            self._running = False
+            self._heap.clear()
+            self._deadlines.clear()
+
+
+lifecycle_scheduler = LifecycleScheduler()
@@ -0,0 +1,176 @@
+"""Relay that drains the transactional outbox to NATS JetStream.
+
+Rows are claimed in batches (``FOR UPDATE SKIP LOCKED`` on PostgreSQL, so every
+replica can run a relay), published with pipelined async publishes and marked as
+published in the same transaction. Each message carries ``Nats-Msg-Id`` so a batch
+that is re-sent after a crash is deduplicated by JetStream.
+
+The relay runs whether or not NATS was reachable at startup: without a shared
+connection it opens its own, retrying with exponential backoff, and rows wait in
+the outbox meanwhile.
+"""
+
+import asyncio
+import json
+import logging
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.models.outbox import OutboxEvent
+from app.utils.time import as_utc
+
+logger = logging.getLogger(__name__)
+
+
+class OutboxRelay:
+    def __init__(
+        self,
+        session_factory: async_sessionmaker = AsyncSessionLocal,
+        batch_size: int = settings.outbox_batch_size,
+        poll_interval_seconds: float = settings.outbox_poll_interval_seconds,
+        retention_hours: int = settings.outbox_retention_hours,
+        nats_url: str = settings.nats_url,
+        connect_retry_max_seconds: float = settings.outbox_connect_retry_max_seconds,
+    ) -> None:
+        self._session_factory = session_factory
+        self._batch_size = batch_size
+        self._poll_interval = poll_interval_seconds
+        self._retention = timedelta(hours=retention_hours)
+        self._nats_url = nats_url
+        self._connect_retry_max = connect_retry_max_seconds
+        self._wakeup = asyncio.Event()
+
+    def wake(self) -> None:
+        """Called after a commit that wrote outbox rows, to publish without waiting."""
+        self._wakeup.set()
+
+    async def drain_once(self, nc) -> int:
+        """Publish one batch; return how many rows were published."""
+        js = nc.jetstream()
+        async with self._session_factory() as db:
+            result = await db.execute(
+                select(OutboxEvent)
+                .where(OutboxEvent.published_at.is_(None))
+                .order_by(OutboxEvent.created_at)
+                .limit(self._batch_size)
+                .with_for_update(skip_locked=True)
+            )
+            events = result.scalars().all()
+            if not events:
+                return 0
+
+            acks = await asyncio.gather(
+                *[
+                    js.publish(
+                        event.subject,
+                        json.dumps(event.payload, default=str).encode(),
+                        headers={"Nats-Msg-Id": str(event.id)},
+                    )
+                    for event in events
+                ],
+                return_exceptions=True,
+            )
+            published = [
+                event.id for event, ack in zip(events, acks) if not isinstance(ack, Exception)
+            ]
+            for event, ack in zip(events, acks):
+                if isinstance(ack, Exception):
+                    logger.error(
+                        "Failed to publish outbox event %s to %s", event.id, event.subject,
+                        exc_info=ack,
+                    )
+            if published:
+                await db.execute(
+                    update(OutboxEvent)
+                    .where(OutboxEvent.id.in_(published))
+                    .values(published_at=datetime.now(timezone.utc))
+                    .execution_options(synchronize_session=False)
+                )
+            await db.commit()
+        return len(published)
+
+    async def purge_published(self) -> None:
+        """Delete rows that were published longer ago than the retention window."""
+        cutoff = datetime.now(timezone.utc) - self._retention
+        async with self._session_factory() as db:
+            await db.execute(
+                delete(OutboxEvent).where(
+                    OutboxEvent.published_at.is_not(None),
+                    OutboxEvent.published_at < cutoff,
+                )
+            )
+            await db.commit()
+
+    async def status(self) -> dict:
+        """Outbox lag: unpublished row count and age of the oldest one."""
+        async with self._session_factory() as db:
+            result = await db.execute(
+                select(func.count(), func.min(OutboxEvent.created_at)).where(
+                    OutboxEvent.published_at.is_(None)
+                )
+            )
+            pending, oldest = result.one()
+        lag = (datetime.now(timezone.utc) - as_utc(oldest)).total_seconds() if oldest else 0.0
+        return {"pending": pending, "lag_seconds": lag}
+
+    async def _connect(self):
+        """Connect to NATS, retrying with exponential backoff until it succeeds."""
+        import nats
+
+        delay = 1.0
+        while True:
+            try:
+                nc = await nats.connect(self._nats_url)
+                logger.info("Outbox relay connected to NATS at %s", self._nats_url)
+                return nc
+            except Exception:
+                logger.warning(
+                    "NATS unavailable at %s, outbox relay retrying in %.0fs",
+                    self._nats_url, delay,
+                )
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self._connect_retry_max)
+
+    async def run(self, nc=None) -> None:
+        """Drain forever: back-to-back while batches are full, otherwise wait for a wake-up.
+
+        Without ``nc`` the relay opens, and owns, its own connection.
+        """
+        owned = nc is None
+        if owned:
+            nc = await self._connect()
+        logger.info("Outbox relay started, batch size=%d", self._batch_size)
+        last_purge = datetime.now(timezone.utc)
+        try:
+            while True:
+                if owned and nc.is_closed:
+                    # The client gave up reconnecting; start over
+                    nc = await self._connect()
+                self._wakeup.clear()
+                published = 0
+                try:
+                    published = await self.drain_once(nc)
+                    if datetime.now(timezone.utc) - last_purge > timedelta(hours=1):
+                        await self.purge_published()
+                        last_purge = datetime.now(timezone.utc)
+                except Exception:
+                    logger.error("Outbox relay cycle failed", exc_info=True)
+                if published >= self._batch_size:
+                    continue
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self._poll_interval)
+                except TimeoutError:
+                    pass
+        finally:
+            if owned:
+                try:
+                    await nc.close()
+                except Exception:
+                    logger.warning("Error closing the outbox relay NATS connection", exc_info=True)
+
+
+outbox_relay = OutboxRelay()
@@ -0,0 +1,52 @@
+"""Keeps the monthly ``reservations`` partitions created ahead and archives old ones.
+
+Partition DDL takes strong locks on the parent table, so this runs on one replica
+only, under its own leader lease (see ``app.tasks.leader``).
+"""
+
+import asyncio
+import logging
+
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.services.partitions import archive_partitions, ensure_partitions, is_partitioned
+
+logger = logging.getLogger(__name__)
+
+
+class PartitionMaintainer:
+    def __init__(
+        self,
+        session_factory: async_sessionmaker = AsyncSessionLocal,
+        interval_seconds: int = settings.reservation_partition_maintenance_interval_seconds,
+    ) -> None:
+        self._session_factory = session_factory
+        self._interval = interval_seconds
+
+    async def run_once(self) -> tuple[list[str], list[str]]:
+        """Return the partitions created and archived; a no-op unless partitioned."""
+        async with self._session_factory() as db:
+            if not await is_partitioned(db):
+                return [], []
+            created = await ensure_partitions(db)
+            await db.commit()
+            archived = await archive_partitions(db)
+        if created:
+            logger.info(
+                "Created reservation partitions %s", ", ".join(created),
+                extra={"action": "partition_create"},
+            )
+        return created, archived
+
+    async def run(self) -> None:
+        while True:
+            try:
+                await self.run_once()
+            except Exception:
+                logger.error("Partition maintenance failed", exc_info=True)
+            await asyncio.sleep(self._interval)
+
+
+partition_maintainer = PartitionMaintainer()
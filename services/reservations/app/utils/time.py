@@ -0,0 +1,39 @@
+from datetime import datetime, timezone
+
+from sqlalchemy import DateTime, Float, literal
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+
+
+def as_utc(value: datetime) -> datetime:
+    """Attach UTC to naive datetimes (SQLite returns them naive; everything stored is UTC)."""
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class db_now(FunctionElement):
+    """The database's current time plus ``seconds``, for timestamps that replicas
+    with disagreeing clocks must compare."""
+
+    type = DateTime(timezone=True)
+    name = "db_now"
+    inherit_cache = True
+
+    def __init__(self, seconds: float = 0) -> None:
+        super().__init__(literal(float(seconds), Float()))
+
+
+@compiles(db_now)
+def _compile_db_now(element: db_now, compiler, **kw) -> str:
+    # SQLite: text in the format SQLAlchemy stores DateTime as, so it compares
+    # correctly with bound datetimes; SQLite's clock only has milliseconds
+    seconds = compiler.process(element.clauses, **kw)
+    return f"strftime('%Y-%m-%d %H:%M:%f', 'now', {seconds} || ' seconds') || '000'"
+
+
+@compiles(db_now, "postgresql")
+def _compile_db_now_postgresql(element: db_now, compiler, **kw) -> str:
+    return f"now() + make_interval(secs => {compiler.process(element.clauses, **kw)})"
@@ -0,0 +1,51 @@
+"""
+Stand-in for the Inventory service during benchmarks.
+
+Answers the three calls the reservations service makes (batchGet, batchSetStatus,
+snapshot) for any device ID, every device AVAILABLE and PHYSICAL, after an
+artificial delay. Calls are counted so a run can report the inventory traffic
+it caused.
+"""
+
+import asyncio
+from collections import Counter
+
+from fastapi import FastAPI, Request
+
+
+def create_stub_inventory(latency_ms: float = 2.0) -> FastAPI:
+    app = FastAPI(title="HERD Inventory (benchmark stub)")
+    app.state.calls = Counter()
+
+    def device(device_id: str) -> dict:
+        return {
+            "id": device_id,
+            "name": f"bench-{device_id[:8]}",
+            "device_type": "SWITCH",
+            "topology_type": "PHYSICAL",
+            "status": "AVAILABLE",
+            "version": 1,
+        }
+
+    @app.middleware("http")
+    async def delay(request: Request, call_next):
+        app.state.calls[request.url.path] += 1
+        if latency_ms:
+            await asyncio.sleep(latency_ms / 1000)
+        return await call_next(request)
+
+    @app.post("/devices:batchGet")
+    async def batch_get(body: dict):
+        return {"devices": [device(d) for d in body["ids"]], "missing": []}
+
+    @app.post("/devices:batchSetStatus")
+    async def batch_set_status(body: dict):
+        return {
+            "results": [{"device_id": u["device_id"], "updated": True} for u in body["updates"]]
+        }
+
+    @app.get("/devices:snapshot")
+    async def snapshot():
+        return {"devices": []}
+
+    return app
@@ -4,7 +4,7 @@ from logging.config import fileConfig
 from alembic import context
 from app.config import settings
 from app.database import Base
-from app.models import reservation  # noqa: F401
+from app.models import device, idempotency, lease, outbox, reservation, waitlist  # noqa: F401
 from sqlalchemy import pool
 from sqlalchemy.engine import Connection
 from sqlalchemy.ext.asyncio import async_engine_from_config
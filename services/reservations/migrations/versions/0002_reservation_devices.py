@@ -0,0 +1,105 @@
+"""Per-device reservation rows with a GiST exclusion constraint.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17 00:00:00.000000
+"""
+
+import os
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+_schema = os.environ.get("DB_SCHEMA") or None
+_prefix = f"{_schema}." if _schema else ""
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+
+    op.create_table(
+        "reservation_devices",
+        sa.Column(
+            "reservation_id",
+            sa.Uuid(as_uuid=True),
+            sa.ForeignKey(f"{_prefix}reservations.id", ondelete="CASCADE"),
+            primary_key=True,
+        ),
+        sa.Column("device_id", sa.Uuid(as_uuid=True), primary_key=True),
+        sa.Column("start_time", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("end_time", sa.DateTime(timezone=True), nullable=False),
+        sa.Column(
+            "status",
+            postgresql.ENUM(name="reservationstatus", schema=_schema, create_type=False),
+            nullable=False,
+            server_default="ACTIVE",
+        ),
+        schema=_schema,
+    )
+    op.create_index(
+        "ix_reservation_devices_device_window",
+        "reservation_devices",
+        ["device_id", "start_time", "end_time"],
+        schema=_schema,
+    )
+
+    # Backfill from the JSON device_ids column before the constraint goes on
+    op.execute(
+        f"""
+        INSERT INTO {_prefix}reservation_devices
+            (reservation_id, device_id, start_time, end_time, status)
+        SELECT DISTINCT r.id, d.value::uuid, r.start_time, r.end_time, r.status
+        FROM {_prefix}reservations r
+        CROSS JOIN LATERAL json_array_elements_text(r.device_ids) AS d(value)
+        """
+    )
+
+    # Bookings made before the constraint may already overlap; which one should
+    # give way is for an operator to decide, so stop with the pairs to look at
+    op.execute(
+        f"""
+        DO $$
+        DECLARE
+            pair_count bigint;
+            pairs text;
+        BEGIN
+            SELECT count(*),
+                   string_agg(format('%s and %s on device %s',
+                                     a.reservation_id, b.reservation_id, a.device_id), ', ')
+            INTO pair_count, pairs
+            FROM {_prefix}reservation_devices a
+            JOIN {_prefix}reservation_devices b
+              ON b.device_id = a.device_id
+             AND b.reservation_id > a.reservation_id
+             AND b.start_time < a.end_time
+             AND b.end_time > a.start_time
+            WHERE a.status IN ('ACTIVE', 'PENDING')
+              AND b.status IN ('ACTIVE', 'PENDING');
+            IF pair_count > 0 THEN
+                RAISE EXCEPTION
+                    'Cannot add ex_reservation_devices_no_overlap: % pair(s) of ACTIVE/PENDING '
+                    'reservations overlap on the same device: %. Cancel one of each pair, '
+                    'then run the migration again.', pair_count, pairs;
+            END IF;
+        END $$
+        """
+    )
+
+    op.execute(
+        f"""
+        ALTER TABLE {_prefix}reservation_devices
+        ADD CONSTRAINT ex_reservation_devices_no_overlap
+        EXCLUDE USING gist (device_id WITH =, tstzrange(start_time, end_time, '[)') WITH &&)
+        WHERE (status IN ('ACTIVE', 'PENDING'))
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("reservation_devices", schema=_schema)
@@ -0,0 +1,40 @@
+"""Partial indexes for the reservation lifecycle scheduler.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17 00:00:00.000000
+"""
+
+import os
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+_schema = os.environ.get("DB_SCHEMA") or None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_reservations_pending_start",
+        "reservations",
+        ["start_time"],
+        schema=_schema,
+        postgresql_where=sa.text("status = 'PENDING'"),
+    )
+    op.create_index(
+        "ix_reservations_active_end",
+        "reservations",
+        ["end_time"],
+        schema=_schema,
+        postgresql_where=sa.text("status = 'ACTIVE'"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_reservations_active_end", "reservations", schema=_schema)
+    op.drop_index("ix_reservations_pending_start", "reservations", schema=_schema)
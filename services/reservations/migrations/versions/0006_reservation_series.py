@@ -0,0 +1,96 @@
+"""Recurring reservation series with lazily materialized occurrences.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17 00:00:00.000000
+"""
+
+import os
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+_schema = os.environ.get("DB_SCHEMA") or None
+_prefix = f"{_schema}." if _schema else ""
+
+
+def upgrade() -> None:
+    op.create_table(
+        "reservation_series",
+        sa.Column("id", sa.Uuid(as_uuid=True), primary_key=True),
+        sa.Column("user_id", sa.Uuid(as_uuid=True), nullable=False),
+        sa.Column("device_ids", sa.JSON, nullable=False),
+        sa.Column(
+            "topology_type",
+            postgresql.ENUM(name="topologytype", schema=_schema, create_type=False),
+            nullable=False,
+        ),
+        sa.Column("purpose", sa.Text, nullable=True),
+        sa.Column("rrule", sa.Text, nullable=False),
+        sa.Column("timezone", sa.String(64), nullable=False, server_default="UTC"),
+        sa.Column("start_time", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("end_time", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("until", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("materialized_until", sa.DateTime(timezone=True), nullable=False),
+        sa.Column(
+            "status",
+            postgresql.ENUM(name="reservationstatus", schema=_schema, create_type=False),
+            nullable=False,
+            server_default="ACTIVE",
+        ),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.func.now(),
+            nullable=True,
+        ),
+        schema=_schema,
+    )
+    op.create_index(
+        "ix_reservation_series_user_id", "reservation_series", ["user_id"], schema=_schema
+    )
+
+    op.create_table(
+        "reservation_series_devices",
+        sa.Column(
+            "series_id",
+            sa.Uuid(as_uuid=True),
+            sa.ForeignKey(f"{_prefix}reservation_series.id", ondelete="CASCADE"),
+            primary_key=True,
+        ),
+        sa.Column("device_id", sa.Uuid(as_uuid=True), primary_key=True),
+        schema=_schema,
+    )
+    op.create_index(
+        "ix_reservation_series_devices_device_id",
+        "reservation_series_devices",
+        ["device_id"],
+        schema=_schema,
+    )
+
+    op.add_column(
+        "reservations",
+        sa.Column(
+            "series_id",
+            sa.Uuid(as_uuid=True),
+            sa.ForeignKey(f"{_prefix}reservation_series.id", ondelete="SET NULL"),
+            nullable=True,
+        ),
+        schema=_schema,
+    )
+    op.create_index(
+        "ix_reservations_series_id", "reservations", ["series_id"], schema=_schema
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_reservations_series_id", table_name="reservations", schema=_schema)
+    op.drop_column("reservations", "series_id", schema=_schema)
+    op.drop_table("reservation_series_devices", schema=_schema)
+    op.drop_table("reservation_series", schema=_schema)
@@ -0,0 +1,39 @@
+"""Composite indexes for keyset pagination of a user's reservations.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-17 00:00:00.000000
+"""
+
+import os
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+_schema = os.environ.get("DB_SCHEMA") or None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_reservations_user_created",
+        "reservations",
+        ["user_id", "created_at", "id"],
+        schema=_schema,
+    )
+    op.create_index(
+        "ix_reservations_user_current",
+        "reservations",
+        ["user_id", "created_at", "id"],
+        schema=_schema,
+        postgresql_where=sa.text("status IN ('PENDING', 'ACTIVE')"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_reservations_user_current", "reservations", schema=_schema)
+    op.drop_index("ix_reservations_user_created", "reservations", schema=_schema)
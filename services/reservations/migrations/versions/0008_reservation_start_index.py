@@ -0,0 +1,30 @@
+"""Index for admin queries paging through all reservations by start time.
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-17 00:00:00.000000
+"""
+
+import os
+
+from alembic import op
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+_schema = os.environ.get("DB_SCHEMA") or None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_reservations_start_id",
+        "reservations",
+        ["start_time", "id"],
+        schema=_schema,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_reservations_start_id", "reservations", schema=_schema)
@@ -0,0 +1,40 @@
+"""Local device read-model fed by inventory change events.
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-17 00:00:00.000000
+"""
+
+import os
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+revision = "0009"
+down_revision = "0008"
+branch_labels = None
+depends_on = None
+
+_schema = os.environ.get("DB_SCHEMA") or None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "device_replicas",
+        sa.Column("id", sa.Uuid(as_uuid=True), primary_key=True),
+        sa.Column("name", sa.String(255), nullable=False),
+        sa.Column(
+            "topology_type",
+            postgresql.ENUM(name="topologytype", schema=_schema, create_type=False),
+            nullable=False,
+        ),
+        sa.Column("status", sa.String(32), nullable=False),
+        sa.Column("version", sa.Integer, nullable=False),
+        sa.Column("synced_at", sa.DateTime(timezone=True), nullable=False),
+        schema=_schema,
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("device_replicas", schema=_schema)
@@ -0,0 +1,133 @@
+"""Range-partition reservations by month of end_time.
+
+The table is rebuilt as a partitioned table: one partition per month from the
+oldest reservation through ``RESERVATION_PARTITION_PREMAKE_MONTHS`` ahead, plus a
+DEFAULT partition. The primary key and the reservation_devices foreign key gain
+end_time, since both must include the partition key.
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-17 00:00:00.000000
+"""
+
+import os
+from datetime import datetime, timezone
+
+from alembic import op
+
+revision = "0011"
+down_revision = "0010"
+branch_labels = None
+depends_on = None
+
+_schema = os.environ.get("DB_SCHEMA") or None
+_prefix = f"{_schema}." if _schema else ""
+_premake = int(os.environ.get("RESERVATION_PARTITION_PREMAKE_MONTHS", "12"))
+
+_INDEXES = [
+    "CREATE INDEX ix_reservations_user_id ON {t} (user_id)",
+    "CREATE INDEX ix_reservations_series_id ON {t} (series_id)",
+    "CREATE INDEX ix_reservations_pending_start ON {t} (start_time) WHERE status = 'PENDING'",
+    "CREATE INDEX ix_reservations_active_end ON {t} (end_time) WHERE status = 'ACTIVE'",
+    "CREATE INDEX ix_reservations_start_id ON {t} (start_time, id)",
+    "CREATE INDEX ix_reservations_user_created ON {t} (user_id, created_at, id)",
+    "CREATE INDEX ix_reservations_user_current ON {t} (user_id, created_at, id) "
+    "WHERE status IN ('PENDING', 'ACTIVE')",
+]
+
+
+def _month(index: int) -> datetime:
+    """First instant of the month numbered ``year * 12 + month``."""
+    year, month = divmod(index - 1, 12)
+    return datetime(year, month + 1, 1, tzinfo=timezone.utc)
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    op.execute(
+        f"ALTER TABLE {_prefix}reservation_devices "
+        "DROP CONSTRAINT reservation_devices_reservation_id_fkey"
+    )
+    op.execute(f"ALTER TABLE {_prefix}reservations RENAME TO reservations_unpartitioned")
+    op.execute(
+        f"ALTER TABLE {_prefix}reservations_unpartitioned "
+        "RENAME CONSTRAINT reservations_pkey TO reservations_unpartitioned_pkey"
+    )
+    op.execute(
+        f"CREATE TABLE {_prefix}reservations "
+        f"(LIKE {_prefix}reservations_unpartitioned INCLUDING DEFAULTS) "
+        "PARTITION BY RANGE (end_time)"
+    )
+    op.execute(f"ALTER TABLE {_prefix}reservations ADD PRIMARY KEY (id, end_time)")
+    op.execute(
+        f"ALTER TABLE {_prefix}reservations ADD CONSTRAINT reservations_series_id_fkey "
+        f"FOREIGN KEY (series_id) REFERENCES {_prefix}reservation_series (id) "
+        "ON DELETE SET NULL"
+    )
+
+    now = datetime.now(timezone.utc)
+    oldest = bind.exec_driver_sql(
+        f"SELECT min(end_time) FROM {_prefix}reservations_unpartitioned"
+    ).scalar()
+    first = oldest.astimezone(timezone.utc) if oldest and oldest < now else now
+    start = first.year * 12 + first.month
+    stop = now.year * 12 + now.month + _premake
+    for index in range(start, stop + 1):
+        lo, hi = _month(index), _month(index + 1)
+        op.execute(
+            f"CREATE TABLE {_prefix}reservations_p{lo:%Y_%m} "
+            f"PARTITION OF {_prefix}reservations "
+            f"FOR VALUES FROM ('{lo.isoformat()}') TO ('{hi.isoformat()}')"
+        )
+    op.execute(
+        f"CREATE TABLE {_prefix}reservations_default "
+        f"PARTITION OF {_prefix}reservations DEFAULT"
+    )
+
+    op.execute(
+        f"INSERT INTO {_prefix}reservations SELECT * FROM {_prefix}reservations_unpartitioned"
+    )
+    op.execute(f"DROP TABLE {_prefix}reservations_unpartitioned")
+    for statement in _INDEXES:
+        op.execute(statement.format(t=f"{_prefix}reservations"))
+
+    op.execute(
+        f"ALTER TABLE {_prefix}reservation_devices "
+        "ADD CONSTRAINT fk_reservation_devices_reservation "
+        f"FOREIGN KEY (reservation_id, end_time) REFERENCES {_prefix}reservations (id, end_time) "
+        "ON DELETE CASCADE ON UPDATE CASCADE"
+    )
+
+
+def downgrade() -> None:
+    op.execute(
+        f"ALTER TABLE {_prefix}reservation_devices "
+        "DROP CONSTRAINT fk_reservation_devices_reservation"
+    )
+    op.execute(f"ALTER TABLE {_prefix}reservations RENAME TO reservations_partitioned")
+    op.execute(
+        f"ALTER TABLE {_prefix}reservations_partitioned "
+        "RENAME CONSTRAINT reservations_pkey TO reservations_partitioned_pkey"
+    )
+    op.execute(
+        f"CREATE TABLE {_prefix}reservations "
+        f"(LIKE {_prefix}reservations_partitioned INCLUDING DEFAULTS)"
+    )
+    op.execute(f"ALTER TABLE {_prefix}reservations ADD PRIMARY KEY (id)")
+    op.execute(
+        f"ALTER TABLE {_prefix}reservations ADD CONSTRAINT reservations_series_id_fkey "
+        f"FOREIGN KEY (series_id) REFERENCES {_prefix}reservation_series (id) "
+        "ON DELETE SET NULL"
+    )
+    op.execute(
+        f"INSERT INTO {_prefix}reservations SELECT * FROM {_prefix}reservations_partitioned"
+    )
+    op.execute(f"DROP TABLE {_prefix}reservations_partitioned")
+    for statement in _INDEXES:
+        op.execute(statement.format(t=f"{_prefix}reservations"))
+    op.execute(
+        f"ALTER TABLE {_prefix}reservation_devices "
+        "ADD CONSTRAINT reservation_devices_reservation_id_fkey "
+        f"FOREIGN KEY (reservation_id) REFERENCES {_prefix}reservations (id) "
+        "ON DELETE CASCADE"
+    )
@@ -0,0 +1,39 @@
+"""Mirror inventory device_type in the device read-model, for allocation.
+
+Revision ID: 0012
+Revises: 0011
+Create Date: 2026-10-17 00:00:00.000000
+"""
+
+import os
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0012"
+down_revision = "0011"
+branch_labels = None
+depends_on = None
+
+_schema = os.environ.get("DB_SCHEMA") or None
+_prefix = f"{_schema}." if _schema else ""
+
+
+def upgrade() -> None:
+    op.add_column(
+        "device_replicas", sa.Column("device_type", sa.String(32), nullable=True), schema=_schema
+    )
+    op.create_index(
+        "ix_device_replicas_pool",
+        "device_replicas",
+        ["topology_type", "device_type"],
+        schema=_schema,
+    )
+    # Snapshots only overwrite rows at a higher version, so existing rows would
+    # never learn their type; the startup snapshot repopulates the table
+    op.execute(f"DELETE FROM {_prefix}device_replicas")
+
+
+def downgrade() -> None:
+    op.drop_index("ix_device_replicas_pool", table_name="device_replicas", schema=_schema)
+    op.drop_column("device_replicas", "device_type", schema=_schema)
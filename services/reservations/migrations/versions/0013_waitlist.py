@@ -0,0 +1,88 @@
+"""Waitlist for bookings that conflicted, granted as devices free up.
+
+Revision ID: 0013
+Revises: 0012
+Create Date: 2026-10-17 00:00:00.000000
+"""
+
+import os
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+revision = "0013"
+down_revision = "0012"
+branch_labels = None
+depends_on = None
+
+_schema = os.environ.get("DB_SCHEMA") or None
+_prefix = f"{_schema}." if _schema else ""
+
+
+def upgrade() -> None:
+    op.create_table(
+        "waitlist_entries",
+        sa.Column("id", sa.Uuid(as_uuid=True), primary_key=True),
+        sa.Column("user_id", sa.Uuid(as_uuid=True), nullable=False),
+        sa.Column("device_ids", sa.JSON, nullable=False),
+        sa.Column(
+            "topology_type",
+            postgresql.ENUM(name="topologytype", schema=_schema, create_type=False),
+            nullable=False,
+        ),
+        sa.Column("purpose", sa.Text, nullable=True),
+        sa.Column("start_time", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("end_time", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("expires_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column(
+            "status",
+            sa.Enum(
+                "WAITING", "GRANTED", "EXPIRED", "CANCELLED",
+                name="waitliststatus", schema=_schema,
+            ),
+            nullable=False,
+        ),
+        sa.Column("reservation_id", sa.Uuid(as_uuid=True), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        schema=_schema,
+    )
+    op.create_index(
+        "ix_waitlist_entries_waiting_expires",
+        "waitlist_entries",
+        ["expires_at"],
+        schema=_schema,
+        postgresql_where=sa.text("status = 'WAITING'"),
+    )
+    op.create_index(
+        "ix_waitlist_entries_user_created",
+        "waitlist_entries",
+        ["user_id", "created_at"],
+        schema=_schema,
+    )
+
+    op.create_table(
+        "waitlist_devices",
+        sa.Column(
+            "entry_id",
+            sa.Uuid(as_uuid=True),
+            sa.ForeignKey(f"{_prefix}waitlist_entries.id", ondelete="CASCADE"),
+            primary_key=True,
+        ),
+        sa.Column("device_id", sa.Uuid(as_uuid=True), primary_key=True),
+        sa.Column("start_time", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("end_time", sa.DateTime(timezone=True), nullable=False),
+        schema=_schema,
+    )
+    op.create_index(
+        "ix_waitlist_devices_device",
+        "waitlist_devices",
+        ["device_id", "start_time"],
+        schema=_schema,
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("waitlist_devices", schema=_schema)
+    op.drop_table("waitlist_entries", schema=_schema)
+    sa.Enum(name="waitliststatus", schema=_schema).drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,27 @@
+"""Index reservation_devices by end_time for incremental utilization analytics.
+
+Revision ID: 0014
+Revises: 0013
+Create Date: 2026-10-17 00:00:00.000000
+"""
+
+import os
+
+from alembic import op
+
+revision = "0014"
+down_revision = "0013"
+branch_labels = None
+depends_on = None
+
+_schema = os.environ.get("DB_SCHEMA") or None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_reservation_devices_end", "reservation_devices", ["end_time"], schema=_schema
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_reservation_devices_end", "reservation_devices", schema=_schema)
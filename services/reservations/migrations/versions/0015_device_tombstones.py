@@ -0,0 +1,32 @@
+"""Version-stamped tombstones for devices deleted from the read-model.
+
+Revision ID: 0015
+Revises: 0014
+Create Date: 2026-10-17 00:00:00.000000
+"""
+
+import os
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0015"
+down_revision = "0014"
+branch_labels = None
+depends_on = None
+
+_schema = os.environ.get("DB_SCHEMA") or None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "device_tombstones",
+        sa.Column("id", sa.Uuid(as_uuid=True), primary_key=True),
+        sa.Column("version", sa.Integer, nullable=False),
+        sa.Column("deleted_at", sa.DateTime(timezone=True), nullable=False),
+        schema=_schema,
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("device_tombstones", schema=_schema)
@@ -2,23 +2,77 @@
 Reservations service tests.
 The inventory service HTTP calls are mocked with respx.
 """
+import asyncio
+import gzip
+import json
+import os
 import uuid
 from datetime import datetime, timedelta, timezone
-from unittest.mock import AsyncMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 
+import httpx
+import numpy as np
 import pytest
+import respx
 from app.database import Base, get_db
-from app.dependencies.auth import get_current_user_payload
+from app.dependencies.auth import get_current_user_payload, require_admin
+from app.inventory_client import create_inventory_client
 from app.main import app
+from app.models.device import DeviceReplica, DeviceTombstone
+from app.models.idempotency import IdempotencyKey
+from app.models.outbox import OutboxEvent
+from app.models.reservation import (
+    Reservation,
+    ReservationDevice,
+    ReservationSeries,
+    ReservationStatus,
+)
+from app.models.waitlist import WaitlistDevice, WaitlistEntry
 from app.routers.reservations import bearer_scheme
+from app.schemas.reservation import ReservationCreate, ReservationSeriesCreate
+from app.services.admin_service import iter_reservations
+from app.services.allocation_service import feasible_runs
+from app.services.analytics import UtilizationAnalytics, hour_of_week, occupancy
+from app.services.availability_service import free_windows, merge_intervals
+from app.services.events import CREATED_SUBJECT
+from app.services.partitions import (
+    add_months,
+    archive_partitions,
+    ensure_partitions,
+    live_since,
+    month_start,
+    partition_name,
+)
+from app.services.recurrence import materialize_due_series
+from app.services.reservation_service import (
+    _fetch_devices,
+    _finish_reservation,
+    _insert_unless_conflicting,
+    _new_reservation,
+    _update_device_statuses,
+    create_series,
+)
+from app.tasks.device_sync import DeviceReadModel
+from app.tasks.idempotency import IdempotencyKeyCleaner
+from app.tasks.leader import LeaderElector
+from app.tasks.lifecycle import LifecycleScheduler
+from app.tasks.outbox import OutboxRelay
+from app.tasks.partitions import PartitionMaintainer
 from fastapi.security import HTTPAuthorizationCredentials
+from herd_common.enums import TopologyType
 from httpx import ASGITransport, AsyncClient
+from sqlalchemy import select, text, update
 from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
 
 TEST_DATABASE_URL = "sqlite+aiosqlite:///:memory:"
 engine = create_async_engine(TEST_DATABASE_URL, echo=False)
 TestSessionLocal = async_sessionmaker(engine, expire_on_commit=False)
 
+# The single-statement PostgreSQL paths only run against a real server; point this
+# at a scratch database (its tables are dropped after each test)
+POSTGRES_TEST_URL = os.environ.get("POSTGRES_TEST_URL")
+
 USER_ID = str(uuid.uuid4())
 DEVICE_A = str(uuid.uuid4())
 DEVICE_B = str(uuid.uuid4())
@@ -92,9 +146,6 @@ async def _create_test_reservation(client, device_ids=None, **overrides):
     with patch(
         "app.services.reservation_service._fetch_devices",
         new=AsyncMock(return_value=devices),
-    ), patch(
-        "app.services.reservation_service._publish_nats_event",
-        new=AsyncMock(),
     ), patch(
         "app.services.reservation_service._update_device_statuses",
         new=AsyncMock(),
@@ -113,9 +164,6 @@ async def test_create_reservation(client):
                 make_device_response(DEVICE_B, "PHYSICAL"),
             ]
         ),
-    ), patch(
-        "app.services.reservation_service._publish_nats_event",
-        new=AsyncMock(),
     ), patch(
         "app.services.reservation_service._update_device_statuses",
         new=AsyncMock(),
@@ -166,9 +214,6 @@ async def test_conflict_detection(client):
     with patch(
         "app.services.reservation_service._fetch_devices",
         new=AsyncMock(return_value=[make_device_response(DEVICE_A, "PHYSICAL")]),
-    ), patch(
-        "app.services.reservation_service._publish_nats_event",
-        new=AsyncMock(),
     ), patch(
         "app.services.reservation_service._update_device_statuses",
         new=AsyncMock(),
@@ -204,9 +249,6 @@ async def test_list_reservations(client):
     with patch(
         "app.services.reservation_service._fetch_devices",
         new=AsyncMock(return_value=[make_device_response(DEVICE_A, "PHYSICAL")]),
-    ), patch(
-        "app.services.reservation_service._publish_nats_event",
-        new=AsyncMock(),
     ), patch(
         "app.services.reservation_service._update_device_statuses",
         new=AsyncMock(),
@@ -217,7 +259,57 @@ async def test_list_reservations(client):
         )
     resp = await client.get("/")
     assert resp.status_code == 200
-    assert len(resp.json()) == 1
+    assert len(resp.json()["items"]) == 1
+    assert resp.json()["next_cursor"] is None
+
+
+@pytest.mark.asyncio
+async def test_list_reservations_paginates_by_cursor(client):
+    for hour in range(5):
+        await _create_test_reservation(
+            client,
+            [DEVICE_A],
+            start_time=(NOW + timedelta(hours=hour + 1)).isoformat(),
+            end_time=(NOW + timedelta(hours=hour + 1, minutes=30)).isoformat(),
+        )
+
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+        page = (await client.get("/", params=params)).json()
+        seen.extend(item["id"] for item in page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert len(seen) == len(set(seen)) == 5
+    # Newest first
+    assert seen[0] == (await client.get("/", params={"limit": 1})).json()["items"][0]["id"]
+
+    assert (await client.get("/", params={"cursor": "not-a-cursor"})).status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_list_reservations_filters(client):
+    first = (await _create_test_reservation(client, [DEVICE_A])).json()
+    await client.delete(f"/{first['id']}")
+    later_start = NOW + timedelta(days=2)
+    await _create_test_reservation(
+        client,
+        [DEVICE_A],
+        start_time=later_start.isoformat(),
+        end_time=(later_start + timedelta(hours=1)).isoformat(),
+    )
+
+    # Default view hides cancelled and completed reservations
+    items = (await client.get("/")).json()["items"]
+    assert [r["status"] for r in items] == ["ACTIVE"]
+
+    items = (await client.get("/", params={"status": ["CANCELLED", "ACTIVE"]})).json()["items"]
+    assert len(items) == 2
+
+    window = {"end": (NOW + timedelta(days=1)).isoformat(), "status": "CANCELLED"}
+    items = (await client.get("/", params=window)).json()["items"]
+    assert [r["id"] for r in items] == [first["id"]]
 
 
 @pytest.mark.asyncio
@@ -225,9 +317,6 @@ async def test_cancel_reservation(client):
     with patch(
         "app.services.reservation_service._fetch_devices",
         new=AsyncMock(return_value=[make_device_response(DEVICE_A, "PHYSICAL")]),
-    ), patch(
-        "app.services.reservation_service._publish_nats_event",
-        new=AsyncMock(),
     ), patch(
         "app.services.reservation_service._update_device_statuses",
         new=AsyncMock(),
@@ -293,6 +382,37 @@ async def test_cancel_already_cancelled(client):
         assert second.status_code == 204
 
 
+@pytest.mark.asyncio
+async def test_reservation_left_live_by_outage_can_still_be_ended(client):
+    # Still ACTIVE well past its end, as if the scheduler had been down for months
+    stale_end = live_since() - timedelta(days=30)
+    reservation_ids = []
+    for device_id in (DEVICE_A, DEVICE_B):
+        create_resp = await _create_test_reservation(client, [device_id])
+        reservation_ids.append(create_resp.json()["id"])
+        async with TestSessionLocal() as db:
+            await db.execute(
+                update(Reservation)
+                .where(Reservation.id == uuid.UUID(reservation_ids[-1]))
+                .values(
+                    start_time=stale_end - timedelta(hours=2),
+                    end_time=stale_end,
+                    status=ReservationStatus.ACTIVE,
+                )
+            )
+            await db.commit()
+    cancel_id, release_id = reservation_ids
+
+    listed = (await client.get("/")).json()["items"]
+    assert {r["id"] for r in listed} == set(reservation_ids)
+
+    with patch("app.services.reservation_service._update_device_statuses", new=AsyncMock()):
+        assert (await client.delete(f"/{cancel_id}")).status_code == 204
+        released = await client.put(f"/{release_id}/release")
+    assert (await client.get(f"/{cancel_id}")).json()["status"] == "CANCELLED"
+    assert released.json()["status"] == "COMPLETED"
+
+
 # --- Release tests ---
 
 
@@ -482,3 +602,1531 @@ async def test_conflict_then_cancel_then_rebook(client):
     # Now B should succeed
     resp_b = await _create_test_reservation(client, [DEVICE_A])
     assert resp_b.status_code == 201
+
+
+@pytest.mark.asyncio
+async def test_different_devices_same_window_allowed(client):
+    """Conflicts are per device: a disjoint device set in the same window is fine."""
+    resp_a = await _create_test_reservation(client, [DEVICE_A])
+    assert resp_a.status_code == 201
+    resp_b = await _create_test_reservation(client, [DEVICE_B])
+    assert resp_b.status_code == 201
+
+
+@pytest.mark.asyncio
+async def test_reservation_device_rows_follow_status(client):
+    """Each reserved device gets an indexed row whose status mirrors the reservation."""
+    create_resp = await _create_test_reservation(client, [DEVICE_A, DEVICE_B])
+    reservation_id = create_resp.json()["id"]
+    with patch(
+        "app.services.reservation_service._update_device_statuses",
+        new=AsyncMock(),
+    ):
+        await client.delete(f"/{reservation_id}")
+
+    async with TestSessionLocal() as session:
+        rows = (
+            await session.execute(
+                select(ReservationDevice).where(
+                    ReservationDevice.reservation_id == uuid.UUID(reservation_id)
+                )
+            )
+        ).scalars().all()
+    assert {str(r.device_id) for r in rows} == {DEVICE_A, DEVICE_B}
+    assert all(r.status == "CANCELLED" for r in rows)
+
+
+# --- PostgreSQL single-statement paths ---
+
+
+requires_postgres = pytest.mark.skipif(
+    not POSTGRES_TEST_URL, reason="POSTGRES_TEST_URL is not set"
+)
+
+
+@pytest.fixture
+async def pg_db():
+    pg_engine = create_async_engine(POSTGRES_TEST_URL, poolclass=NullPool)
+    async with pg_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    try:
+        async with async_sessionmaker(pg_engine, expire_on_commit=False)() as session:
+            yield session
+    finally:
+        async with pg_engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+        await pg_engine.dispose()
+
+
+def _pg_reservation(device_ids, start, end):
+    data = ReservationCreate(device_ids=device_ids, start_time=start, end_time=end)
+    return _new_reservation(data, uuid.UUID(USER_ID), TopologyType.PHYSICAL)
+
+
+async def _pg_counts(db):
+    reservations = (await db.execute(select(Reservation))).scalars().all()
+    rows = (await db.execute(select(ReservationDevice))).scalars().all()
+    events = (await db.execute(select(OutboxEvent))).scalars().all()
+    return reservations, rows, events
+
+
+@requires_postgres
+@pytest.mark.asyncio
+async def test_pg_insert_unless_conflicting_books_then_refuses_overlap(pg_db):
+    start, end = NOW + timedelta(hours=1), NOW + timedelta(hours=3)
+    booked = _pg_reservation([DEVICE_A, DEVICE_B], start, end)
+    assert await _insert_unless_conflicting(pg_db, booked) == []
+    await pg_db.commit()
+
+    reservations, rows, events = await _pg_counts(pg_db)
+    assert [r.id for r in reservations] == [booked.id]
+    assert {str(row.device_id) for row in rows} == {DEVICE_A, DEVICE_B}
+    assert [e.subject for e in events] == [CREATED_SUBJECT]
+    assert events[0].payload["reservation_id"] == str(booked.id)
+
+    overlapping = _pg_reservation([DEVICE_B], start + timedelta(hours=1), end)
+    assert await _insert_unless_conflicting(pg_db, overlapping) == [uuid.UUID(DEVICE_B)]
+    await pg_db.rollback()
+    # Nothing of the refused booking was written
+    reservations, rows, events = await _pg_counts(pg_db)
+    assert len(reservations) == 1 and len(rows) == 2 and len(events) == 1
+
+    # Back to back is not an overlap
+    after = _pg_reservation([DEVICE_B], end, end + timedelta(hours=1))
+    assert await _insert_unless_conflicting(pg_db, after) == []
+    await pg_db.commit()
+    assert len((await _pg_counts(pg_db))[0]) == 2
+
+
+@requires_postgres
+@pytest.mark.asyncio
+async def test_pg_insert_unless_conflicting_sees_unmaterialized_series(pg_db):
+    series_start = NOW.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+    data = ReservationSeriesCreate(
+        device_ids=[DEVICE_A],
+        start_time=series_start,
+        end_time=series_start + timedelta(hours=4),
+        rrule="FREQ=DAILY;COUNT=30",
+    )
+    with patch(
+        "app.services.reservation_service._fetch_devices",
+        new=AsyncMock(return_value=[make_device_response(DEVICE_A)]),
+    ), patch("app.services.reservation_service._update_device_statuses", new=AsyncMock()):
+        await create_series(pg_db, data, uuid.UUID(USER_ID), "fake-token")
+
+    # Day 10 is well past the materialized lookahead
+    night = series_start + timedelta(days=10, hours=1)
+    blocked = _pg_reservation([DEVICE_A, DEVICE_B], night, night + timedelta(hours=1))
+    assert await _insert_unless_conflicting(pg_db, blocked) == [uuid.UUID(DEVICE_A)]
+    await pg_db.rollback()
+
+    daytime = _pg_reservation([DEVICE_A], night + timedelta(hours=8), night + timedelta(hours=9))
+    assert await _insert_unless_conflicting(pg_db, daytime) == []
+    await pg_db.commit()
+
+
+@requires_postgres
+@pytest.mark.asyncio
+async def test_pg_finish_reservation_moves_rows_and_enqueues_event(pg_db):
+    booked = _pg_reservation([DEVICE_A], NOW + timedelta(hours=1), NOW + timedelta(hours=3))
+    await _insert_unless_conflicting(pg_db, booked)
+    await pg_db.commit()
+    finish = (
+        (ReservationStatus.PENDING, ReservationStatus.ACTIVE),
+        ReservationStatus.CANCELLED,
+        "herd.reservations.cancelled",
+        "reservation.cancelled",
+    )
+
+    assert await _finish_reservation(pg_db, booked.id, uuid.uuid4(), *finish) is None
+    cancelled = await _finish_reservation(pg_db, booked.id, uuid.UUID(USER_ID), *finish)
+    assert cancelled.id == booked.id
+    assert cancelled.status == ReservationStatus.CANCELLED
+
+    reservations, rows, events = await _pg_counts(pg_db)
+    assert [row.status for row in rows] == [ReservationStatus.CANCELLED]
+    event = next(e for e in events if e.subject == "herd.reservations.cancelled")
+    assert event.payload == {
+        "event": "reservation.cancelled",
+        "reservation_id": str(booked.id),
+        "user_id": USER_ID,
+        "device_ids": [DEVICE_A],
+    }
+    # Already cancelled: nothing to move, nothing enqueued
+    assert await _finish_reservation(pg_db, booked.id, uuid.UUID(USER_ID), *finish) is None
+    assert len((await _pg_counts(pg_db))[2]) == len(events)
+
+
+# --- Inventory batch lookup ---
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_fetch_devices_single_batch_call():
+    route = respx.post("http://inventory:8000/devices:batchGet").mock(
+        return_value=httpx.Response(
+            200,
+            json={
+                "devices": [make_device_response(DEVICE_A), make_device_response(DEVICE_B)],
+                "missing": [],
+            },
+        )
+    )
+    devices = await _fetch_devices([uuid.UUID(DEVICE_A), uuid.UUID(DEVICE_B)], "fake-token")
+    assert route.call_count == 1
+    assert {d["id"] for d in devices} == {DEVICE_A, DEVICE_B}
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_fetch_devices_splits_at_inventory_batch_limit():
+    device_ids = [uuid.uuid4() for _ in range(1201)]
+
+    def batch_get(request):
+        ids = json.loads(request.content)["ids"]
+        return httpx.Response(
+            200, json={"devices": [make_device_response(d) for d in ids], "missing": []}
+        )
+
+    route = respx.post("http://inventory:8000/devices:batchGet").mock(side_effect=batch_get)
+    devices = await _fetch_devices(device_ids, "fake-token")
+    sizes = sorted(len(json.loads(call.request.content)["ids"]) for call in route.calls)
+    assert sizes == [201, 500, 500]
+    assert {d["id"] for d in devices} == {str(d) for d in device_ids}
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_fetch_devices_reports_missing():
+    respx.post("http://inventory:8000/devices:batchGet").mock(
+        return_value=httpx.Response(200, json={"devices": [], "missing": [DEVICE_A]})
+    )
+    with pytest.raises(ValueError, match=DEVICE_A):
+        await _fetch_devices([uuid.UUID(DEVICE_A)], "fake-token")
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_fetch_devices_reuses_shared_client():
+    respx.post("http://inventory:8000/devices:batchGet").mock(
+        return_value=httpx.Response(
+            200, json={"devices": [make_device_response(DEVICE_A)], "missing": []}
+        )
+    )
+    async with create_inventory_client() as shared:
+        await _fetch_devices([uuid.UUID(DEVICE_A)], "fake-token", shared)
+        await _fetch_devices([uuid.UUID(DEVICE_A)], "fake-token", shared)
+        assert not shared.is_closed
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_update_device_statuses_single_bulk_call():
+    route = respx.post("http://inventory:8000/devices:batchSetStatus").mock(
+        return_value=httpx.Response(
+            200,
+            json={
+                "results": [
+                    {"device_id": DEVICE_A, "status": "AVAILABLE", "updated": True},
+                    {"device_id": DEVICE_B, "status": "AVAILABLE", "updated": True},
+                ]
+            },
+        )
+    )
+    await _update_device_statuses(
+        [uuid.UUID(DEVICE_A), uuid.UUID(DEVICE_B)], "AVAILABLE", "fake-token"
+    )
+    assert route.call_count == 1
+
+
+# --- Lifecycle scheduler ---
+
+
+def test_scheduler_orders_deadlines_and_forgets():
+    scheduler = LifecycleScheduler(session_factory=TestSessionLocal)
+    first, second = uuid.uuid4(), uuid.uuid4()
+    soon = NOW + timedelta(minutes=5)
+    later = NOW + timedelta(minutes=10)
+    scheduler.track(second, ReservationStatus.ACTIVE, NOW, later)
+    scheduler.track(first, ReservationStatus.PENDING, soon, later)
+    assert scheduler.next_deadline == soon
+    scheduler.forget(first)
+    assert scheduler.next_deadline == later
+    # Deadlines beyond the sweep horizon are left to reconciliation
+    scheduler.track(first, ReservationStatus.ACTIVE, NOW, NOW + timedelta(days=30))
+    assert scheduler.next_deadline == later
+
+
+@pytest.mark.asyncio
+async def test_scheduler_keeps_a_heap_only_while_running():
+    scheduler = LifecycleScheduler(session_factory=TestSessionLocal)
+    soon = NOW + timedelta(minutes=5)
+    remote = MagicMock(
+        data=json.dumps(
+            {
+                "reservation_id": str(uuid.uuid4()),
+                "status": "PENDING",
+                "start_time": soon.isoformat(),
+                "end_time": (soon + timedelta(hours=1)).isoformat(),
+            }
+        ).encode()
+    )
+    # Not leading: writes here and elsewhere are not kept
+    await scheduler.notify(uuid.uuid4(), ReservationStatus.PENDING, soon, soon)
+    await scheduler._on_remote(remote)
+    assert scheduler.next_deadline is None
+
+    swept = asyncio.Event()
+    reconcile = scheduler.reconcile
+
+    async def reconcile_and_signal(http_client=None):
+        await reconcile(http_client)
+        swept.set()
+
+    with patch(
+        "app.tasks.lifecycle._update_device_statuses_internal", new=AsyncMock()
+    ), patch.object(scheduler, "reconcile", new=reconcile_and_signal):
+        task = asyncio.create_task(scheduler.run())
+        await asyncio.wait_for(swept.wait(), timeout=5)
+        await scheduler._on_remote(remote)
+        assert scheduler.next_deadline == soon
+        # Let the loop take the wake-up and go back to sleep on the new deadline
+        while scheduler._wakeup.is_set():
+            await asyncio.sleep(0)
+        # Losing the lease cancels run(), which drops the heap
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+    assert scheduler.next_deadline is None
+    await scheduler._on_remote(remote)
+    assert scheduler.next_deadline is None
+
+
+@pytest.mark.asyncio
+async def test_scheduler_applies_due_transitions():
+    past = NOW - timedelta(hours=2)
+    async with TestSessionLocal() as session:
+        expired = Reservation(
+            user_id=uuid.UUID(USER_ID),
+            device_ids=[DEVICE_A],
+            topology_type="PHYSICAL",
+            start_time=past,
+            end_time=NOW - timedelta(minutes=1),
+            status=ReservationStatus.ACTIVE,
+            devices=[
+                ReservationDevice(
+                    device_id=uuid.UUID(DEVICE_A),
+                    start_time=past,
+                    end_time=NOW - timedelta(minutes=1),
+                    status=ReservationStatus.ACTIVE,
+                )
+            ],
+        )
+        starting = Reservation(
+            user_id=uuid.UUID(USER_ID),
+            device_ids=[DEVICE_B],
+            topology_type="PHYSICAL",
+            start_time=past,
+            end_time=NOW + timedelta(minutes=5),
+            status=ReservationStatus.PENDING,
+        )
+        session.add_all([expired, starting])
+        await session.commit()
+
+    scheduler = LifecycleScheduler(session_factory=TestSessionLocal)
+    with patch(
+        "app.tasks.lifecycle._update_device_statuses_internal", new=AsyncMock()
+    ) as set_status:
+        await scheduler.reconcile()
+
+    async with TestSessionLocal() as session:
+        # The primary key includes the partition key, end_time
+        expired_row = await session.get(Reservation, (expired.id, expired.end_time))
+        starting_row = await session.get(Reservation, (starting.id, starting.end_time))
+        assert expired_row.status == "COMPLETED"
+        assert starting_row.status == "ACTIVE"
+        row = (
+            await session.execute(
+                select(ReservationDevice).where(ReservationDevice.reservation_id == expired.id)
+            )
+        ).scalar_one()
+        assert row.status == "COMPLETED"
+    # Completed devices are released before newly active ones are held
+    assert [c.args[:2] for c in set_status.await_args_list] == [
+        ([uuid.UUID(DEVICE_A)], "AVAILABLE"),
+        ([uuid.UUID(DEVICE_B)], "RESERVED"),
+    ]
+    # The newly active reservation is now tracked until its end_time
+    assert scheduler.next_deadline is not None
+
+
+# --- Leader election ---
+
+
+@pytest.mark.asyncio
+async def test_leader_election_single_holder_and_handover():
+    first = LeaderElector("test-lease", session_factory=TestSessionLocal)
+    second = LeaderElector("test-lease", session_factory=TestSessionLocal)
+    assert await first.try_acquire() is True
+    assert await second.try_acquire() is False
+    assert await first.try_acquire() is True  # renewal
+    await first.release()
+    assert await second.try_acquire() is True
+    status = await first.status()
+    assert status["leader"] == second.instance_id
+    assert status["is_leader"] is False
+
+
+@pytest.mark.asyncio
+async def test_leader_takeover_after_expiry():
+    dead = LeaderElector("test-lease", session_factory=TestSessionLocal, ttl_seconds=0)
+    live = LeaderElector("test-lease", session_factory=TestSessionLocal)
+    await dead.try_acquire()
+    assert await live.try_acquire() is True
+
+
+@pytest.mark.asyncio
+async def test_leader_restarts_work_that_fails():
+    elector = LeaderElector("test-lease", session_factory=TestSessionLocal, ttl_seconds=1)
+    calls = 0
+    restarted = asyncio.Event()
+
+    async def work():
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            raise RuntimeError("scheduler crashed")
+        restarted.set()
+        await asyncio.Event().wait()
+
+    runner = asyncio.create_task(elector.run(work))
+    try:
+        await asyncio.wait_for(restarted.wait(), timeout=5)
+        assert elector.is_leader
+    finally:
+        runner.cancel()
+        await asyncio.gather(runner, return_exceptions=True)
+    assert calls == 2
+    assert not elector.is_leader
+
+
+@pytest.mark.asyncio
+async def test_leader_status_endpoint(client):
+    app.dependency_overrides[require_admin] = lambda: {"sub": USER_ID, "role": "admin"}
+    app.state.leader = LeaderElector("test-lease", session_factory=TestSessionLocal)
+    try:
+        await app.state.leader.try_acquire()
+        resp = await client.get("/lifecycle/leader")
+    finally:
+        del app.state.leader
+    assert resp.status_code == 200
+    data = resp.json()
+    assert data["is_leader"] is True
+    assert data["leader"] == data["instance_id"]
+    assert data["lease_age_seconds"] >= 0
+
+
+# --- Waitlist ---
+
+
+def _inventory_lookup(status="AVAILABLE", **statuses):
+    """Patch the grant-time device lookup; ``statuses`` override by device ID."""
+
+    def lookup(device_ids, *args):
+        return {
+            d: {**make_device_response(str(d)), "status": statuses.get(str(d), status)}
+            for d in device_ids
+        }, []
+
+    return patch(
+        "app.services.reservation_service.lookup_devices", new=AsyncMock(side_effect=lookup)
+    )
+
+
+async def _join_waitlist(client, device_ids, **overrides):
+    body = {"device_ids": device_ids, "start_time": START, "end_time": END, **overrides}
+    with patch(
+        "app.services.reservation_service._fetch_devices",
+        new=AsyncMock(return_value=[make_device_response(d) for d in device_ids]),
+    ), patch(
+        "app.services.reservation_service._update_device_statuses", new=AsyncMock()
+    ), _inventory_lookup():
+        return await client.post("/waitlist", json=body)
+
+
+@pytest.mark.asyncio
+async def test_waitlist_granted_in_order_when_devices_free(client):
+    blocker = (await _create_test_reservation(client, [DEVICE_A])).json()
+    first = (await _join_waitlist(client, [DEVICE_A])).json()
+    second = (await _join_waitlist(client, [DEVICE_A, DEVICE_B])).json()
+    later = (NOW + timedelta(hours=4)).isoformat()
+    unrelated = (await _join_waitlist(client, [DEVICE_B], start_time=END, end_time=later)).json()
+    assert first["status"] == second["status"] == "WAITING"
+    # Nothing blocked this one, so it was granted on the spot
+    assert unrelated["status"] == "GRANTED"
+
+    with patch(
+        "app.services.reservation_service._update_device_statuses", new=AsyncMock()
+    ), _inventory_lookup():
+        resp = await client.delete(f"/{blocker['id']}")
+    assert resp.status_code == 204
+
+    first = (await client.get(f"/waitlist/{first['id']}")).json()
+    second = (await client.get(f"/waitlist/{second['id']}")).json()
+    assert first["status"] == "GRANTED"
+    assert second["status"] == "WAITING"
+    granted = (await client.get(f"/{first['reservation_id']}")).json()
+    assert granted["device_ids"] == [DEVICE_A] and granted["status"] == "ACTIVE"
+
+    async with TestSessionLocal() as db:
+        events = (await db.execute(select(OutboxEvent))).scalars().all()
+        rows = (await db.execute(select(WaitlistDevice.entry_id))).scalars().all()
+    grants = [e.payload for e in events if e.subject == "herd.reservations.waitlist_granted"]
+    assert [g["entry_id"] for g in grants] == [unrelated["id"], first["id"]]
+    assert grants[1]["reservation_id"] == first["reservation_id"]
+    # Only entries still waiting keep their per-device index rows
+    assert {str(r) for r in rows} == {second["id"]}
+
+
+@pytest.mark.asyncio
+async def test_waitlist_skips_devices_gone_into_maintenance(client):
+    blocker = (await _create_test_reservation(client, [DEVICE_A])).json()
+    waiting = (await _join_waitlist(client, [DEVICE_A])).json()
+    assert waiting["status"] == "WAITING"
+
+    # The device went into maintenance while the entry waited
+    with patch(
+        "app.services.reservation_service._update_device_statuses", new=AsyncMock()
+    ) as update_statuses, _inventory_lookup(**{DEVICE_A: "MAINTENANCE"}):
+        resp = await client.delete(f"/{blocker['id']}")
+    assert resp.status_code == 204
+
+    assert (await client.get(f"/waitlist/{waiting['id']}")).json()["status"] == "WAITING"
+    # Only the release reached inventory; nothing was reserved again
+    assert [c.args[1] for c in update_statuses.await_args_list] == ["AVAILABLE"]
+    async with TestSessionLocal() as db:
+        statuses = (await db.execute(select(Reservation.status))).scalars().all()
+    assert statuses == [ReservationStatus.CANCELLED]
+
+
+@pytest.mark.asyncio
+async def test_waitlist_validation_leave_and_expiry(client):
+    await _create_test_reservation(client, [DEVICE_A])
+    # The deadline may not pass the end of the window
+    too_late = (NOW + timedelta(hours=5)).isoformat()
+    resp = await _join_waitlist(client, [DEVICE_A], expires_at=too_late)
+    assert resp.status_code == 422
+
+    leaving = (await _join_waitlist(client, [DEVICE_A])).json()
+    assert (await client.delete(f"/waitlist/{leaving['id']}")).status_code == 204
+    assert (await client.get(f"/waitlist/{leaving['id']}")).json()["status"] == "CANCELLED"
+
+    expiring = (await _join_waitlist(client, [DEVICE_A])).json()
+    async with TestSessionLocal() as db:
+        entry = await db.get(WaitlistEntry, uuid.UUID(expiring["id"]))
+        entry.expires_at = NOW - timedelta(minutes=1)
+        await db.commit()
+    scheduler = LifecycleScheduler(session_factory=TestSessionLocal)
+    assert await scheduler.expire_waitlist() == 1
+    assert (await client.get(f"/waitlist/{expiring['id']}")).json()["status"] == "EXPIRED"
+    assert [e["id"] for e in (await client.get("/waitlist")).json()] == [
+        expiring["id"], leaving["id"],
+    ]
+
+
+@pytest.mark.asyncio
+async def test_waitlist_accepts_devices_reserved_by_others(client):
+    await _create_test_reservation(client, [DEVICE_A])
+    body = {"device_ids": [DEVICE_A], "start_time": START, "end_time": END}
+
+    async def join(status):
+        device = {**make_device_response(DEVICE_A), "status": status}
+        with patch(
+            "app.services.reservation_service._fetch_devices",
+            new=AsyncMock(return_value=[device]),
+        ), _inventory_lookup(status):
+            return await client.post("/waitlist", json=body)
+
+    # Inventory shows the device as taken, which is the reason to wait for it
+    resp = await join("RESERVED")
+    assert resp.status_code == 201
+    assert resp.json()["status"] == "WAITING"
+    # A device out of service is still refused
+    assert (await join("MAINTENANCE")).status_code == 422
+
+
+# --- Transactional outbox ---
+
+
+@pytest.mark.asyncio
+async def test_outbox_written_with_reservation_changes(client):
+    create_resp = await _create_test_reservation(client, [DEVICE_A])
+    reservation_id = create_resp.json()["id"]
+    with patch(
+        "app.services.reservation_service._update_device_statuses",
+        new=AsyncMock(),
+    ):
+        await client.delete(f"/{reservation_id}")
+
+    async with TestSessionLocal() as session:
+        events = (
+            await session.execute(select(OutboxEvent).order_by(OutboxEvent.created_at))
+        ).scalars().all()
+    assert [e.subject for e in events] == [
+        "herd.reservations.created",
+        "herd.reservations.cancelled",
+    ]
+    assert all(e.payload["reservation_id"] == reservation_id for e in events)
+    assert all(e.published_at is None for e in events)
+
+
+@pytest.mark.asyncio
+async def test_outbox_relay_publishes_batch_with_msg_ids(client):
+    await _create_test_reservation(client, [DEVICE_A])
+    await _create_test_reservation(client, [DEVICE_B])
+
+    js = MagicMock()
+    js.publish = AsyncMock(side_effect=[None, RuntimeError("nats down")])
+    nc = MagicMock()
+    nc.jetstream.return_value = js
+    relay = OutboxRelay(session_factory=TestSessionLocal)
+
+    assert await relay.drain_once(nc) == 1
+    assert js.publish.await_count == 2
+    msg_ids = {call.kwargs["headers"]["Nats-Msg-Id"] for call in js.publish.await_args_list}
+    assert len(msg_ids) == 2
+    status = await relay.status()
+    assert status["pending"] == 1
+
+    # The failed event is retried on the next drain
+    js.publish = AsyncMock()
+    assert await relay.drain_once(nc) == 1
+    assert (await relay.status())["pending"] == 0
+
+
+@pytest.mark.asyncio
+async def test_outbox_relay_connects_itself_when_nats_was_down(client):
+    await _create_test_reservation(client, [DEVICE_A])
+
+    js = MagicMock()
+    js.publish = AsyncMock()
+    nc = MagicMock(is_closed=False)
+    nc.jetstream.return_value = js
+    nc.close = AsyncMock()
+    connect = AsyncMock(side_effect=[OSError("refused"), OSError("refused"), nc])
+    sleep = AsyncMock()
+    relay = OutboxRelay(session_factory=TestSessionLocal, connect_retry_max_seconds=1.5)
+    drained = asyncio.Event()
+    drain_once = relay.drain_once
+
+    async def drain_and_signal(conn):
+        published = await drain_once(conn)
+        drained.set()
+        return published
+
+    with patch("nats.connect", new=connect), patch(
+        "app.tasks.outbox.asyncio.sleep", new=sleep
+    ), patch.object(relay, "drain_once", new=drain_and_signal):
+        task = asyncio.create_task(relay.run())
+        await asyncio.wait_for(drained.wait(), timeout=5)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    assert connect.await_count == 3
+    # Backoff doubles up to the cap
+    assert [call.args[0] for call in sleep.await_args_list] == [1.0, 1.5]
+    assert js.publish.await_count == 1
+    assert (await relay.status())["pending"] == 0
+    nc.close.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_subscriptions_attach_when_nats_comes_up_after_startup():
+    from app.main import _connect_nats_later
+
+    nc = MagicMock()
+    connect = AsyncMock(side_effect=[OSError("refused"), nc])
+    fake_app = MagicMock()
+    fake_app.state.nats = None
+    with patch("nats.connect", new=connect), patch(
+        "app.main.asyncio.sleep", new=AsyncMock()
+    ), patch("app.main.device_read_model") as read_model, patch(
+        "app.main.lifecycle_scheduler"
+    ) as scheduler:
+        read_model.attach_nats = AsyncMock()
+        read_model.on_reconnect = AsyncMock()
+        scheduler.attach_nats = AsyncMock()
+        await _connect_nats_later(fake_app)
+
+    assert connect.await_count == 2
+    assert fake_app.state.nats is nc
+    read_model.attach_nats.assert_awaited_once_with(nc)
+    scheduler.attach_nats.assert_awaited_once_with(nc)
+    # The read-model resnapshots so it can go live on the new subscription
+    read_model.on_reconnect.assert_awaited_once()
+
+
+# --- Free/busy availability ---
+
+
+def test_merge_intervals_and_free_windows():
+    t = [NOW + timedelta(hours=h) for h in range(10)]
+    merged = merge_intervals([(t[4], t[6]), (t[1], t[3]), (t[2], t[4]), (t[7], t[8])])
+    assert merged == [(t[1], t[6]), (t[7], t[8])]
+    assert free_windows(merged, t[0], t[9], timedelta(0)) == [
+        (t[0], t[1]), (t[6], t[7]), (t[8], t[9]),
+    ]
+    assert free_windows(merged, t[0], t[9], timedelta(minutes=90)) == []
+
+
+@pytest.mark.asyncio
+async def test_availability_endpoint(client):
+    await _create_test_reservation(client, [DEVICE_A])
+    later_start = (NOW + timedelta(hours=4)).isoformat()
+    later_end = (NOW + timedelta(hours=5)).isoformat()
+    await _create_test_reservation(
+        client, [DEVICE_B], start_time=later_start, end_time=later_end
+    )
+    resp = await client.post(
+        "/availability",
+        json={
+            "device_ids": [DEVICE_A, DEVICE_B],
+            "start": NOW.isoformat(),
+            "end": (NOW + timedelta(hours=6)).isoformat(),
+        },
+    )
+    assert resp.status_code == 200
+    data = resp.json()
+    busy = {d["device_id"]: d["busy"] for d in data["devices"]}
+    assert len(busy[DEVICE_A]) == 1 and len(busy[DEVICE_B]) == 1
+    # Free: now..+1h, +3h..+4h, +5h..+6h
+    assert len(data["free"]) == 3
+
+
+@pytest.mark.asyncio
+async def test_availability_horizon_limit(client):
+    resp = await client.post(
+        "/availability",
+        json={
+            "device_ids": [DEVICE_A],
+            "start": NOW.isoformat(),
+            "end": (NOW + timedelta(days=90)).isoformat(),
+        },
+    )
+    assert resp.status_code == 422
+
+
+# --- Allocation ---
+
+
+def test_feasible_runs_need_every_type_at_once():
+    t = [NOW + timedelta(hours=h) for h in range(10)]
+    free = {
+        # Start ranges for one hour: [t0, t2] and [t2, t5]
+        "FIREWALL": [[(t[0], t[3])], [(t[2], t[6])]],
+        "SWITCH": [[(t[1], t[9])]],
+    }
+    hour = timedelta(hours=1)
+    assert feasible_runs(free, {"FIREWALL": 2, "SWITCH": 1}, hour) == [(t[2], t[2])]
+    assert feasible_runs(free, {"FIREWALL": 1, "SWITCH": 1}, hour) == [(t[1], t[5])]
+    assert feasible_runs(free, {"FIREWALL": 3, "SWITCH": 1}, hour) == []
+
+
+async def _add_replicas(*devices):
+    async with TestSessionLocal() as db:
+        for device_id, device_type in devices:
+            db.add(
+                DeviceReplica(
+                    id=uuid.UUID(device_id), name=f"{device_type.lower()}-{device_id[:8]}",
+                    device_type=device_type, topology_type=TopologyType.PHYSICAL,
+                    status="AVAILABLE", version=1,
+                )
+            )
+        await db.commit()
+
+
+def _allocation_read_model(behind: timedelta | None = timedelta(0)):
+    """A read-model whose last complete snapshot is ``behind`` old; None for never."""
+    model = DeviceReadModel(session_factory=TestSessionLocal)
+    if behind is not None:
+        model._snapshot_at = model._complete_at = datetime.now(timezone.utc) - behind
+    return patch("app.services.allocation_service.device_read_model", model)
+
+
+@pytest.mark.asyncio
+@_allocation_read_model()
+async def test_allocate_earliest_slot_with_alternatives(client):
+    switch = str(uuid.uuid4())
+    await _add_replicas((DEVICE_A, "FIREWALL"), (DEVICE_B, "FIREWALL"), (switch, "SWITCH"))
+    # DEVICE_A is busy from +1h to +3h
+    await _create_test_reservation(client, [DEVICE_A])
+    query = {
+        "items": [{"device_type": "FIREWALL", "count": 2}, {"device_type": "SWITCH", "count": 1}],
+        "topology_type": "PHYSICAL",
+        "duration_minutes": 30,
+        "start": START,
+    }
+    resp = await client.post("/allocate", json=query)
+    assert resp.status_code == 200
+    data = resp.json()
+    assert data["conflict"] is True
+    assert datetime.fromisoformat(data["start"]) == datetime.fromisoformat(END)
+    assert {d["id"] for d in data["devices"]} == {DEVICE_A, DEVICE_B, switch}
+    # The only other window is the last half hour before DEVICE_A's booking
+    [alternative] = data["alternatives"]
+    assert datetime.fromisoformat(alternative["end"]) == datetime.fromisoformat(START)
+
+    query["items"] = [{"device_type": "FIREWALL", "count": 1}]
+    data = (await client.post("/allocate", json=query)).json()
+    assert data["conflict"] is False and data["alternatives"] == []
+    assert [d["id"] for d in data["devices"]] == [DEVICE_B]
+
+    query["items"] = [{"device_type": "FIREWALL", "count": 3}]
+    resp = await client.post("/allocate", json=query)
+    assert resp.status_code == 422
+    assert "2 available" in resp.json()["detail"]
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_allocate_confirms_statuses_with_inventory_when_stale(client):
+    await _add_replicas((DEVICE_A, "FIREWALL"), (DEVICE_B, "FIREWALL"))
+    # DEVICE_A went into maintenance after the read-model stopped hearing events
+    batch_get = respx.post("http://inventory:8000/devices:batchGet").mock(
+        return_value=httpx.Response(
+            200,
+            json={
+                "devices": [
+                    {**make_device_response(DEVICE_A), "status": "MAINTENANCE"},
+                    make_device_response(DEVICE_B),
+                ],
+                "missing": [],
+            },
+        )
+    )
+    query = {
+        "items": [{"device_type": "FIREWALL", "count": 1}],
+        "topology_type": "PHYSICAL",
+        "duration_minutes": 30,
+        "start": START,
+    }
+    with _allocation_read_model(behind=timedelta(minutes=5)):
+        resp = await client.post("/allocate", json=query)
+    assert resp.status_code == 200
+    assert [d["id"] for d in resp.json()["devices"]] == [DEVICE_B]
+    assert batch_get.call_count == 1
+
+    query["items"][0]["count"] = 2
+    with _allocation_read_model(behind=timedelta(minutes=5)):
+        resp = await client.post("/allocate", json=query)
+    assert resp.status_code == 422
+    assert "1 available" in resp.json()["detail"]
+
+    batch_get.mock(side_effect=httpx.ConnectError("inventory down"))
+    with _allocation_read_model(behind=timedelta(minutes=5)):
+        resp = await client.post("/allocate", json=query)
+    assert resp.status_code == 503
+
+    with _allocation_read_model(behind=None):
+        resp = await client.post("/allocate", json=query)
+    assert resp.status_code == 503
+
+
+# --- Batch creation ---
+
+
+def _batch_lookup(*device_ids):
+    found = {uuid.UUID(d): make_device_response(d) for d in device_ids}
+    return patch(
+        "app.services.reservation_service.lookup_devices",
+        new=AsyncMock(return_value=(found, [])),
+    )
+
+
+def _window(start_hours, end_hours):
+    return {
+        "start_time": (NOW + timedelta(hours=start_hours)).isoformat(),
+        "end_time": (NOW + timedelta(hours=end_hours)).isoformat(),
+    }
+
+
+@pytest.mark.asyncio
+async def test_batch_create_atomic(client):
+    update_mock = AsyncMock()
+    with _batch_lookup(DEVICE_A, DEVICE_B) as lookup_mock, patch(
+        "app.services.reservation_service._update_device_statuses", new=update_mock
+    ):
+        resp = await client.post(
+            "/batch",
+            json={
+                "items": [
+                    {"device_ids": [DEVICE_A], **_window(24 * day, 24 * day + 2)}
+                    for day in range(1, 4)
+                ] + [{"device_ids": [DEVICE_B], **_window(1, 2)}],
+            },
+        )
+    assert resp.status_code == 201
+    results = resp.json()["results"]
+    assert [r["status_code"] for r in results] == [201] * 4
+    assert lookup_mock.await_count == 1
+    update_mock.assert_awaited_once()
+    assert set(update_mock.await_args.args[0]) == {uuid.UUID(DEVICE_A), uuid.UUID(DEVICE_B)}
+
+    async with TestSessionLocal() as db:
+        events = (await db.execute(select(OutboxEvent))).scalars().all()
+    assert len(events) == 4
+
+
+@pytest.mark.asyncio
+async def test_batch_create_atomic_rejects_intra_batch_overlap(client):
+    with _batch_lookup(DEVICE_A):
+        resp = await client.post(
+            "/batch",
+            json={
+                "items": [
+                    {"device_ids": [DEVICE_A], **_window(1, 3)},
+                    {"device_ids": [DEVICE_A], **_window(2, 4)},
+                ],
+            },
+        )
+    assert resp.status_code == 409
+    assert resp.json()["detail"].startswith("Item 1:")
+    async with TestSessionLocal() as db:
+        assert (await db.execute(select(Reservation))).scalars().all() == []
+
+
+@pytest.mark.asyncio
+async def test_batch_create_best_effort(client):
+    await _create_test_reservation(client, [DEVICE_A])
+    missing = str(uuid.uuid4())
+    with _batch_lookup(DEVICE_A, DEVICE_B), patch(
+        "app.services.reservation_service._update_device_statuses", new=AsyncMock()
+    ):
+        resp = await client.post(
+            "/batch",
+            json={
+                "atomic": False,
+                "items": [
+                    {"device_ids": [DEVICE_A], "start_time": START, "end_time": END},
+                    {"device_ids": [DEVICE_B], "start_time": START, "end_time": END},
+                    {"device_ids": [missing], "start_time": START, "end_time": END},
+                ],
+            },
+        )
+    assert resp.status_code == 201
+    results = resp.json()["results"]
+    assert [r["status_code"] for r in results] == [409, 201, 422]
+    assert results[1]["reservation"]["device_ids"] == [DEVICE_B]
+    assert "not found" in results[2]["error"]
+
+
+@pytest.mark.asyncio
+async def test_batch_create_best_effort_isolates_database_rejection(client):
+    from app.services import reservation_service
+
+    # Stands in for the exclusion constraint refusing the second item on PostgreSQL
+    taken = uuid.uuid4()
+    async with TestSessionLocal() as db:
+        db.add(OutboxEvent(id=taken, subject="herd.test", payload={}))
+        await db.commit()
+    enqueue = reservation_service.enqueue_created_event
+
+    def enqueue_clashing(db, reservation):
+        enqueue(db, reservation)
+        if reservation.device_ids == [DEVICE_B]:
+            db.add(OutboxEvent(id=taken, subject="herd.test", payload={}))
+
+    with _batch_lookup(DEVICE_A, DEVICE_B), patch(
+        "app.services.reservation_service._update_device_statuses", new=AsyncMock()
+    ), patch(
+        "app.services.reservation_service.enqueue_created_event", new=enqueue_clashing
+    ):
+        resp = await client.post(
+            "/batch",
+            json={
+                "atomic": False,
+                "items": [
+                    {"device_ids": [DEVICE_A], "start_time": START, "end_time": END},
+                    {"device_ids": [DEVICE_B], "start_time": START, "end_time": END},
+                ],
+            },
+        )
+    assert resp.status_code == 201
+    results = resp.json()["results"]
+    assert [r["status_code"] for r in results] == [201, 409]
+    async with TestSessionLocal() as db:
+        booked = (await db.execute(select(Reservation))).scalars().all()
+        rows = (await db.execute(select(ReservationDevice))).scalars().all()
+        subjects = (await db.execute(select(OutboxEvent.subject))).scalars().all()
+    assert [r.device_ids for r in booked] == [[DEVICE_A]]
+    assert [str(row.device_id) for row in rows] == [DEVICE_A]
+    assert sorted(subjects) == ["herd.reservations.created", "herd.test"]
+
+
+# --- Recurring series ---
+
+
+# First occurrence at the next full hour, so exactly two fall inside the 48h lookahead
+SERIES_START = (NOW + timedelta(hours=1)).replace(minute=0, second=0, microsecond=0)
+
+
+def _series_body(**overrides):
+    return {
+        "device_ids": [DEVICE_A],
+        "purpose": "Nightly soak",
+        "start_time": SERIES_START.isoformat(),
+        "end_time": (SERIES_START + timedelta(hours=4)).isoformat(),
+        "rrule": "FREQ=DAILY;COUNT=300",
+        **overrides,
+    }
+
+
+async def _create_test_series(client, **overrides):
+    with patch(
+        "app.services.reservation_service._fetch_devices",
+        new=AsyncMock(return_value=[make_device_response(DEVICE_A)]),
+    ), patch(
+        "app.services.reservation_service._update_device_statuses", new=AsyncMock()
+    ):
+        return await client.post("/series", json=_series_body(**overrides))
+
+
+@pytest.mark.asyncio
+async def test_series_materializes_only_near_term_occurrences(client):
+    resp = await _create_test_series(client)
+    assert resp.status_code == 201
+    series = resp.json()
+    assert series["status"] == "ACTIVE"
+
+    async with TestSessionLocal() as db:
+        occurrences = (
+            await db.execute(select(Reservation).order_by(Reservation.start_time))
+        ).scalars().all()
+    # 48h lookahead: the first two daily occurrences exist, the other 298 do not
+    assert len(occurrences) == 2
+    assert all(str(r.series_id) == series["id"] for r in occurrences)
+    assert all(r.status == ReservationStatus.PENDING for r in occurrences)
+
+
+@pytest.mark.asyncio
+async def test_single_booking_conflicts_with_unmaterialized_occurrence(client):
+    await _create_test_series(client)
+    night = SERIES_START + timedelta(days=200, hours=1)
+    resp = await _create_test_reservation(
+        client,
+        [DEVICE_A],
+        start_time=night.isoformat(),
+        end_time=(night + timedelta(hours=1)).isoformat(),
+    )
+    assert resp.status_code == 409
+
+    # Daytime on the same day is free
+    resp = await _create_test_reservation(
+        client,
+        [DEVICE_A],
+        start_time=(night + timedelta(hours=8)).isoformat(),
+        end_time=(night + timedelta(hours=9)).isoformat(),
+    )
+    assert resp.status_code == 201
+
+
+@pytest.mark.asyncio
+async def test_series_conflicts_with_existing_booking(client):
+    night = SERIES_START + timedelta(days=30, hours=2)
+    await _create_test_reservation(
+        client,
+        [DEVICE_A],
+        start_time=night.isoformat(),
+        end_time=(night + timedelta(hours=1)).isoformat(),
+    )
+    resp = await _create_test_series(client)
+    assert resp.status_code == 409
+
+
+@pytest.mark.asyncio
+async def test_series_rule_validation(client):
+    assert (await _create_test_series(client, rrule="FREQ=HOURLY;COUNT=5")).status_code == 422
+    # Unbounded rules would run past the one-year limit
+    assert (await _create_test_series(client, rrule="FREQ=DAILY")).status_code == 422
+    assert (await _create_test_series(client, timezone="Mars/Olympus")).status_code == 422
+    # Four-hour occurrences every two hours would overlap each other
+    resp = await _create_test_series(client, rrule="FREQ=DAILY;BYHOUR=1,3;COUNT=4")
+    assert resp.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_lifecycle_materializes_and_cancel_stops_series(client):
+    series_id = (await _create_test_series(client)).json()["id"]
+
+    async with TestSessionLocal() as db:
+        later = await materialize_due_series(db, NOW + timedelta(days=7))
+        await db.commit()
+    assert len(later) == 5
+
+    occurrence = SERIES_START + timedelta(days=3)
+    waiting = (
+        await _join_waitlist(
+            client, [DEVICE_A],
+            start_time=occurrence.isoformat(),
+            end_time=(occurrence + timedelta(hours=1)).isoformat(),
+        )
+    ).json()
+    assert waiting["status"] == "WAITING"
+
+    with patch(
+        "app.services.reservation_service._update_device_statuses", new=AsyncMock()
+    ) as update_statuses, _inventory_lookup():
+        resp = await client.delete(f"/series/{series_id}")
+    assert resp.status_code == 204
+    # Freed in inventory, then reserved again for the granted entry
+    assert [c.args[:2] for c in update_statuses.await_args_list] == [
+        ([uuid.UUID(DEVICE_A)], "AVAILABLE"),
+        ([uuid.UUID(DEVICE_A)], "RESERVED"),
+    ]
+    # The cancelled occurrence's window went to the waitlist
+    assert (await client.get(f"/waitlist/{waiting['id']}")).json()["status"] == "GRANTED"
+    async with TestSessionLocal() as db:
+        statuses = (
+            await db.execute(select(Reservation.status).where(Reservation.series_id.is_not(None)))
+        ).scalars().all()
+        assert set(statuses) == {ReservationStatus.CANCELLED}
+        assert await materialize_due_series(db, NOW + timedelta(days=30)) == []
+
+
+@pytest.mark.asyncio
+async def test_series_with_repeated_device_books_it_once(client):
+    resp = await _create_test_series(client, device_ids=[DEVICE_A, DEVICE_A])
+    assert resp.status_code == 201
+    series = resp.json()
+    assert series["device_ids"] == [DEVICE_A]
+
+    async with TestSessionLocal() as db:
+        # A series stored before de-duplication still materializes cleanly
+        stored = await db.get(ReservationSeries, uuid.UUID(series["id"]))
+        stored.device_ids = [DEVICE_A, DEVICE_A]
+        await db.commit()
+        later = await materialize_due_series(db, NOW + timedelta(days=7))
+        await db.commit()
+        assert len(later) == 5
+        rows = (await db.execute(select(ReservationDevice))).scalars().all()
+    assert len(rows) == 7
+    assert {str(row.device_id) for row in rows} == {DEVICE_A}
+
+
+# --- Admin query API ---
+
+
+@pytest.fixture
+def as_admin():
+    app.dependency_overrides[require_admin] = lambda: {"sub": USER_ID, "role": "admin"}
+    yield
+    app.dependency_overrides.pop(require_admin, None)
+
+
+@pytest.mark.asyncio
+async def test_admin_query_by_device_and_window(client, as_admin):
+    for day in range(4):
+        await _create_test_reservation(
+            client,
+            [DEVICE_A] if day % 2 == 0 else [DEVICE_B],
+            start_time=(NOW + timedelta(days=day, hours=1)).isoformat(),
+            end_time=(NOW + timedelta(days=day, hours=2)).isoformat(),
+        )
+
+    resp = await client.get("/admin/reservations", params={"device_id": DEVICE_A})
+    assert resp.status_code == 200
+    items = resp.json()["items"]
+    assert len(items) == 2
+    assert [r["start_time"] for r in items] == sorted(r["start_time"] for r in items)
+
+    next_week = {
+        "device_id": [DEVICE_A, DEVICE_B],
+        "start": (NOW + timedelta(days=1)).isoformat(),
+        "end": (NOW + timedelta(days=3)).isoformat(),
+        "limit": 1,
+    }
+    first = (await client.get("/admin/reservations", params=next_week)).json()
+    assert len(first["items"]) == 1 and first["next_cursor"]
+    second = (
+        await client.get(
+            "/admin/reservations", params={**next_week, "cursor": first["next_cursor"]}
+        )
+    ).json()
+    assert len(second["items"]) == 1 and second["next_cursor"] is None
+    assert first["items"][0]["device_ids"] == [DEVICE_B]
+    assert second["items"][0]["device_ids"] == [DEVICE_A]
+
+    other_user = str(uuid.uuid4())
+    resp = await client.get("/admin/reservations", params={"user_id": other_user})
+    assert resp.json()["items"] == []
+
+
+@pytest.mark.asyncio
+async def test_admin_export_streams_ndjson(client, as_admin):
+    for hour in range(3):
+        await _create_test_reservation(
+            client,
+            [DEVICE_A],
+            start_time=(NOW + timedelta(hours=hour + 1)).isoformat(),
+            end_time=(NOW + timedelta(hours=hour + 1, minutes=30)).isoformat(),
+        )
+    resp = await client.get("/admin/reservations/export", params={"status": "ACTIVE"})
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in resp.text.splitlines()]
+    assert len(lines) == 3
+    assert lines[0]["start_time"] < lines[-1]["start_time"]
+
+    # Small batches walk the same rows across several keyset pages
+    async with TestSessionLocal() as db:
+        walked = [r.id async for r in iter_reservations(db, batch_size=2)]
+    assert [str(i) for i in walked] == [line["id"] for line in lines]
+
+
+@pytest.mark.asyncio
+async def test_admin_query_requires_admin(client):
+    resp = await client.get("/admin/reservations")
+    assert resp.status_code in (401, 403)
+
+
+# --- Device read-model ---
+
+
+def _summary(device_id, version=1, status="AVAILABLE", topology_type="PHYSICAL"):
+    return {
+        "id": device_id,
+        "name": f"device-{device_id[:8]}",
+        "device_type": "FIREWALL",
+        "topology_type": topology_type,
+        "status": status,
+        "version": version,
+    }
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_read_model_serves_validation_when_fresh():
+    respx.get("http://inventory:8000/devices:snapshot").mock(
+        return_value=httpx.Response(200, json={"devices": [_summary(DEVICE_A), _summary(DEVICE_B)]})
+    )
+    batch_get = respx.post("http://inventory:8000/devices:batchGet").mock(
+        return_value=httpx.Response(
+            200, json={"devices": [make_device_response(DEVICE_CLOUD)], "missing": []}
+        )
+    )
+    model = DeviceReadModel(session_factory=TestSessionLocal)
+    assert await model.snapshot() == 2
+    assert model.is_fresh()
+
+    with patch("app.services.reservation_service.device_read_model", model):
+        async with TestSessionLocal() as db:
+            devices = await _fetch_devices([uuid.UUID(DEVICE_A)], "fake-token", db=db)
+            assert devices[0]["name"] == f"device-{DEVICE_A[:8]}"
+            assert batch_get.call_count == 0
+
+            # Devices the model has not seen yet are fetched over HTTP
+            devices = await _fetch_devices(
+                [uuid.UUID(DEVICE_A), uuid.UUID(DEVICE_CLOUD)], "fake-token", db=db
+            )
+            assert {d["id"] for d in devices} == {DEVICE_A, DEVICE_CLOUD}
+            assert batch_get.call_count == 1
+            assert json.loads(batch_get.calls.last.request.content) == {"ids": [DEVICE_CLOUD]}
+
+            # Once the model is too far behind, everything goes over HTTP
+            model._complete_at = datetime.now(timezone.utc) - timedelta(minutes=5)
+            assert not model.is_fresh()
+            await _fetch_devices([uuid.UUID(DEVICE_CLOUD)], "fake-token", db=db)
+            assert batch_get.call_count == 2
+
+    status = await model.status()
+    assert status["devices"] == 2 and status["fresh"] is False and not status["live"]
+
+
+@pytest.mark.asyncio
+async def test_read_model_applies_events_in_version_order():
+    model = DeviceReadModel(session_factory=TestSessionLocal)
+
+    def msg(payload):
+        return MagicMock(data=json.dumps(payload).encode())
+
+    await model._on_event(msg({"event": "devices.changed", "devices": [_summary(DEVICE_A, 2)]}))
+    # A late, older event does not roll the device back
+    await model._on_event(
+        msg({"event": "devices.changed", "devices": [_summary(DEVICE_A, 1, "MAINTENANCE")]})
+    )
+    await model._on_event(
+        msg({"event": "devices.changed", "devices": [_summary(DEVICE_A, 3, "RESERVED")]})
+    )
+    async with TestSessionLocal() as db:
+        row = await db.get(DeviceReplica, uuid.UUID(DEVICE_A))
+        assert (row.version, row.status) == (3, "RESERVED")
+
+    await model._on_event(msg({"event": "device.deleted", "id": DEVICE_A, "version": 4}))
+    async with TestSessionLocal() as db:
+        assert await db.get(DeviceReplica, uuid.UUID(DEVICE_A)) is None
+
+
+@pytest.mark.asyncio
+async def test_read_model_snapshot_does_not_revive_deleted_device():
+    model = DeviceReadModel(session_factory=TestSessionLocal)
+    deleted = {"event": "device.deleted", "id": DEVICE_A, "version": 2}
+
+    async def read_before_delete(http_client=None):
+        # The device is deleted while the snapshot response is in flight
+        await model._on_event(MagicMock(data=json.dumps(deleted).encode()))
+        return [_summary(DEVICE_A, 1), _summary(DEVICE_B, 1)]
+
+    with patch("app.tasks.device_sync.fetch_device_snapshot", new=read_before_delete):
+        await model.snapshot()
+    async with TestSessionLocal() as db:
+        assert await db.get(DeviceReplica, uuid.UUID(DEVICE_A)) is None
+        assert await db.get(DeviceReplica, uuid.UUID(DEVICE_B)) is not None
+        assert await db.get(DeviceTombstone, uuid.UUID(DEVICE_A)) is not None
+
+    # A later snapshot, which no longer lists the device, clears the tombstone
+    with patch(
+        "app.tasks.device_sync.fetch_device_snapshot",
+        new=AsyncMock(return_value=[_summary(DEVICE_B, 1)]),
+    ):
+        await model.snapshot()
+    async with TestSessionLocal() as db:
+        assert await db.get(DeviceTombstone, uuid.UUID(DEVICE_A)) is None
+        assert await db.get(DeviceReplica, uuid.UUID(DEVICE_B)) is not None
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_read_model_snapshot_prunes_large_catalog_by_time():
+    # More devices than a statement may carry bind parameters for
+    catalog = [_summary(str(uuid.UUID(int=i + 1))) for i in range(33_000)]
+    route = respx.get("http://inventory:8000/devices:snapshot").mock(
+        return_value=httpx.Response(200, json={"devices": catalog})
+    )
+    model = DeviceReadModel(session_factory=TestSessionLocal)
+    assert await model.snapshot() == len(catalog)
+
+    # Unchanged versions must survive the next snapshot; the dropped device must not
+    route.mock(return_value=httpx.Response(200, json={"devices": catalog[1:]}))
+    assert await model.snapshot() == len(catalog) - 1
+    async with TestSessionLocal() as db:
+        assert await db.get(DeviceReplica, uuid.UUID(catalog[0]["id"])) is None
+        kept = await db.get(DeviceReplica, uuid.UUID(catalog[-1]["id"]))
+        assert kept.version == 1
+    assert (await model.status())["devices"] == len(catalog) - 1
+
+
+# --- Idempotency keys ---
+
+
+@pytest.mark.asyncio
+async def test_idempotent_create_replays_stored_response(client):
+    fetch = AsyncMock(return_value=[make_device_response(DEVICE_A)])
+    body = {"device_ids": [DEVICE_A], "start_time": START, "end_time": END}
+    headers = {"Idempotency-Key": "create-1"}
+    with patch("app.services.reservation_service._fetch_devices", new=fetch), patch(
+        "app.services.reservation_service._update_device_statuses", new=AsyncMock()
+    ):
+        first = await client.post("/", json=body, headers=headers)
+        second = await client.post("/", json=body, headers=headers)
+        # The same key may not be reused for a different request
+        other = await client.post("/", json={**body, "purpose": "other"}, headers=headers)
+
+    assert first.status_code == second.status_code == 201
+    assert second.json() == first.json()
+    assert second.headers["Idempotent-Replayed"] == "true"
+    assert fetch.await_count == 1
+    assert other.status_code == 422
+    async with TestSessionLocal() as db:
+        count = len((await db.execute(select(Reservation))).scalars().all())
+    assert count == 1
+
+
+@pytest.mark.asyncio
+async def test_idempotent_create_failure_releases_key(client):
+    body = {"device_ids": [DEVICE_A], "start_time": START, "end_time": END}
+    headers = {"Idempotency-Key": "create-2"}
+    with patch(
+        "app.services.reservation_service._fetch_devices",
+        new=AsyncMock(side_effect=RuntimeError("inventory down")),
+    ):
+        resp = await client.post("/", json=body, headers=headers)
+    assert resp.status_code == 503
+
+    with patch(
+        "app.services.reservation_service._fetch_devices",
+        new=AsyncMock(return_value=[make_device_response(DEVICE_A)]),
+    ), patch("app.services.reservation_service._update_device_statuses", new=AsyncMock()):
+        resp = await client.post("/", json=body, headers=headers)
+    assert resp.status_code == 201
+    assert "Idempotent-Replayed" not in resp.headers
+
+
+@pytest.mark.asyncio
+async def test_idempotent_cancel_and_release(client):
+    first = (await _create_test_reservation(client)).json()
+    second = (await _create_test_reservation(client, [DEVICE_B])).json()
+    with patch(
+        "app.services.reservation_service._update_device_statuses", new=AsyncMock()
+    ) as update_statuses:
+        cancels = [
+            await client.delete(f"/{first['id']}", headers={"Idempotency-Key": "cancel-1"})
+            for _ in range(2)
+        ]
+        releases = [
+            await client.put(f"/{second['id']}/release", headers={"Idempotency-Key": "rel-1"})
+            for _ in range(2)
+        ]
+    assert [r.status_code for r in cancels] == [204, 204]
+    assert cancels[1].headers["Idempotent-Replayed"] == "true"
+    assert [r.status_code for r in releases] == [200, 200]
+    assert releases[1].json() == releases[0].json()
+    assert releases[0].json()["status"] == "COMPLETED"
+    assert update_statuses.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_expired_idempotency_keys_are_purged():
+    now = datetime.now(timezone.utc)
+    async with TestSessionLocal() as db:
+        expiries = {"old": now - timedelta(minutes=1), "new": now + timedelta(hours=1)}
+        for key, expires_at in expiries.items():
+            db.add(
+                IdempotencyKey(
+                    user_id=uuid.UUID(USER_ID), key=key, fingerprint="x",
+                    status_code=204, expires_at=expires_at,
+                )
+            )
+        await db.commit()
+
+    assert await IdempotencyKeyCleaner(session_factory=TestSessionLocal).purge() == 1
+    async with TestSessionLocal() as db:
+        keys = (await db.execute(select(IdempotencyKey.key))).scalars().all()
+    assert keys == ["new"]
+
+
+# --- Partitions ---
+
+
+def test_partition_month_arithmetic():
+    month = month_start(datetime(2026, 1, 31, 23, 59, tzinfo=timezone.utc))
+    assert month == datetime(2026, 1, 1, tzinfo=timezone.utc)
+    assert add_months(month, -1) == datetime(2025, 12, 1, tzinfo=timezone.utc)
+    assert add_months(month, 12) == datetime(2027, 1, 1, tzinfo=timezone.utc)
+    assert partition_name(add_months(month, 11)) == "reservations_p2026_12"
+    assert live_since(month) == datetime(2025, 12, 1, tzinfo=timezone.utc)
+
+
+@pytest.mark.asyncio
+async def test_partition_maintenance_noop_when_unpartitioned(client):
+    await _create_test_reservation(client)
+    assert await PartitionMaintainer(session_factory=TestSessionLocal).run_once() == ([], [])
+    # The listing's partition-pruning bound still returns current reservations
+    resp = await client.get("/")
+    assert len(resp.json()["items"]) == 1
+
+
+@requires_postgres
+@pytest.mark.asyncio
+async def test_pg_month_booked_beyond_horizon_is_split_out_and_archived(pg_db, tmp_path):
+    now = datetime(2030, 1, 10, tzinfo=timezone.utc)
+    far = datetime(2031, 3, 15, tzinfo=timezone.utc)
+    await ensure_partitions(pg_db, now=now, months_ahead=12)
+    booked = _pg_reservation([uuid.UUID(DEVICE_A)], far - timedelta(hours=2), far)
+    booked.status = ReservationStatus.COMPLETED
+    for row in booked.devices:
+        row.status = ReservationStatus.COMPLETED
+    pg_db.add(booked)
+    await pg_db.commit()
+    default_rows = "SELECT count(*) FROM reservations_default"
+    assert (await pg_db.execute(text(default_rows))).scalar() == 1
+
+    # Once the month is within the horizon it is split out of the default partition
+    name = partition_name(month_start(far))
+    assert name in await ensure_partitions(pg_db, now=month_start(far), months_ahead=0)
+    await pg_db.commit()
+    assert (await pg_db.execute(text(default_rows))).scalar() == 0
+    assert (await pg_db.execute(text(f"SELECT count(*) FROM {name}"))).scalar() == 1
+    assert len((await _pg_counts(pg_db))[1]) == 1
+
+    archived = await archive_partitions(
+        pg_db, now=add_months(month_start(far), 3), after_months=1, archive_dir=str(tmp_path)
+    )
+    assert name in archived
+    with gzip.open(tmp_path / f"{name}.ndjson.gz", "rt") as fh:
+        assert [json.loads(line)["id"] for line in fh] == [str(booked.id)]
+    assert (await _pg_counts(pg_db))[0] == []
+
+
+# --- Utilization analytics ---
+
+
+def test_occupancy_splits_intervals_across_slots():
+    busy = occupancy(
+        np.array([0, 1, 0, 1, 0]),
+        np.array([1800, 600, 9000, -100, 13000]),
+        np.array([5400, 12000, 9600, 0, 20000]),
+        n_devices=2,
+        n_slots=4,
+    )
+    # The last interval is clipped to the grid and the one before it dropped
+    assert busy.tolist() == [[1800, 1800, 600, 1400], [3000, 3600, 3600, 1200]]
+    assert hour_of_week(datetime(2026, 10, 18, 23, tzinfo=timezone.utc), 3).tolist() == [
+        167, 0, 1,
+    ]
+
+
+async def _add_finished(device_id: str, start: datetime, end: datetime, status):
+    async with TestSessionLocal() as db:
+        db.add(
+            Reservation(
+                user_id=uuid.UUID(USER_ID), device_ids=[device_id], topology_type="PHYSICAL",
+                start_time=start, end_time=end, status=status,
+                devices=[
+                    ReservationDevice(
+                        device_id=uuid.UUID(device_id), start_time=start, end_time=end,
+                        status=status,
+                    )
+                ],
+            )
+        )
+        await db.commit()
+
+
+@pytest.mark.asyncio
+async def test_admin_utilization_report(client, as_admin):
+    switch = str(uuid.uuid4())
+    await _add_replicas((DEVICE_A, "FIREWALL"), (DEVICE_B, "FIREWALL"), (switch, "SWITCH"))
+    hour = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    completed = ReservationStatus.COMPLETED
+    await _add_finished(DEVICE_A, hour - timedelta(hours=3), hour - timedelta(hours=1), completed)
+    await _add_finished(DEVICE_B, hour - timedelta(hours=2), hour - timedelta(hours=1), completed)
+    await _add_finished(
+        switch, hour - timedelta(hours=2), hour - timedelta(hours=1), ReservationStatus.CANCELLED
+    )
+
+    with patch("app.routers.admin.utilization_analytics", UtilizationAnalytics(7, 0)):
+        resp = await client.get("/admin/utilization", params={"device_heatmaps": True})
+        assert resp.status_code == 200
+        report = resp.json()
+        assert report["peak_concurrency"] == 2
+        assert report["peak_at"].startswith((hour - timedelta(hours=2)).isoformat()[:19])
+        assert [d["device_id"] for d in report["idle_devices"]] == [switch, DEVICE_B, DEVICE_A]
+        assert report["idle_devices"][0]["last_used"] is None
+
+        how = hour_of_week(hour - timedelta(hours=3), 2).tolist()
+        devices = {d["device_id"]: d for d in report["devices"]}
+        assert devices[DEVICE_A]["heatmap"][how[0]] == 100.0
+        assert devices[DEVICE_B]["heatmap"][how[0]] == 0.0
+        firewall, switches = report["types"]
+        assert (firewall["device_type"], firewall["devices"]) == ("FIREWALL", 2)
+        assert firewall["heatmap"][how[0]] == 50.0 and firewall["heatmap"][how[1]] == 100.0
+        assert firewall["peak_concurrency"] == 2 and switches["peak_concurrency"] == 0
+
+        # Bookings finishing later are added on the next refresh
+        await _add_finished(
+            switch, hour - timedelta(hours=5), datetime.now(timezone.utc), completed
+        )
+        resp = await client.get("/admin/utilization", params={"device_type": "SWITCH"})
+        (device,) = resp.json()["devices"]
+        assert device["device_id"] == switch and device["utilization"] > 0
+        assert device["last_used"] is not None and device["heatmap"] is None